@@ -1,11 +1,52 @@
-import requests
+import os
+import time
 import json
+import asyncio
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import result_cache, make_cache_key
+from ratelimit import get_rate_limiter
+from compaction import compact_inputs
+from metrics import timed_stage
+from deadlines import DeadlineExceeded, RequestCancelled
+
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434/api')
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', 2))
+OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', 60))
+OLLAMA_RETRIES = int(os.getenv('OLLAMA_RETRIES', 2))
+OLLAMA_BACKOFF = float(os.getenv('OLLAMA_BACKOFF', 0.5))
+OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', 10))
+# Por quanto tempo (s) o resultado do health check em /api/tags é reaproveitado
+OLLAMA_HEALTH_TTL = float(os.getenv('OLLAMA_HEALTH_TTL', 10))
+
+RETRY_STATUSES = (502, 503, 504)
 
-class AIAnalyzer:
-    def __init__(self, model="mistral"):
-        self.base_url = "http://localhost:11434/api"
+def _raise_if_expired(deadline, error):
+    """Uma falha com o prazo da requisição já esgotado vira DeadlineExceeded.
+
+    O timeout de leitura é encurtado pelo que sobra do prazo (e no streaming
+    chega como ConnectionError): não é uma falha do Ollama.
+    """
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded('Prazo da requisição esgotado') from error
+
+class BaseAIAnalyzer:
+    """Prompt, cache e payloads compartilhados pelos clientes síncrono e assíncrono do Ollama."""
+
+    def __init__(self, model="mistral", cache=result_cache, base_url=None,
+                 connect_timeout=None, read_timeout=None, retries=None, backoff=None,
+                 health_ttl=None):
+        self.base_url = base_url or OLLAMA_URL
         self.model = model
-        
+        self.cache = cache
+        self.connect_timeout = OLLAMA_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self.read_timeout = OLLAMA_READ_TIMEOUT if read_timeout is None else read_timeout
+        self.retries = OLLAMA_RETRIES if retries is None else retries
+        self.backoff = OLLAMA_BACKOFF if backoff is None else backoff
+        self.health_ttl = OLLAMA_HEALTH_TTL if health_ttl is None else health_ttl
+        self._health = None  # (disponível, verificado_em)
+
     def _generate_prompt(self, cv_text, job_description):
         return f"""Analise este currículo para a vaga descrita e forneça um feedback detalhado.
 
@@ -25,43 +66,293 @@ Por favor, forneça uma análise estruturada incluindo:
 
 Mantenha o tom profissional e construtivo."""
 
-    def analyze(self, cv_text, job_description):
+    def _prepare(self, cv_text, job_description):
+        """Compacta as entradas e calcula a chave de cache."""
+        with timed_stage('prompt'):
+            cv_text, job_description, token_stats = compact_inputs(cv_text, job_description, self.model)
+        # Ollama usa a temperatura padrão do modelo
+        cache_key = make_cache_key(cv_text, job_description, f"ollama:{self.model}", None)
+        return cv_text, job_description, token_stats, cache_key
+
+    def _cached(self, cache_key, use_cache):
+        if use_cache and self.cache is not None:
+            return self.cache.get(cache_key)
+        return None
+
+    def _store(self, cache_key, analysis):
+        if self.cache is not None:
+            self.cache.set(cache_key, analysis)
+
+    def _payload(self, cv_text, job_description, stream):
+        return {
+            "model": self.model,
+            "prompt": self._generate_prompt(cv_text, job_description),
+            "stream": stream
+        }
+
+    def _health_cached(self):
+        if self._health is not None and time.monotonic() - self._health[1] < self.health_ttl:
+            return self._health[0]
+        return None
+
+    def _set_health(self, available):
+        self._health = (available, time.monotonic())
+        return available
+
+    def _backoff_delay(self, attempt):
+        return self.backoff * (2 ** attempt)
+
+class AIAnalyzer(BaseAIAnalyzer):
+    """Cliente síncrono do Ollama com sessão keep-alive, timeouts e retentativas."""
+
+    def __init__(self, model="mistral", cache=result_cache, **options):
+        super().__init__(model, cache, **options)
+        self.session = requests.Session()
+        # Retentativas com backoff exponencial em falhas de conexão e 502/503/504
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=0,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_SIZE, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _timeout(self, deadline):
+        """Timeout da chamada, com a leitura limitada pelo que sobra do prazo da requisição."""
+        if deadline is None:
+            return self.timeout
+        return (self.connect_timeout, deadline.timeout(self.read_timeout))
+
+    def analyze(self, cv_text, job_description, use_cache=True, deadline=None):
         """Analisa o CV usando o modelo Ollama."""
+        cv_text, job_description, token_stats, cache_key = self._prepare(cv_text, job_description)
+        cached = self._cached(cache_key, use_cache)
+        if cached is not None:
+            cached["cached"] = True
+            cached.update(token_stats)
+            return cached
+
         try:
-            prompt = self._generate_prompt(cv_text, job_description)
-            
+            get_rate_limiter('ollama').acquire()
             # Configuração da requisição para o Ollama
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                }
+                json=self._payload(cv_text, job_description, stream=False),
+                timeout=self._timeout(deadline)
             )
-            
+
             if response.status_code == 200:
                 result = response.json()
-                return {
+                analysis = {
                     "success": True,
                     "analysis": result["response"]
                 }
+                self._store(cache_key, analysis)
+                analysis.update(token_stats)
+                return analysis
             else:
                 return {
                     "success": False,
                     "error": f"Erro na API do Ollama: {response.status_code}"
                 }
-                
+
+        except (DeadlineExceeded, RequestCancelled):
+            # Prazo esgotado ou chamada abandonada: não é falha do Ollama
+            raise
         except Exception as e:
+            _raise_if_expired(deadline, e)
+            # Uma falha de conexão invalida o health check em cache
+            self._health = None
             return {
                 "success": False,
                 "error": f"Erro ao analisar com IA: {str(e)}"
             }
-    
+
+    def analyze_stream(self, cv_text, job_description, use_cache=True, deadline=None, token_stats=None):
+        """Analisa o CV usando o Ollama em modo streaming, gerando o texto aos pedaços.
+
+        Num acerto de cache, token_stats (se dado) recebe cached=True.
+        """
+        cv_text, job_description, _, cache_key = self._prepare(cv_text, job_description)
+        cached = self._cached(cache_key, use_cache)
+        if cached is not None:
+            if token_stats is not None:
+                token_stats["cached"] = True
+            yield cached["analysis"]
+            return
+
+        get_rate_limiter('ollama').acquire()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/generate",
+                json=self._payload(cv_text, job_description, stream=True),
+                timeout=self._timeout(deadline),
+                stream=True
+            )
+
+            with response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"Erro na API do Ollama: {response.status_code}")
+
+                # O Ollama envia um objeto JSON por linha até "done": true
+                chunks = []
+                for line in response.iter_lines():
+                    if deadline is not None:
+                        deadline.check()
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    text = data.get("response", "")
+                    if text:
+                        chunks.append(text)
+                        yield text
+                    if data.get("done"):
+                        break
+        except requests.RequestException as e:
+            _raise_if_expired(deadline, e)
+            raise
+
+        self._store(cache_key, {
+            "success": True,
+            "analysis": "".join(chunks)
+        })
+
     def is_available(self):
-        """Verifica se o serviço Ollama está disponível."""
+        """Verifica se o serviço Ollama está disponível (resultado reaproveitado por health_ttl segundos)."""
+        cached = self._health_cached()
+        if cached is not None:
+            return cached
+        try:
+            response = self.session.get(f"{self.base_url}/tags", timeout=self.timeout)
+            return self._set_health(response.status_code == 200)
+        except requests.RequestException:
+            return self._set_health(False)
+
+    def close(self):
+        self.session.close()
+
+class AsyncAIAnalyzer(BaseAIAnalyzer):
+    """Cliente asyncio do Ollama (aiohttp) com pool de conexões keep-alive, timeouts e retentativas."""
+
+    def __init__(self, model="mistral", cache=result_cache, **options):
+        super().__init__(model, cache, **options)
+        self._session = None
+
+    async def _get_session(self):
+        import aiohttp
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=OLLAMA_POOL_SIZE, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            )
+        return self._session
+
+    async def _request(self, method, path, **kwargs):
+        """Faz a requisição com retentativas e backoff; o chamador fecha a resposta."""
+        import aiohttp
+        session = await self._get_session()
+        for attempt in range(self.retries + 1):
+            try:
+                response = await session.request(method, f"{self.base_url}{path}", **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                response.release()
+            await asyncio.sleep(self._backoff_delay(attempt))
+
+    async def analyze(self, cv_text, job_description, use_cache=True):
+        """Analisa o CV usando o modelo Ollama."""
+        cv_text, job_description, token_stats, cache_key = self._prepare(cv_text, job_description)
+        cached = self._cached(cache_key, use_cache)
+        if cached is not None:
+            cached["cached"] = True
+            cached.update(token_stats)
+            return cached
+
         try:
-            response = requests.get(f"{self.base_url}/tags")
-            return response.status_code == 200
-        except:
-            return False 
\ No newline at end of file
+            response = await self._request(
+                'POST', '/generate', json=self._payload(cv_text, job_description, stream=False)
+            )
+            async with response:
+                if response.status != 200:
+                    return {
+                        "success": False,
+                        "error": f"Erro na API do Ollama: {response.status}"
+                    }
+                result = await response.json(content_type=None)
+
+            analysis = {
+                "success": True,
+                "analysis": result["response"]
+            }
+            self._store(cache_key, analysis)
+            analysis.update(token_stats)
+            return analysis
+
+        except Exception as e:
+            self._health = None
+            return {
+                "success": False,
+                "error": f"Erro ao analisar com IA: {str(e)}"
+            }
+
+    async def analyze_stream(self, cv_text, job_description, use_cache=True):
+        """Analisa o CV usando o Ollama em modo streaming, gerando o texto aos pedaços."""
+        cv_text, job_description, _, cache_key = self._prepare(cv_text, job_description)
+        cached = self._cached(cache_key, use_cache)
+        if cached is not None:
+            yield cached["analysis"]
+            return
+
+        response = await self._request(
+            'POST', '/generate', json=self._payload(cv_text, job_description, stream=True)
+        )
+        chunks = []
+        async with response:
+            if response.status != 200:
+                raise RuntimeError(f"Erro na API do Ollama: {response.status}")
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+                data = json.loads(line)
+                text = data.get("response", "")
+                if text:
+                    chunks.append(text)
+                    yield text
+                if data.get("done"):
+                    break
+
+        self._store(cache_key, {
+            "success": True,
+            "analysis": "".join(chunks)
+        })
+
+    async def is_available(self):
+        """Verifica se o serviço Ollama está disponível (resultado reaproveitado por health_ttl segundos)."""
+        cached = self._health_cached()
+        if cached is not None:
+            return cached
+        try:
+            response = await self._request('GET', '/tags')
+            async with response:
+                return self._set_health(response.status == 200)
+        except Exception:
+            return self._set_health(False)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -1,13 +1,33 @@
 import os
-from flask import Flask, request, render_template, jsonify, send_from_directory
+import json
+import time
+import base64
+from datetime import datetime
+from flask import Flask, request, render_template, jsonify, send_from_directory, url_for, Response, stream_with_context
 from dotenv import load_dotenv
 import openai
-from models import db, User, Subscription, Analysis, SUBSCRIPTION_PLANS
-from auth import auth, token_required
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+from config import Config, INSTANCE_PATH
+from models import db, User, Subscription, Analysis, AnalysisDetail, AnalysisJob, JobDescription, Document, SUBSCRIPTION_PLANS
+from migrations import migrate, verify_schema
+from auth import auth, token_required, invalidate_user, user_cache
 from subscription import subscription
-import fitz  # PyMuPDF
-from docx import Document
-import werkzeug
+from documents import documents
+from jobs import JobQueue, job_to_dict
+from concurrent.futures import ThreadPoolExecutor
+from extraction import extract_text, allowed_file, document_kind
+from providers import ProviderRouter, AllProvidersFailed
+from deadlines import Deadline, DeadlineExceeded, RequestCancelled, REQUEST_BUDGET
+from cache import result_cache, make_cache_key
+from text_store import text_store, hash_upload
+from singleflight import SingleFlight
+from scoring import keyword_score, keyword_feedback
+from ranking import rank_cvs
+from metrics import (
+    init_metrics, timed_stage, observe_extraction, observe_prompt_tokens, observe_time_to_first_token,
+    count_coalesced
+)
 import traceback
 
 # Load environment variables
@@ -16,21 +36,24 @@ load_dotenv()
 # Configure OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
-# Get absolute paths
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-INSTANCE_PATH = os.path.join(BASE_DIR, 'instance')
-DB_PATH = os.path.join(INSTANCE_PATH, 'app.db')
+# Análise em lote (plano business)
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+BATCH_MAX_PAIRS = int(os.getenv('BATCH_MAX_PAIRS', 500))
+RANK_MAX_CVS = int(os.getenv('RANK_MAX_CVS', 1000))
+RANK_MAX_TOP_K = int(os.getenv('RANK_MAX_TOP_K', 20))
+
+# Paginação do histórico
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 10))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 100))
 
 # Ensure instance directory exists
 os.makedirs(INSTANCE_PATH, exist_ok=True)
 
 # Initialize Flask app
 app = Flask(__name__)
+# Database URL (DATABASE_URL or the local SQLite file) and connection pool settings
+app.config.from_object(Config)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'uploads')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
 
 # Configurações de desenvolvimento
 app.config['SESSION_COOKIE_SECURE'] = False
@@ -43,187 +66,682 @@ app.config['REMEMBER_COOKIE_SAMESITE'] = 'Lax'
 # Initialize extensions
 db.init_app(app)
 
+# Roteador entre os provedores de LLM (OpenAI, Ollama) com hedging e failover
+llm_router = ProviderRouter.from_env()
+# Análises idênticas em andamento compartilham uma única chamada ao LLM
+analysis_flights = SingleFlight.from_env(result_cache.shared)
+
 # Register blueprints
 app.register_blueprint(auth, url_prefix='/auth')
 app.register_blueprint(subscription, url_prefix='/subscription')
+app.register_blueprint(documents, url_prefix='/documents')
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Latência por rota, tempo das etapas da análise e /metrics no formato do Prometheus
+init_metrics(app)
 
-# Create database tables
+# Check the database schema on startup. Migrations run out-of-band
+# (python init_db.py); AUTO_MIGRATE=1 applies them here for local development.
 def init_db():
     with app.app_context():
-        # Remove existing database file if it exists
-        if os.path.exists(DB_PATH):
-            os.remove(DB_PATH)
-        db.create_all()
-        print(f"Database initialized successfully at {DB_PATH}")
+        if os.getenv('AUTO_MIGRATE', '').lower() in {'1', 'true', 'yes'}:
+            migrate(db.engine)
+        else:
+            verify_schema(db.engine)
 
-# Initialize database on startup
 init_db()
 
-def allowed_file(filename):
-    """Check if the file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'pdf', 'docx'}
+def generate_feedback(cv_text, job_description, use_cache=True, deadline=None):
+    """Generate detailed feedback comparing CV with job requirements.
 
-def extract_text_from_pdf(file_path):
-    """Extract text from a PDF file."""
-    try:
-        text = ""
-        with fitz.open(file_path) as pdf:
-            for page in pdf:
-                text += page.get_text()
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
-        return None
+    Concurrent identical requests share one in-flight LLM call; the shared
+    result is marked with `coalesced`. The call runs under the leader's
+    `deadline`; if the leader's client disconnects, the waiting requests
+    retry the call themselves instead of failing with it. A request that
+    bypasses the cache only joins other cache-bypassing requests, so it never
+    gets a cached result back.
+    """
+    flight_key = make_cache_key(cv_text, job_description, 'analysis', use_cache)
+    while True:
+        try:
+            result, coalesced = analysis_flights.do(
+                flight_key, lambda: route_feedback(cv_text, job_description, use_cache, deadline)
+            )
+            break
+        except RequestCancelled:
+            if deadline is not None and deadline.cancelled():
+                raise
+    result = dict(result)
+    if coalesced:
+        result['coalesced'] = True
+        count_coalesced()
+    return result
 
-def extract_text_from_docx(file_path):
-    """Extract text from a DOCX file."""
-    try:
-        doc = Document(file_path)
-        text = []
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        return '\n'.join(text).strip()
-    except Exception as e:
-        print(f"Error extracting text from DOCX: {e}")
-        return None
+def route_feedback(cv_text, job_description, use_cache=True, deadline=None):
+    """Ask the provider router for the feedback, falling back to the keyword analysis."""
+    # O score vem do casamento local de palavras-chave, não da resposta do LLM
+    similarity_score = keyword_score(cv_text, job_description)
 
-def generate_feedback(cv_text, job_description):
-    """Generate detailed feedback comparing CV with job requirements."""
     try:
-        # Generate AI feedback using OpenAI
-        prompt = f"""Analise este currículo para a vaga descrita e forneça um feedback detalhado em português.
-
-Currículo:
-{cv_text}
-
-Descrição da Vaga:
-{job_description}
-
-Por favor, forneça uma análise estruturada incluindo:
-1. Resumo da compatibilidade
-2. Pontos fortes identificados
-3. Áreas para melhoria
-4. Sugestões específicas
-5. Habilidades técnicas encontradas
-6. Soft skills identificadas
-
-Use emojis adequados para cada seção e mantenha o tom profissional e construtivo."""
-
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        result = llm_router.generate(cv_text, job_description, use_cache=use_cache, deadline=deadline)
+    except AllProvidersFailed as e:
+        # Sem nenhum LLM disponível, a análise local por palavras-chave assume
+        app.logger.warning(f'All LLM providers failed, using keyword analysis: {e}')
+        return keyword_feedback(cv_text, job_description)
 
-        feedback = response.choices[0].message.content
+    result['similarity_score'] = similarity_score
+    return result
 
-        # Simular um score de compatibilidade baseado no comprimento do feedback
-        similarity_score = min(len(feedback.split()) / 10, 100)  # 1 ponto para cada 10 palavras, max 100
+def stream_feedback(cv_text, job_description, use_cache=True, token_stats=None, deadline=None):
+    """Stream the feedback text chunk by chunk as the model generates it.
 
-        return {
-            "similarity_score": similarity_score,
-            "feedback": feedback,
-            "using_ai": True
-        }
-        
-    except Exception as e:
-        return {
-            "similarity_score": 0,
-            "feedback": f"Erro ao analisar CV: {str(e)}",
-            "using_ai": False
-        }
+    The provider router picks the backend; AllProvidersFailed is raised when
+    no provider could start the stream, and other exceptions propagate. On a
+    cache hit the whole cached feedback is yielded as a single chunk. When a
+    `token_stats` dict is given it receives the prompt token counts and the
+    provider name.
+    """
+    return llm_router.stream(cv_text, job_description, use_cache=use_cache, token_stats=token_stats,
+                             deadline=deadline)
+
+def sse_event(event, data):
+    """Format a Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def build_analysis(user, cv_filename, job_description, result, job_description_id=None):
+    """Build (without adding to the session) the Analysis row for a result.
+
+    The job description is stored once per distinct text (pass
+    job_description_id when it was already resolved) and the feedback goes
+    compressed into AnalysisDetail.
+    """
+    if job_description_id is None:
+        job_description_id = JobDescription.id_for(job_description)
+    return Analysis(
+        user_id=user.id,
+        cv_filename=cv_filename,
+        job_description_id=job_description_id,
+        similarity_score=result['similarity_score'],
+        detail=AnalysisDetail.from_feedback(result['feedback']),
+        using_ai=result.get('using_ai', False),
+        tokens_original=result.get('tokens_original'),
+        tokens_sent=result.get('tokens_sent')
+    )
+
+def run_analysis(user, cv_text, job_description, use_cache=True, deadline=None):
+    """Run the analysis the user's plan entitles them to."""
+    with timed_stage('analysis'):
+        if user.subscription.plan_type == 'free':
+            # Plano gratuito: análise por palavras-chave, local e sem LLM
+            return keyword_feedback(cv_text, job_description)
+        result = generate_feedback(cv_text, job_description, use_cache=use_cache, deadline=deadline)
+    observe_prompt_tokens(result)
+    return result
+
+def save_analysis(user, cv_filename, job_description, result):
+    """Add an Analysis row for the result; the quota was reserved before the analysis ran."""
+    analysis = build_analysis(user, cv_filename, job_description, result)
+    db.session.add(analysis)
+    return analysis
+
+def quota_exceeded():
+    """Response for users whose quota is used up or whose subscription expired."""
+    return jsonify({
+        "error": "Limite de análises atingido ou assinatura expirada",
+        "subscription_required": True
+    }), 403
+
+def reserve_quota(user):
+    """Reserve one analysis with the conditional UPDATE; False when the quota is used up or expired."""
+    with timed_stage('quota'):
+        if not user.subscription.reserve_analyses():
+            return False
+    # O saldo mudou: a cópia do usuário no cache de autenticação fica obsoleta
+    invalidate_user(user.id)
+    return True
+
+def refund_quota(user):
+    """Give back the analysis reserved for a request whose analysis failed."""
+    db.session.rollback()
+    user.subscription.refund_analyses()
+    invalidate_user(user.id)
+    db.session.commit()
+
+def process_analysis_job(job):
+    """Run a queued analysis job; called by the job queue worker pool."""
+    user = User.query.get(job.user_id)
+    # Com prazo: o job termina bem antes do lease que a varredura da fila usa para dá-lo como perdido.
+    # Se falhar, a fila chama refund_failed_job
+    result = run_analysis(user, job.cv_text, job.job_description, use_cache=job.use_cache,
+                          deadline=Deadline(REQUEST_BUDGET))
+
+    analysis = save_analysis(user, job.cv_filename, job.job_description, result)
+    db.session.flush()
+    job.analysis_id = analysis.id
+    return result
+
+def refund_failed_job(job):
+    """Give back the analysis reserved at enqueue once the queue marks the job as failed."""
+    user = User.query.get(job.user_id)
+    if user is not None:
+        refund_quota(user)
+
+job_queue = JobQueue(app, process_analysis_job, on_failed=refund_failed_job)
+
+def wants_async():
+    """Check if the client opted in to the asynchronous analysis mode."""
+    value = request.args.get('async', request.form.get('async', ''))
+    return value.lower() in {'1', 'true', 'yes'}
+
+def wants_cache():
+    """Check if the client allowed serving the analysis from the result cache."""
+    value = request.args.get('no_cache', request.form.get('no_cache'))
+    if value is None:
+        # Lotes e rankings costumam vir em JSON: {"no_cache": true}
+        value = (request.get_json(silent=True) or {}).get('no_cache', '')
+    return str(value).lower() not in {'1', 'true', 'yes'}
 
 @app.route('/')
 def index():
     stripe_public_key = os.getenv('STRIPE_PUBLIC_KEY', '')
     return render_template('index.html', stripe_public_key=stripe_public_key)
 
-@app.route('/analyze', methods=['POST'])
-@token_required
-def analyze(current_user):
-    # Verificar se o usuário pode fazer análise
+def extract_cv_file(cv_file):
+    """Extract the text of an uploaded PDF/DOCX CV straight from the upload buffer.
+
+    A file already extracted before (same bytes, any user) is served from the
+    text store without parsing it again.
+    """
+    size, content_hash = hash_upload(cv_file)
+
+    def extract():
+        text = extract_text(cv_file, cv_file.filename)
+        observe_extraction(document_kind(cv_file.filename), size, text)
+        return text
+
+    with timed_stage('extraction'):
+        return text_store.get_or_extract(content_hash, size, extract)
+
+def read_analysis_input(current_user):
+    """Validate the analysis form and resolve the CV text from the paste box, upload or stored document.
+
+    A `document_id` from /documents/uploads reuses the text extracted when the
+    file was uploaded, so the file is neither sent nor parsed again.
+    Returns ((cv_text, job_description, cv_filename), None) on success or
+    (None, error_response) when the request must be rejected.
+    """
+    # Verificar se o usuário pode fazer análise (a reserva atômica da cota vem depois da validação)
     if not current_user.subscription or not current_user.subscription.can_analyze():
-        return jsonify({
-            "error": "Limite de análises atingido ou assinatura expirada",
-            "subscription_required": True
-        }), 403
+        return None, quota_exceeded()
     
     cv_text = request.form.get('cv_text', '')
     job_description = request.form.get('job_description', '')
     cv_file = request.files.get('cv_file')
+    document_id = request.form.get('document_id', type=int)
     
-    # Se não houver texto do CV nem arquivo, retorna erro
-    if not cv_text and not cv_file:
-        return jsonify({"error": "CV não fornecido"}), 400
+    # Se não houver texto do CV, arquivo nem documento, retorna erro
+    if not cv_text and not cv_file and not document_id:
+        return None, (jsonify({"error": "CV não fornecido"}), 400)
     
     if not job_description:
-        return jsonify({"error": "Descrição da vaga não fornecida"}), 400
+        return None, (jsonify({"error": "Descrição da vaga não fornecida"}), 400)
     
-    try:
-        # Se um arquivo foi enviado, processa-o
-        if cv_file and cv_file.filename:
-            if not allowed_file(cv_file.filename):
-                return jsonify({"error": "Tipo de arquivo não suportado. Use PDF ou DOCX"}), 400
-            
-            # Salva o arquivo com um nome seguro
-            filename = werkzeug.utils.secure_filename(cv_file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            cv_file.save(file_path)
-            
-            # Extrai o texto do arquivo
-            if filename.endswith('.pdf'):
-                cv_text = extract_text_from_pdf(file_path)
-            else:  # .docx
-                cv_text = extract_text_from_docx(file_path)
-            
-            # Remove o arquivo após extrair o texto
-            os.remove(file_path)
-            
-            if not cv_text:
-                return jsonify({"error": "Não foi possível extrair texto do arquivo"}), 400
+    # Documento já enviado: usa o texto extraído no envio
+    if document_id:
+        document = Document.query.filter_by(id=document_id, user_id=current_user.id).first()
+        if document is None:
+            return None, (jsonify({"error": "Documento não encontrado"}), 404)
+        return (document.text, job_description, document.filename), None
+    
+    # Se um arquivo foi enviado, processa-o
+    if cv_file and cv_file.filename:
+        if not allowed_file(cv_file.filename):
+            return None, (jsonify({"error": "Tipo de arquivo não suportado. Use PDF ou DOCX"}), 400)
         
+        cv_text = extract_cv_file(cv_file)
+        if not cv_text:
+            return None, (jsonify({"error": "Não foi possível extrair texto do arquivo"}), 400)
+    
+    cv_filename = cv_file.filename if cv_file else "Texto direto"
+    return (cv_text, job_description, cv_filename), None
+
+@app.route('/analyze', methods=['POST'])
+@token_required
+def analyze(current_user):
+    # Prazo das chamadas ao LLM: o orçamento da requisição, cancelado se o cliente desconectar
+    deadline = Deadline.for_request(request.environ)
+    try:
+        analysis_input, error = read_analysis_input(current_user)
+        if error:
+            return error
+        cv_text, job_description, cv_filename = analysis_input
+
+        # Reserva a cota com um UPDATE condicional antes de gastar com a análise
+        if not reserve_quota(current_user):
+            db.session.rollback()
+            return quota_exceeded()
+
+        # Modo assíncrono: enfileira e retorna o id do job imediatamente
+        if wants_async():
+            # A reserva é gravada no mesmo commit do job
+            job = job_queue.enqueue(current_user.id, cv_filename, cv_text, job_description,
+                                    use_cache=wants_cache())
+            return jsonify({
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": url_for('get_analysis_job', job_id=job.id)
+            }), 202
+
+        # Commit da reserva antes da chamada ao LLM, para não segurar o lock da assinatura
+        db.session.commit()
+
         # Analyze CV
-        result = generate_feedback(cv_text, job_description)
-        
+        try:
+            result = run_analysis(current_user, cv_text, job_description, use_cache=wants_cache(),
+                                  deadline=deadline)
+        except Exception:
+            refund_quota(current_user)
+            raise
+
         # Save analysis
-        analysis = Analysis(
-            user_id=current_user.id,
-            cv_filename=cv_file.filename if cv_file else "Texto direto",
-            job_description=job_description,
-            similarity_score=result['similarity_score'],
-            feedback=result['feedback'],
-            using_ai=result.get('using_ai', False)
-        )
-        db.session.add(analysis)
-        
-        # Update subscription usage
-        current_user.subscription.use_analysis()
-        db.session.commit()
+        with timed_stage('db_commit'):
+            save_analysis(current_user, cv_filename, job_description, result)
+            db.session.commit()
         
         return jsonify(result)
     
+    except DeadlineExceeded:
+        return jsonify({"error": "A análise não terminou dentro do tempo limite"}), 504
+    except RequestCancelled:
+        # O cliente já foi embora; 499 (como no nginx) só aparece no log e nas métricas
+        return jsonify({"error": "Requisição cancelada pelo cliente"}), 499
     except Exception as e:
         return jsonify({"error": f"Erro ao processar análise: {str(e)}"}), 500
 
+@app.route('/analyze/stream', methods=['POST'])
+@token_required
+def analyze_stream(current_user):
+    """Streaming variant of /analyze: feedback chunks are pushed as SSE events."""
+    try:
+        analysis_input, error = read_analysis_input(current_user)
+        if error:
+            return error
+    except Exception as e:
+        return jsonify({"error": f"Erro ao processar análise: {str(e)}"}), 500
+
+    cv_text, job_description, cv_filename = analysis_input
+    use_cache = wants_cache()
+    deadline = Deadline.for_request(request.environ)
+
+    # Reserva a cota antes de abrir o stream; o commit libera o lock antes da chamada ao LLM
+    if not reserve_quota(current_user):
+        db.session.rollback()
+        return quota_exceeded()
+    db.session.commit()
+    saved = []
+
+    def save(result):
+        with timed_stage('db_commit'):
+            save_analysis(current_user, cv_filename, job_description, result)
+            db.session.commit()
+        saved.append(True)
+
+    def keyword_events():
+        # Análise local por palavras-chave: sai inteira em um único evento
+        with timed_stage('analysis'):
+            result = keyword_feedback(cv_text, job_description)
+        save(result)
+        yield sse_event('chunk', {'text': result['feedback']})
+        yield sse_event('done', {
+            "similarity_score": result['similarity_score'],
+            "using_ai": False,
+            "time_to_first_token": None
+        })
+
+    def analysis_events():
+        if current_user.subscription.plan_type == 'free':
+            yield from keyword_events()
+            return
+
+        started = time.perf_counter()
+        time_to_first_token = None
+        chunks = []
+        token_stats = {}
+        try:
+            with timed_stage('analysis'):
+                for chunk in stream_feedback(cv_text, job_description, use_cache=use_cache,
+                                             token_stats=token_stats, deadline=deadline):
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - started
+                        observe_time_to_first_token(token_stats.get('provider'), time_to_first_token)
+                    chunks.append(chunk)
+                    yield sse_event('chunk', {'text': chunk})
+        except AllProvidersFailed as e:
+            # Nenhum LLM começou a responder: a análise local assume
+            app.logger.warning(f'All LLM providers failed, using keyword analysis: {e}')
+            yield from keyword_events()
+            return
+        except Exception as e:
+            app.logger.error(f'Streaming analysis failed: {e}')
+            yield sse_event('error', {'error': f"Erro ao analisar CV: {str(e)}"})
+            return
+
+        result = {
+            "similarity_score": keyword_score(cv_text, job_description),
+            "feedback": ''.join(chunks),
+            "using_ai": True,
+            **token_stats
+        }
+        save(result)
+
+        total = time.perf_counter() - started
+        app.logger.info(
+            f'Streamed analysis: provider={token_stats.get("provider")} '
+            f'time_to_first_token={time_to_first_token or total:.3f}s total={total:.3f}s'
+        )
+        yield sse_event('done', {
+            "similarity_score": result['similarity_score'],
+            "using_ai": True,
+            "time_to_first_token": time_to_first_token
+        })
+
+    def generate():
+        try:
+            yield from analysis_events()
+        finally:
+            # Erro ou cliente desconectado antes de gravar: a análise reservada volta para a cota
+            if not saved:
+                refund_quota(current_user)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def generate_feedback_many(pairs, use_cache=True, deadline=None):
+    """Run generate_feedback for (cv_text, job_description) pairs with bounded concurrency.
+
+    All calls share the request's `deadline`.
+    """
+    # As chamadas ao LLM saem em paralelo; o rate limit por provedor é aplicado pelos provedores
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(pairs))) as executor:
+        return list(executor.map(
+            lambda pair: generate_feedback(pair[0], pair[1], use_cache=use_cache, deadline=deadline),
+            pairs
+        ))
+
+def read_batch_input(max_pairs=BATCH_MAX_PAIRS):
+    """Collect the CVs and job descriptions of a batch from a JSON body or a multipart form.
+
+    Each CV is extracted once, no matter how many job descriptions it is paired with.
+    Returns ((cvs, job_descriptions), None) or (None, error_response).
+    """
+    cvs = []
+    if request.is_json:
+        data = request.get_json() or {}
+        for i, cv in enumerate(data.get('cvs') or []):
+            if isinstance(cv, str):
+                cvs.append((f"CV {i + 1}", cv))
+            else:
+                cvs.append((cv.get('name') or f"CV {i + 1}", cv.get('text', '')))
+        job_descriptions = data.get('job_descriptions') or []
+    else:
+        for i, cv_text in enumerate(request.form.getlist('cv_texts')):
+            cvs.append((f"CV {i + 1}", cv_text))
+        for cv_file in request.files.getlist('cv_files'):
+            if not cv_file.filename:
+                continue
+            if not allowed_file(cv_file.filename):
+                return None, (jsonify({"error": f"Tipo de arquivo não suportado: {cv_file.filename}. Use PDF ou DOCX"}), 400)
+            cv_text = extract_cv_file(cv_file)
+            if not cv_text:
+                return None, (jsonify({"error": f"Não foi possível extrair texto do arquivo {cv_file.filename}"}), 400)
+            cvs.append((cv_file.filename, cv_text))
+        job_descriptions = request.form.getlist('job_descriptions')
+
+    cvs = [(name, text) for name, text in cvs if text and text.strip()]
+    job_descriptions = [jd for jd in job_descriptions if jd and jd.strip()]
+
+    if not cvs:
+        return None, (jsonify({"error": "CV não fornecido"}), 400)
+    if not job_descriptions:
+        return None, (jsonify({"error": "Descrição da vaga não fornecida"}), 400)
+    if len(cvs) * len(job_descriptions) > max_pairs:
+        return None, (jsonify({"error": f"Lote excede o limite de {max_pairs} análises"}), 400)
+
+    return (cvs, job_descriptions), None
+
+@app.route('/analyze/batch', methods=['POST'])
+@token_required
+def analyze_batch(current_user):
+    """Analyze N CVs x M job descriptions with bounded concurrency (business plan)."""
+    subscription = current_user.subscription
+    if not subscription or subscription.plan_type != 'business' or not subscription.can_analyze():
+        return jsonify({
+            "error": "Análise em lote disponível apenas no plano Empresarial",
+            "subscription_required": True
+        }), 403
+
+    try:
+        batch_input, error = read_batch_input()
+        if error:
+            return error
+        cvs, job_descriptions = batch_input
+
+        pairs = [(cv, job_index, job_description)
+                 for cv in cvs
+                 for job_index, job_description in enumerate(job_descriptions)]
+        use_cache = wants_cache()
+
+        results = generate_feedback_many(
+            [(cv[1], job_description) for cv, _, job_description in pairs], use_cache,
+            Deadline.for_request(request.environ)
+        )
+
+        # Todas as linhas são inseridas em uma única transação
+        job_ids = {job_description: JobDescription.id_for(job_description) for job_description in job_descriptions}
+        analyses = [build_analysis(current_user, cv[0], job_description, result, job_ids[job_description])
+                    for (cv, _, job_description), result in zip(pairs, results)]
+        db.session.add_all(analyses)
+        db.session.commit()
+
+        return jsonify({
+            "count": len(analyses),
+            "results": [{
+                "analysis_id": analysis.id,
+                "cv_filename": cv[0],
+                "job_index": job_index,
+                "similarity_score": result['similarity_score'],
+                "feedback": result['feedback'],
+                "using_ai": result.get('using_ai', False)
+            } for analysis, (cv, job_index, _), result in zip(analyses, pairs, results)]
+        })
+
+    except DeadlineExceeded:
+        db.session.rollback()
+        return jsonify({"error": "A análise não terminou dentro do tempo limite"}), 504
+    except RequestCancelled:
+        db.session.rollback()
+        return jsonify({"error": "Requisição cancelada pelo cliente"}), 499
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Erro ao processar análise em lote: {str(e)}"}), 500
+
+@app.route('/analyze/rank', methods=['POST'])
+@token_required
+def analyze_rank(current_user):
+    """Rank many CVs against one job posting; only the top-K get the full LLM analysis (business plan)."""
+    subscription = current_user.subscription
+    if not subscription or subscription.plan_type != 'business' or not subscription.can_analyze():
+        return jsonify({
+            "error": "Ranking de CVs disponível apenas no plano Empresarial",
+            "subscription_required": True
+        }), 403
+
+    try:
+        batch_input, error = read_batch_input(max_pairs=RANK_MAX_CVS)
+        if error:
+            return error
+        cvs, job_descriptions = batch_input
+        if len(job_descriptions) != 1:
+            return jsonify({"error": "Informe exatamente uma descrição de vaga"}), 400
+        job_description = job_descriptions[0]
+
+        data = request.get_json(silent=True) or {}
+        top_k = data.get('top_k')
+        if top_k is None:
+            top_k = request.values.get('top_k')
+        try:
+            # top_k=0 é válido: só o ranking, sem análise pelo LLM
+            top_k = 5 if top_k is None else int(top_k)
+        except (TypeError, ValueError):
+            return jsonify({"error": "top_k inválido"}), 400
+        top_k = max(0, min(top_k, RANK_MAX_TOP_K, len(cvs)))
+
+        # Todos os CVs são pontuados de uma vez na matriz TF-IDF; só a lista curta vai para o LLM
+        ranking = rank_cvs([text for _, text in cvs], job_description)
+        shortlist = [index for index, _ in ranking[:top_k]]
+
+        results = generate_feedback_many(
+            [(cvs[index][1], job_description) for index in shortlist], wants_cache(),
+            Deadline.for_request(request.environ)
+        ) if shortlist else []
+        job_description_id = JobDescription.id_for(job_description) if shortlist else None
+        analyses = [build_analysis(current_user, cvs[index][0], job_description, result, job_description_id)
+                    for index, result in zip(shortlist, results)]
+        db.session.add_all(analyses)
+        db.session.commit()
+
+        return jsonify({
+            "count": len(cvs),
+            "ranking": [{
+                "rank": position + 1,
+                "cv_filename": cvs[index][0],
+                "rank_score": score
+            } for position, (index, score) in enumerate(ranking)],
+            "shortlist": [{
+                "rank": position + 1,
+                "analysis_id": analysis.id,
+                "cv_filename": cvs[index][0],
+                "similarity_score": result['similarity_score'],
+                "feedback": result['feedback'],
+                "using_ai": result.get('using_ai', False)
+            } for position, (index, analysis, result) in enumerate(zip(shortlist, analyses, results))]
+        })
+
+    except DeadlineExceeded:
+        db.session.rollback()
+        return jsonify({"error": "A análise não terminou dentro do tempo limite"}), 504
+    except RequestCancelled:
+        db.session.rollback()
+        return jsonify({"error": "Requisição cancelada pelo cliente"}), 499
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Erro ao processar ranking: {str(e)}"}), 500
+
+@app.route('/analyze/jobs/<job_id>')
+@token_required
+def get_analysis_job(current_user, job_id):
+    job = AnalysisJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({"error": "Análise não encontrada"}), 404
+
+    return jsonify(job_to_dict(job))
+
+# Colunas da listagem; feedback e descrição da vaga ficam em outras tabelas e não são lidos
+HISTORY_COLUMNS = (
+    Analysis.id, Analysis.cv_filename, Analysis.similarity_score, Analysis.created_at,
+    Analysis.using_ai, Analysis.tokens_original, Analysis.tokens_sent
+)
+
+def encode_history_cursor(row):
+    """Opaque keyset cursor pointing right after the given history row."""
+    raw = f"{row.created_at.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    """Return the (created_at, id) position encoded by encode_history_cursor; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, analysis_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError('cursor inválido') from e
+
+def history_page(user_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """One page of the user's history, newest first, using keyset pagination.
+
+    Walks the (user_id, created_at DESC, id DESC) index from the cursor
+    position, so every page costs the same no matter how deep it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = db.session.query(*HISTORY_COLUMNS).filter(Analysis.user_id == user_id)
+    if cursor:
+        created_at, analysis_id = decode_history_cursor(cursor)
+        query = query.filter(tuple_(Analysis.created_at, Analysis.id) < tuple_(created_at, analysis_id))
+    rows = query.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit + 1).all()
+
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
 @app.route('/history')
 @token_required
 def get_history(current_user):
-    analyses = Analysis.query.filter_by(user_id=current_user.id)\
-        .order_by(Analysis.created_at.desc())\
-        .limit(10)\
-        .all()
-    
-    return jsonify([{
+    """List the user's analyses, newest first.
+
+    Pages with ?limit= and ?cursor=; the cursor of the next page is sent in
+    the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        rows, next_cursor = history_page(current_user.id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({"error": "Parâmetros de paginação inválidos"}), 400
+
+    response = jsonify([{
         'id': a.id,
         'cv_filename': a.cv_filename,
         'similarity_score': a.similarity_score,
         'created_at': a.created_at.isoformat(),
-        'using_ai': a.using_ai
-    } for a in analyses])
+        'using_ai': a.using_ai,
+        'tokens_original': a.tokens_original,
+        'tokens_sent': a.tokens_sent
+    } for a in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/history/<int:analysis_id>')
+@token_required
+def get_history_item(current_user, analysis_id):
+    """One analysis with its full feedback and job description."""
+    analysis = Analysis.query.options(joinedload(Analysis.job), joinedload(Analysis.detail))\
+        .filter_by(id=analysis_id, user_id=current_user.id).first()
+    if not analysis:
+        return jsonify({"error": "Análise não encontrada"}), 404
+
+    return jsonify({
+        'id': analysis.id,
+        'cv_filename': analysis.cv_filename,
+        'job_description': analysis.job_description,
+        'similarity_score': analysis.similarity_score,
+        'feedback': analysis.feedback,
+        'created_at': analysis.created_at.isoformat(),
+        'using_ai': analysis.using_ai,
+        'tokens_original': analysis.tokens_original,
+        'tokens_sent': analysis.tokens_sent
+    })
+
+@app.route('/analyze/stats')
+@token_required
+def get_analysis_stats(current_user):
+    """Per-worker counters of the analysis pipeline: caches, request coalescing, text store and LLM providers."""
+    return jsonify({
+        'cache': result_cache.stats(),
+        'coalescing': analysis_flights.stats(),
+        'auth_cache': user_cache.stats(),
+        'text_store': text_store.stats(),
+        'llm': llm_router.snapshot()
+    })
 
 # Error handlers
 @app.errorhandler(500)
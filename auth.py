@@ -1,13 +1,110 @@
 from flask import Blueprint, request, jsonify, session, current_app
 from models import db, User, Subscription, SUBSCRIPTION_PLANS
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
 import jwt
 from functools import wraps
 import os
+import time
+import threading
 import traceback
 
 auth = Blueprint('auth', __name__)
 
+# Lido uma vez na carga do módulo (o .env já foi carregado pelo config, via models)
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+
+# Cache por worker dos usuários autenticados, com a assinatura
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', 15))
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', 10000))
+
+class UserCache:
+    """Usuários com a assinatura já carregada, guardados desanexados da sessão por alguns segundos.
+
+    Cada requisição recebe a própria cópia via session.merge(load=False), sem
+    consultar o banco. Quem altera o usuário ou a assinatura invalida a
+    entrada no próprio worker; nos outros, a validade curta limita o atraso.
+    A cota continua protegida pelo UPDATE condicional de reserve_analyses.
+    """
+
+    def __init__(self, max_entries=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return user
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries)
+            }
+
+user_cache = UserCache()
+
+def load_user(user_id):
+    """Usuário do token com a assinatura: do cache do worker ou em uma única consulta."""
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user = User.query.options(joinedload(User.subscription)).get(user_id)
+        if user is None:
+            return None
+        # O cache guarda esta instância desanexada; a requisição usa uma cópia
+        if user.subscription is not None:
+            db.session.expunge(user.subscription)
+        db.session.expunge(user)
+        user_cache.set(user_id, user)
+        cached = user
+    return db.session.merge(cached, load=False)
+
+def invalidate_user(user_id):
+    """Descarta o usuário do cache agora e de novo no próximo commit.
+
+    A segunda invalidação cobre uma requisição concorrente que recarregue o
+    usuário antes de a alteração ser gravada.
+    """
+    user_cache.invalidate(user_id)
+    db.session.info.setdefault('invalidated_users', set()).add(user_id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed_users(db_session):
+    for user_id in db_session.info.pop('invalidated_users', ()):
+        user_cache.invalidate(user_id)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -17,9 +114,12 @@ def token_required(f):
             return jsonify({'message': 'Token não encontrado'}), 401
         
         try:
-            data = jwt.decode(token, os.getenv('JWT_SECRET_KEY'), algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
-        except:
+            data = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
+            current_user = load_user(data['user_id'])
+        except (jwt.InvalidTokenError, KeyError):
+            return jsonify({'message': 'Token inválido'}), 401
+
+        if current_user is None:
             return jsonify({'message': 'Token inválido'}), 401
             
         return f(current_user, *args, **kwargs)
@@ -56,7 +156,7 @@ def register():
     
     token = jwt.encode(
         {'user_id': user.id, 'exp': datetime.utcnow() + timedelta(days=30)},
-        os.getenv('JWT_SECRET_KEY')
+        JWT_SECRET_KEY
     )
     
     response = jsonify({
@@ -94,10 +194,15 @@ def login():
         if not user.check_password(password):
             current_app.logger.info("Senha inválida")
             return jsonify({'message': 'Email ou senha inválidos'}), 401
+
+        # BCRYPT_ROUNDS mudou desde o cadastro: regrava o hash com o custo atual
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
             
         token = jwt.encode(
             {'user_id': user.id, 'exp': datetime.utcnow() + timedelta(days=30)},
-            os.getenv('JWT_SECRET_KEY')
+            JWT_SECRET_KEY
         )
         
         response = jsonify({
@@ -135,8 +240,8 @@ def me(current_user):
         'name': current_user.name,
         'subscription': {
             'plan': subscription.plan_type,
-            'analyses_remaining': subscription.analyses_remaining,
+            'analyses_remaining': subscription.remaining_analyses,
             'expires_at': subscription.expires_at.isoformat(),
-            'is_active': subscription.is_active
+            'is_active': subscription.status == 'active' and subscription.expires_at >= datetime.utcnow()
         }
     }) 
\ No newline at end of file
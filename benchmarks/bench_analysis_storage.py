@@ -0,0 +1,181 @@
+"""Tamanho do banco e latência do /history com o feedback e a vaga dentro ou fora de analysis.
+
+Monta um banco SQLite temporário no layout anterior (job_description e
+feedback como Text em cada linha de analysis, schema na versão 3), semeia
+análises com textos realistas (um conjunto de vagas reaproveitadas por
+muitas análises e feedbacks em prosa de alguns KB), mede e então aplica a
+migração 4 pelo próprio migrate(), medindo de novo:
+
+- tamanho do arquivo (após VACUUM);
+- uma página do /history (history_page) e a abertura de uma análise;
+- uma varredura de analysis (AVG do score), como relatórios fazem.
+
+Uso: python benchmarks/bench_analysis_storage.py [--rows 200000] [--jobs 500] [--users 2000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import itertools
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Layout de analysis até a versão 3 do schema
+OLD_ANALYSIS_DDL = '''
+CREATE TABLE analysis (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES user (id),
+    cv_filename VARCHAR(255),
+    job_description TEXT,
+    similarity_score FLOAT,
+    feedback TEXT,
+    created_at DATETIME,
+    using_ai BOOLEAN,
+    tokens_original INTEGER,
+    tokens_sent INTEGER
+)
+'''
+
+def make_words(count):
+    syllables = ['pro', 'de', 'sen', 'vol', 'vi', 'men', 'to', 'ex', 'pe', 'ri', 'ên', 'cia', 'ca', 'pa',
+                 'ci', 'da', 'des', 'téc', 'ni', 'ca', 'ges', 'tão', 'e', 'qui', 'pe', 'pla', 'ta', 'for', 'ma']
+    return [''.join(random.choice(syllables) for _ in range(random.randint(2, 4))) for _ in range(count)]
+
+def make_sentences(words, count):
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return [' '.join(random.choices(words, cum_weights=cum_weights, k=random.randint(8, 18))).capitalize() + '.'
+            for _ in range(count)]
+
+def prose(sentences, size):
+    parts = []
+    length = 0
+    while length < size:
+        sentence = random.choice(sentences)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(parts)
+
+def seed(db_path, args):
+    random.seed(42)
+    words = make_words(3000)
+    # Palavras com distribuição de Zipf, como texto real
+    sentences = make_sentences(words, 50000)
+    jobs = [prose(sentences, random.randint(1500, 4000)) for _ in range(args.jobs)]
+    start = datetime(2023, 1, 1)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    batch = []
+    for i in range(args.rows):
+        feedback = prose(sentences, random.randint(1500, 3500))
+        batch.append((random.randint(1, args.users), f'cv_{i}.pdf', random.choice(jobs), random.uniform(0, 100),
+                      feedback, (start + timedelta(seconds=i * 30)).strftime('%Y-%m-%d %H:%M:%S.%f'), 1, 900, 600))
+        if len(batch) == 10000 or i == args.rows - 1:
+            conn.executemany(
+                'INSERT INTO analysis (user_id, cv_filename, job_description, similarity_score, feedback, '
+                'created_at, using_ai, tokens_original, tokens_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+    conn.commit()
+    conn.close()
+
+def file_size_mb(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('VACUUM')
+    conn.close()
+    return round(os.path.getsize(db_path) / 2 ** 20, 1)
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--jobs', type=int, default=500, help='vagas distintas')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'storage.db')
+    os.environ.update(DATABASE_URL=f'sqlite:///{db_path}', AUTO_MIGRATE='1',
+                      JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'))
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import text
+    from sqlalchemy.orm import joinedload
+    from app import app, history_page
+    from models import db, Analysis, analysis_history_index
+    from migrations import migrate
+
+    with app.app_context():
+        # Volta analysis ao layout da versão 3
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP TABLE analysis_detail'))
+            conn.execute(text('DROP TABLE analysis'))
+            conn.execute(text('DROP TABLE job_description'))
+            conn.execute(text(OLD_ANALYSIS_DDL))
+            conn.execute(text('DELETE FROM schema_version WHERE version > 3'))
+        analysis_history_index.create(bind=db.engine)
+        db.engine.dispose()
+
+        started = time.perf_counter()
+        seed(db_path, args)
+        report = {'rows': args.rows, 'distinct_jobs': args.jobs, 'seed_s': round(time.perf_counter() - started, 1)}
+
+        # Usuário com o histórico mais longo e uma análise dele para abrir
+        with sqlite3.connect(db_path) as conn:
+            user_id = conn.execute(
+                'SELECT user_id FROM analysis GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()[0]
+            analysis_id = conn.execute(
+                'SELECT MAX(id) FROM analysis WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+        def measure(open_analysis):
+            def page():
+                history_page(user_id, limit=10)
+                db.session.remove()
+
+            def scan():
+                db.session.execute(text('SELECT AVG(similarity_score) FROM analysis')).scalar()
+                db.session.remove()
+
+            return {
+                'db_size_mb': file_size_mb(db_path),
+                'history_page_ms': timed(page, args.repeat),
+                'open_analysis_ms': timed(open_analysis, args.repeat),
+                'scan_avg_score_ms': timed(scan, max(args.repeat // 4, 3))
+            }
+
+        def open_old():
+            db.session.execute(text(
+                'SELECT job_description, feedback FROM analysis WHERE id = :id'), {'id': analysis_id}).fetchone()
+            db.session.remove()
+
+        report['before'] = measure(open_old)
+
+        started = time.perf_counter()
+        migrate(db.engine, log=lambda message: None)
+        report['migration_s'] = round(time.perf_counter() - started, 1)
+        db.engine.dispose()
+
+        def open_new():
+            analysis = Analysis.query.options(joinedload(Analysis.job), joinedload(Analysis.detail))\
+                .filter_by(id=analysis_id).first()
+            analysis.job_description, analysis.feedback
+            db.session.remove()
+
+        report['after'] = measure(open_new)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Consultas ao banco e latência por requisição autenticada (token_required).
+
+Sobe o app em processo, sobre um banco SQLite temporário, registra um
+usuário e repete requisições autenticadas, contando as consultas SQL de cada
+uma (evento before_cursor_execute do engine). A primeira requisição de cada
+rota carrega o usuário; as seguintes mostram o custo em regime.
+
+Uso: python benchmarks/bench_auth.py [--requests 500] [--app-dir DIR]
+
+--app-dir permite medir outra cópia do projeto (ex.: um `git worktree` de
+uma revisão anterior) com a mesma metodologia.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROUTES = ['/auth/me', '/history', '/analyze/stats']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500, help='requisições por rota')
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(directory, 'auth.db')}", AUTO_MIGRATE='1',
+                      JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'))
+    sys.path.insert(0, os.path.abspath(args.app_dir))
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import app
+
+    statements = []
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    app.logger.disabled = True
+    client = app.test_client()
+    client.post('/auth/register', json={'email': 'auth@example.com', 'password': 'bench123'})
+
+    report = {'app_dir': os.path.abspath(args.app_dir), 'requests': args.requests, 'routes': {}}
+    for route in ROUTES:
+        del statements[:]
+        first_status = client.get(route).status_code
+        first_queries = len(statements)
+
+        queries, latencies = [], []
+        for _ in range(args.requests):
+            del statements[:]
+            started = time.perf_counter()
+            client.get(route)
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(statements))
+        report['routes'][route] = {
+            'status': first_status,
+            'first_request_queries': first_queries,
+            'queries_per_request': round(statistics.mean(queries), 2),
+            'p50_ms': round(statistics.median(latencies), 3)
+        }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
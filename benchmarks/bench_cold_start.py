@@ -0,0 +1,125 @@
+"""Cold start dos workers do gunicorn, com e sem preload do app.
+
+Sobe o gunicorn com o gunicorn.conf.py do projeto (4 workers gevent) e mede,
+por worker, o tempo entre o fork e o worker ficar pronto para atender
+(hook post_worker_init). Mede também o tempo de carga no master e o tempo
+até todos os workers estarem prontos.
+
+Uso: python benchmarks/bench_cold_start.py [--runs 3] [--app-dir DIR]
+
+--app-dir permite medir outra cópia do projeto (ex.: um `git worktree` de
+uma revisão anterior) com a mesma metodologia.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CONFIG_TEMPLATE = '''
+import os, time
+_config_loaded = time.perf_counter()
+_base = os.path.join({app_dir!r}, 'gunicorn.conf.py')
+exec(compile(open(_base).read(), _base, 'exec'))
+bind = '127.0.0.1:{port}'
+workers = {workers}
+
+def _record(line):
+    with open({output!r}, 'a') as f:
+        f.write(line + '\\n')
+
+def when_ready(server):
+    _record(f'master {{time.perf_counter() - _config_loaded}}')
+
+def pre_fork(server, worker):
+    worker.cold_start_began = time.perf_counter()
+
+def post_worker_init(worker):
+    _record(f'worker {{time.perf_counter() - worker.cold_start_began}}')
+'''
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def run_once(app_dir, preload, workers):
+    output = tempfile.mktemp(suffix='.log')
+    port = free_port()
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as config:
+        config.write(CONFIG_TEMPLATE.format(app_dir=app_dir, port=port, workers=workers, output=output))
+
+    env = dict(os.environ,
+               GUNICORN_PRELOAD='1' if preload else '0',
+               JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'),
+               PYTHONPATH=app_dir)
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config.name, 'app:app'],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        lines = []
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            if os.path.exists(output):
+                with open(output) as f:
+                    lines = f.read().split('\n')
+            if sum(1 for line in lines if line.startswith('worker')) >= workers:
+                break
+            if server.poll() is not None:
+                raise RuntimeError('gunicorn terminou antes dos workers ficarem prontos')
+            time.sleep(0.01)
+        all_ready = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(config.name)
+        if os.path.exists(output):
+            os.remove(output)
+
+    worker_times = [float(line.split()[1]) for line in lines if line.startswith('worker')]
+    master = [float(line.split()[1]) for line in lines if line.startswith('master')]
+    return worker_times, (master[0] if master else None), all_ready
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    # Banco temporário, a não ser que DATABASE_URL já aponte para um
+    directory = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(directory, 'cold_start.db')}")
+
+    # Migrações fora dos workers, uma vez, como no deploy
+    subprocess.run([sys.executable, 'init_db.py'], cwd=app_dir, check=True, capture_output=True)
+
+    report = {'app_dir': app_dir, 'workers': args.workers, 'modes': {}}
+    for name, preload in (('no_preload', False), ('preload', True)):
+        worker_times, master_times, ready_times = [], [], []
+        for _ in range(args.runs):
+            workers, master, ready = run_once(app_dir, preload, args.workers)
+            worker_times.extend(workers)
+            ready_times.append(ready)
+            if master is not None:
+                master_times.append(master)
+        report['modes'][name] = {
+            'per_worker_p50_ms': round(statistics.median(worker_times) * 1000, 1),
+            'per_worker_max_ms': round(max(worker_times) * 1000, 1),
+            'master_ready_ms': round(statistics.median(master_times) * 1000, 1) if master_times else None,
+            'all_workers_ready_ms': round(statistics.median(ready_times) * 1000, 1)
+        }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
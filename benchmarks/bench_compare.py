@@ -0,0 +1,58 @@
+"""Compara dois relatórios do bench_load.py (antes e depois), cenário a cenário.
+
+Imprime um JSON com os valores de cada lado e a variação (%) da vazão e dos
+percentis. Sai com código 1 se algum cenário piorou além de --threshold
+(queda de req/s ou aumento do p95) ou passou a ter erros, para uso em CI.
+
+Uso: python benchmarks/bench_compare.py antes.json depois.json [--threshold 10]
+"""
+import sys
+import json
+import argparse
+
+METRICS = ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms')
+
+def change(before, after):
+    if not before:
+        return None
+    return round((after - before) / before * 100, 1)
+
+def compare(before, after, threshold):
+    scenarios, regressions = {}, []
+    for name in before['scenarios'].keys() & after['scenarios'].keys():
+        old, new = before['scenarios'][name], after['scenarios'][name]
+        entry = {metric: {'before': old[metric], 'after': new[metric], 'change_pct': change(old[metric], new[metric])}
+                 for metric in METRICS}
+        entry['errors'] = {'before': old['errors'], 'after': new['errors']}
+        scenarios[name] = entry
+
+        throughput = entry['requests_per_second']['change_pct']
+        p95 = entry['p95_ms']['change_pct']
+        if (throughput is not None and throughput < -threshold) or (p95 is not None and p95 > threshold) \
+                or (new['errors'] and not old['errors']):
+            regressions.append(name)
+    return {
+        'before': before.get('revision'),
+        'after': after.get('revision'),
+        'threshold_pct': threshold,
+        'regressions': sorted(regressions),
+        'scenarios': dict(sorted(scenarios.items()))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='piora tolerada (%%) em req/s e p95')
+    args = parser.parse_args()
+
+    with open(args.before) as file:
+        before = json.load(file)
+    with open(args.after) as file:
+        after = json.load(file)
+    result = compare(before, after, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result['regressions'] else 0)
+
+if __name__ == '__main__':
+    main()
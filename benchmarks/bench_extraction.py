@@ -0,0 +1,119 @@
+"""Latência do /history enquanto PDFs grandes são extraídos no mesmo worker gevent.
+
+Roda o app em um servidor gevent (mesmo modelo do worker do gunicorn) duas
+vezes: com a extração no próprio processo (EXTRACTION_PROCESSES=0) e com o
+pool de processos. Imprime um JSON com a latência do /history em cada modo.
+
+Uso: python benchmarks/bench_extraction.py [--pages 150] [--uploads 4]
+
+Cada modo usa um banco SQLite temporário (DATABASE_URL).
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies):
+    return {
+        'samples': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2)
+    }
+
+def run_child(args):
+    from gevent import monkey
+    monkey.patch_all()
+
+    import time
+    import gevent
+    import requests
+    from gevent.pywsgi import WSGIServer
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(__file__))
+    from synthetic import make_pdf
+    from app import app
+    from models import db, Subscription
+
+    server = WSGIServer(('127.0.0.1', 0), app, log=None)
+    server.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    session = requests.Session()
+    credentials = {'email': 'bench@example.com', 'password': 'bench123'}
+    # O banco não é mais recriado a cada início; o usuário pode já existir
+    if session.post(f'{base_url}/auth/register', json=credentials).status_code != 200:
+        session.post(f'{base_url}/auth/login', json=credentials)
+    with app.app_context():
+        subscription = Subscription.query.first()
+        subscription.plan_type = 'business'
+        db.session.commit()
+
+    pdf = make_pdf(args.pages)
+
+    def upload():
+        session.post(f'{base_url}/analyze', data={'job_description': 'python'},
+                     files={'cv_file': ('cv.pdf', pdf, 'application/pdf')})
+
+    # Aquecimento: sobe os processos do pool antes de medir
+    upload()
+
+    latencies = []
+    started = time.perf_counter()
+    uploads = [gevent.spawn(upload) for _ in range(args.uploads)]
+    while not all(g.ready() for g in uploads):
+        t0 = time.perf_counter()
+        session.get(f'{base_url}/history')
+        latencies.append(time.perf_counter() - t0)
+        gevent.sleep(0.02)
+    elapsed = time.perf_counter() - started
+
+    server.stop()
+    result = summarize(latencies)
+    result['uploads_elapsed_s'] = round(elapsed, 2)
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=150)
+    parser.add_argument('--uploads', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    report = {'pages': args.pages, 'uploads': args.uploads, 'modes': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, processes in (('inline', 0), ('process_pool', args.processes)):
+            env = dict(os.environ,
+                       EXTRACTION_PROCESSES=str(processes),
+                       EXTRACTION_MAX_PAGES=str(args.pages),
+                       JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'),
+                       AUTO_MIGRATE='1',
+                       DATABASE_URL=f"sqlite:///{os.path.join(directory, name + '.db')}",
+                       # LLM inacessível: a análise falha rápido e só a extração pesa
+                       OPENAI_API_BASE='http://127.0.0.1:9/v1')
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--pages', str(args.pages), '--uploads', str(args.uploads)],
+                env=env, cwd=ROOT, check=True, capture_output=True, text=True
+            ).stdout
+            report['modes'][name] = json.loads(output.strip().splitlines()[-1])
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Latência do /history sobre uma tabela analysis grande, com e sem o índice do histórico.
+
+Cria um banco SQLite temporário pelas migrações, semeia a tabela analysis com
+milhões de linhas de muitos usuários intercaladas (como numa base real) e
+mede, para um usuário com histórico longo:
+
+- antes: a consulta antiga (entidades completas, sem índice, só as 10 últimas);
+- depois: history_page (projeção de colunas + índice), a primeira página e uma
+  página profunda via cursor, comparada com a mesma página via OFFSET.
+
+Uso: python benchmarks/bench_history.py [--rows 2000000] [--users 20000] [--user-rows 5000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def seed(db_path, args):
+    random.seed(42)
+    feedback = 'Feedback detalhado da análise. ' * (args.feedback_size // 31 + 1)
+    job_description = 'Vaga para desenvolvedor Python com Flask e Docker. ' * (args.job_size // 52 + 1)
+    start = datetime(2023, 1, 1)
+    # O usuário medido tem user_rows linhas espalhadas pela tabela inteira
+    target_every = max(args.rows // args.user_rows, 1)
+
+    def rows():
+        for i in range(args.rows):
+            user_id = 1 if i % target_every == 0 else random.randint(2, args.users)
+            created_at = start + timedelta(seconds=i * 7)
+            yield (user_id, f'cv_{i}.pdf', job_description[:args.job_size], random.uniform(0, 100),
+                   feedback[:args.feedback_size], created_at.strftime('%Y-%m-%d %H:%M:%S.%f'), 1, 900, 600)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    batch = []
+    for row in rows():
+        batch.append(row)
+        if len(batch) == 50000:
+            conn.executemany(
+                'INSERT INTO analysis (user_id, cv_filename, job_description, similarity_score, feedback, '
+                'created_at, using_ai, tokens_original, tokens_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany(
+            'INSERT INTO analysis (user_id, cv_filename, job_description, similarity_score, feedback, '
+            'created_at, using_ai, tokens_original, tokens_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--user-rows', type=int, default=5000, help='linhas do usuário medido')
+    parser.add_argument('--feedback-size', type=int, default=400)
+    parser.add_argument('--job-size', type=int, default=200)
+    parser.add_argument('--page', type=int, default=50, help='página profunda medida (10 itens por página)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'history.db')
+    os.environ.update(DATABASE_URL=f'sqlite:///{db_path}', AUTO_MIGRATE='1',
+                      JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'))
+    sys.path.insert(0, ROOT)
+    from app import app, history_page, decode_history_cursor, HISTORY_COLUMNS
+    from sqlalchemy import tuple_
+    from models import db, Analysis, analysis_history_index
+
+    report = {'rows': args.rows, 'user_rows': args.user_rows, 'page': args.page}
+    with app.app_context():
+        analysis_history_index.drop(bind=db.engine)
+        db.session.remove()
+
+        started = time.perf_counter()
+        seed(db_path, args)
+        report['seed_s'] = round(time.perf_counter() - started, 1)
+        report['db_size_mb'] = round(os.path.getsize(db_path) / 2 ** 20, 1)
+
+        def old_query():
+            Analysis.query.filter_by(user_id=1).order_by(Analysis.created_at.desc()).limit(10).all()
+            db.session.remove()
+
+        def first_page():
+            history_page(1, limit=10)
+            db.session.remove()
+
+        report['before_no_index_ms'] = timed(old_query, args.repeat)
+        report['projection_no_index_ms'] = timed(first_page, args.repeat)
+
+        started = time.perf_counter()
+        analysis_history_index.create(bind=db.engine)
+        report['create_index_s'] = round(time.perf_counter() - started, 1)
+
+        report['old_query_with_index_ms'] = timed(old_query, args.repeat)
+        report['first_page_ms'] = timed(first_page, args.repeat)
+
+        # Cursor da página profunda, obtido percorrendo as páginas uma vez
+        cursor = None
+        for _ in range(args.page - 1):
+            _, cursor = history_page(1, cursor, limit=10)
+        db.session.remove()
+
+        def keyset_page():
+            history_page(1, cursor, limit=10)
+            db.session.remove()
+
+        def offset_page():
+            db.session.query(Analysis).filter_by(user_id=1)\
+                .order_by(Analysis.created_at.desc(), Analysis.id.desc())\
+                .offset((args.page - 1) * 10).limit(10).all()
+            db.session.remove()
+
+        report['deep_page_keyset_ms'] = timed(keyset_page, args.repeat)
+        report['deep_page_offset_ms'] = timed(offset_page, args.repeat)
+
+        # Plano da consulta de uma página via cursor, como history_page a monta
+        created_at, analysis_id = decode_history_cursor(cursor)
+        plan_query = db.session.query(*HISTORY_COLUMNS).filter(Analysis.user_id == 1)\
+            .filter(tuple_(Analysis.created_at, Analysis.id) < tuple_(created_at, analysis_id))\
+            .order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(11)
+        compiled = plan_query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        with db.engine.connect() as conn:
+            report['query_plan'] = [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}')]
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
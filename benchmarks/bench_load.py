@@ -0,0 +1,328 @@
+"""Teste de carga reprodutível: vazão e latência (p50/p95/p99) por rota no gunicorn do projeto.
+
+Sobe o gunicorn com o gunicorn.conf.py do projeto (workers gevent) sobre um
+banco semeado (usuários dos três planos, cada um com histórico), com
+servidores falsos no lugar da OpenAI (OPENAI_API_BASE), do Ollama
+(OLLAMA_URL) e do Stripe (STRIPE_API_BASE), cada um com latência
+configurável. Cada cenário roda por --duration segundos com --concurrency
+clientes em paralelo, cada um logado com a própria sessão keep-alive.
+
+O relatório sai em JSON, com a revisão do git, para comparar commits com
+bench_compare.py. As análises usam sempre uma descrição de vaga nova, para
+não cair no cache de resultados. Nos cenários analyze_document* o CV sobe
+uma vez por /documents/uploads e as análises só mandam o document_id. O
+cliente roda na mesma máquina que o servidor: os números só são
+comparáveis entre execuções na mesma máquina.
+
+Uso: python benchmarks/bench_load.py [--duration 10] [--concurrency 16] [--scenarios history,analyze]
+                                     [--output load.json] [--app-dir DIR]
+
+--app-dir permite medir outra cópia do projeto (ex.: um `git worktree` de
+uma revisão anterior); o banco é semeado pelos models dessa cópia.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+from stubs import StubOpenAI, StubOllama, StubStripe
+from synthetic import PLANS, make_pdf, make_docx, paragraph, seed_database
+from bench_cold_start import free_port
+from bench_quota import wait_until_up
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PASSWORD = 'bench123'
+WEBHOOK_SECRET = 'whsec_bench'
+
+class Client:
+    """Um usuário logado, com sessão HTTP própria e o id de algumas análises do histórico."""
+
+    def __init__(self, base_url, email, token, customer, analysis_ids, documents, seed):
+        self.base_url = base_url
+        self.email = email
+        self.customer = customer
+        self.analysis_ids = analysis_ids
+        self.documents = documents
+        self.rng = random.Random(seed)
+        self.document_ids = {}
+        self.session = requests.Session()
+        self.session.cookies.set('token', token)
+
+    def get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.session.post(self.base_url + path, **kwargs)
+
+    def analysis_form(self):
+        # Vaga única por requisição: cada análise chega ao provedor de LLM
+        return {
+            'cv_text': self.documents['cv_text'],
+            'job_description': f"{self.documents['job_description']} Requisição {self.rng.getrandbits(64):x}."
+        }
+
+def upload(client, name, content_type):
+    return client.post('/analyze', data=client.analysis_form(),
+                       files={'cv_file': (name, client.documents[name], content_type)})
+
+def analyze_document(name):
+    """Análise de um CV enviado antes por /documents/uploads: o arquivo sobe uma vez por cliente."""
+    def request(client):
+        if name not in client.document_ids:
+            client.document_ids[name] = upload_document(client, name)
+        return client.post('/analyze', data={
+            'document_id': client.document_ids[name],
+            'job_description': client.analysis_form()['job_description']
+        })
+    return request
+
+def upload_document(client, name, chunk_size=1024 * 1024):
+    content = client.documents[name]
+    upload = client.post('/documents/uploads', json={
+        'filename': name, 'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()
+    }).json()
+    while 'document' not in upload:
+        offset = upload['offset']
+        upload = client.session.put(client.base_url + upload['upload_url'], data=content[offset:offset + chunk_size],
+                                    headers={'Upload-Offset': str(offset)}).json()
+    return upload['document']['id']
+
+def analyze_stream(client):
+    response = client.post('/analyze/stream', data=client.analysis_form(), stream=True)
+    for _ in response.iter_content(chunk_size=None):
+        pass
+    return response
+
+def stripe_webhook(client):
+    payload = json.dumps({
+        'id': f'evt_{client.rng.getrandbits(48):x}',
+        'type': 'customer.subscription.updated',
+        'data': {'object': {'customer': client.customer, 'status': 'active'}}
+    })
+    return client.post('/subscription/webhook', data=payload, headers={
+        'Content-Type': 'application/json',
+        'Stripe-Signature': StubStripe.sign_webhook(payload, WEBHOOK_SECRET)
+    })
+
+# Cenário -> (plano dos usuários, uma requisição)
+SCENARIOS = {
+    'index': ('free', lambda client: client.get('/')),
+    'login': ('free', lambda client: client.post('/auth/login', json={'email': client.email, 'password': PASSWORD})),
+    'me': ('premium', lambda client: client.get('/auth/me')),
+    'history': ('premium', lambda client: client.get('/history')),
+    'history_detail': ('premium', lambda client: client.get(f'/history/{client.rng.choice(client.analysis_ids)}')),
+    'analyze_keywords': ('free', lambda client: client.post('/analyze', data=client.analysis_form())),
+    'analyze': ('premium', lambda client: client.post('/analyze', data=client.analysis_form())),
+    'analyze_pdf': ('premium', lambda client: upload(client, 'cv.pdf', 'application/pdf')),
+    'analyze_pdf_large': ('premium', lambda client: upload(client, 'cv_large.pdf', 'application/pdf')),
+    'analyze_docx': ('premium', lambda client: upload(
+        client, 'cv.docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')),
+    'analyze_document': ('premium', analyze_document('cv.pdf')),
+    'analyze_document_large': ('premium', analyze_document('cv_large.pdf')),
+    'analyze_stream': ('premium', analyze_stream),
+    'subscribe': ('free', lambda client: client.post('/subscription/subscribe', json={'plan': 'premium'})),
+    'stripe_webhook': ('premium', stripe_webhook),
+}
+
+def percentile(ordered, pct):
+    """Percentil pelo posto mais próximo, sobre uma lista já ordenada."""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+    return {
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'errors': errors,
+        'statuses': dict(sorted(statuses.items())),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(latencies[-1], 1)
+    }
+
+def run_scenario(clients, request, duration, warmup):
+    """Cada cliente repete a requisição sem pausa até o prazo; o aquecimento não entra na conta."""
+    def loop(client, until):
+        samples = []
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            try:
+                status = request(client).status_code
+            except requests.RequestException:
+                status = 'error'
+            samples.append(((time.perf_counter() - started) * 1000, status))
+        return samples
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        until = time.perf_counter() + warmup
+        list(pool.map(lambda client: loop(client, until), clients))
+        started = time.perf_counter()
+        until = started + duration
+        results = list(pool.map(lambda client: loop(client, until), clients))
+        elapsed = time.perf_counter() - started
+    return summarize([sample for samples in results for sample in samples], elapsed)
+
+def git_revision(app_dir):
+    result = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=app_dir,
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+def seed(app_dir, database_url, users, history):
+    """Migra e semeia o banco importando o app da cópia medida."""
+    os.environ.update(DATABASE_URL=database_url, AUTO_MIGRATE='1',
+                      JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'))
+    sys.path.insert(0, app_dir)
+    from app import app, db
+    with app.app_context():
+        emails = seed_database(users=users, analyses_per_user=history, password=PASSWORD)
+        db.engine.dispose()
+    return emails
+
+def login(base_url, email):
+    """Token de sessão do usuário e os ids das suas análises mais recentes."""
+    session = requests.Session()
+    session.post(f'{base_url}/auth/login', json={'email': email, 'password': PASSWORD})
+    token = session.cookies['token']
+    page = session.get(f'{base_url}/history', params={'limit': 100}).json()
+    return token, [item['id'] for item in page] or [0]
+
+def start_gunicorn(app_dir, env, workers=None):
+    """Sobe o gunicorn do projeto (gunicorn.conf.py de app_dir) na porta env['PORT']."""
+    command = [sys.executable, '-m', 'gunicorn', 'app:app']
+    if workers:
+        command[3:3] = ['-w', str(workers)]
+    server = subprocess.Popen(command, cwd=app_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{env['PORT']}"
+    try:
+        wait_until_up(base_url, server)
+    except Exception:
+        server.terminate()
+        raise
+    return server, base_url
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10, help='duração (s) de cada cenário')
+    parser.add_argument('--warmup', type=float, default=2, help='aquecimento (s) antes de cada cenário')
+    parser.add_argument('--concurrency', type=int, default=16, help='clientes simultâneos')
+    parser.add_argument('--workers', type=int, help='workers do gunicorn (padrão: gunicorn.conf.py)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='cenários, separados por vírgula')
+    parser.add_argument('--users', type=int, default=48, help='usuários semeados (divididos entre os planos)')
+    parser.add_argument('--history', type=int, default=100, help='análises semeadas por usuário')
+    parser.add_argument('--openai-latency', type=float, default=0.5)
+    parser.add_argument('--ollama-latency', type=float, default=0.5)
+    parser.add_argument('--stripe-latency', type=float, default=0.1)
+    parser.add_argument('--token-delay', type=float, default=0.01, help='intervalo (s) entre tokens no streaming')
+    parser.add_argument('--pdf-pages', type=int, default=2)
+    parser.add_argument('--large-pdf-pages', type=int, default=40)
+    parser.add_argument('--docx-paragraphs', type=int, default=30)
+    parser.add_argument('--database-url', help='banco já vazio a usar (padrão: SQLite temporário)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='grava o relatório JSON também neste arquivo')
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(args.seed)
+    documents = {
+        'cv_text': '\n'.join(paragraph(rng, 60) for _ in range(8)),
+        'job_description': paragraph(rng, 120),
+        'cv.pdf': make_pdf(args.pdf_pages, seed=args.seed),
+        'cv_large.pdf': make_pdf(args.large_pdf_pages, seed=args.seed),
+        'cv.docx': make_docx(args.docx_paragraphs, seed=args.seed)
+    }
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    started = time.perf_counter()
+    emails = seed(app_dir, database_url, args.users, args.history)
+    seed_s = time.perf_counter() - started
+
+    openai_stub = StubOpenAI(latency=args.openai_latency, token_delay=args.token_delay).start()
+    ollama_stub = StubOllama(latency=args.ollama_latency, token_delay=args.token_delay).start()
+    stripe_stub = StubStripe(latency=args.stripe_latency).start()
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               AUTO_MIGRATE='0',
+               PORT=str(port),
+               REQUEST_LOG='0',
+               LLM_PROVIDERS='openai,ollama',
+               OPENAI_API_KEY='sk-bench',
+               OPENAI_API_BASE=openai_stub.url,
+               OLLAMA_URL=ollama_stub.url,
+               STRIPE_SECRET_KEY='sk_test_bench',
+               STRIPE_API_BASE=stripe_stub.url,
+               STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+               STRIPE_PRICE_PREMIUM='price_premium',
+               STRIPE_PRICE_BUSINESS='price_business')
+
+    report = {
+        'revision': git_revision(app_dir),
+        'app_dir': app_dir,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'users': args.users,
+        'history_per_user': args.history,
+        'stub_latency_s': {'openai': args.openai_latency, 'ollama': args.ollama_latency,
+                           'stripe': args.stripe_latency, 'token_delay': args.token_delay},
+        'documents_bytes': {name: len(content) for name, content in documents.items()
+                            if isinstance(content, bytes)},
+        'seed_s': round(seed_s, 1),
+        'scenarios': {}
+    }
+    server, base_url = start_gunicorn(app_dir, env, args.workers)
+    try:
+        logins = {}
+        for name in scenarios:
+            plan, request = SCENARIOS[name]
+            # Os usuários semeados alternam entre os planos, na ordem de PLANS
+            pool = [index for index in range(len(emails)) if index % len(PLANS) == PLANS.index(plan)]
+            clients = []
+            for number in range(args.concurrency):
+                index = pool[number % len(pool)]
+                if index not in logins:
+                    logins[index] = login(base_url, emails[index])
+                token, analysis_ids = logins[index]
+                clients.append(Client(base_url, emails[index], token, f'cus_load{index}', analysis_ids,
+                                      documents, seed=args.seed + number))
+            report['scenarios'][name] = {'plan': plan, **run_scenario(clients, request, args.duration, args.warmup)}
+
+        report['stub_requests'] = {'openai': openai_stub.requests, 'ollama': ollama_stub.requests,
+                                   'stripe': stripe_stub.requests}
+    finally:
+        server.terminate()
+        server.wait()
+        for stub in (openai_stub, ollama_stub, stripe_stub):
+            stub.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Vazão de login e latência do /history concorrente durante uma rajada de logins.
+
+Sobe o gunicorn com o gunicorn.conf.py do projeto (workers gevent) sobre um
+banco SQLite temporário, cadastra alguns usuários e mede a latência do
+/history de um usuário logado, primeiro com o servidor ocioso e depois
+enquanto várias threads fazem login em sequência (bcrypt a cada login).
+
+Uso: python benchmarks/bench_login.py [--workers 1] [--logins 16] [--duration 5] [--app-dir DIR]
+
+--app-dir permite medir outra cópia do projeto (ex.: um `git worktree` de
+uma revisão anterior) com a mesma metodologia.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_cold_start import free_port
+from bench_quota import wait_until_up
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    return {
+        'requests': len(samples),
+        'p50_ms': round(statistics.median(samples), 1),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 1),
+        'max_ms': round(samples[-1], 1)
+    }
+
+def probe_history(base_url, token, stop, interval=0.02):
+    samples = []
+    session = requests.Session()
+    session.cookies.set('token', token)
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.get(f'{base_url}/history')
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--logins', type=int, default=16, help='threads fazendo login em sequência')
+    parser.add_argument('--duration', type=float, default=5, help='duração (s) de cada fase')
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    directory = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(directory, 'login.db')}",
+               AUTO_MIGRATE='1',
+               JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'),
+               PORT=str(port))
+    subprocess.run([sys.executable, 'init_db.py'], cwd=app_dir, env=env, check=True, capture_output=True)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-w', str(args.workers), 'app:app'],
+                              cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    report = {'app_dir': app_dir, 'workers': args.workers, 'login_threads': args.logins}
+    try:
+        wait_until_up(base_url, server)
+        credentials = [(f'user{i}@example.com', 'bench123') for i in range(args.logins)]
+        for email, password in credentials:
+            requests.post(f'{base_url}/auth/register', json={'email': email, 'password': password})
+        token = requests.post(f'{base_url}/auth/login', json={
+            'email': credentials[0][0], 'password': credentials[0][1]
+        }).cookies['token']
+
+        def run_probe(with_logins):
+            stop = threading.Event()
+            logins = []
+
+            def login_loop(email, password):
+                session = requests.Session()
+                while not stop.is_set():
+                    response = session.post(f'{base_url}/auth/login', json={'email': email, 'password': password})
+                    if response.status_code == 200:
+                        logins.append(1)
+
+            threads = [threading.Thread(target=login_loop, args=credential)
+                       for credential in (credentials if with_logins else [])]
+            for thread in threads:
+                thread.start()
+            timer = threading.Timer(args.duration, stop.set)
+            timer.start()
+            samples = probe_history(base_url, token, stop)
+            for thread in threads:
+                thread.join()
+            return samples, len(logins)
+
+        idle, _ = run_probe(False)
+        busy, logins = run_probe(True)
+        report['history_idle'] = latency_summary(idle)
+        report['history_during_logins'] = latency_summary(busy)
+        report['logins_per_second'] = round(logins / args.duration, 1)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Custo da instrumentação (métricas + log por requisição) no caminho quente.
+
+Roda o app em processo, sobre um banco SQLite temporário, com a
+instrumentação ligada e desligada (METRICS_ENABLED) em processos separados,
+alternando as rodadas. Mede o tempo médio por requisição do /history e do
+/analyze (plano gratuito: análise local por palavras-chave, sem LLM, para o
+custo fixo da requisição não ficar escondido atrás da latência de um modelo).
+
+A diferença ponta a ponta fica perto do ruído da máquina, então o custo dos
+hooks também é medido isoladamente: início e fim da requisição (histogramas,
+contadores e a linha de log), duas consultas contadas e três etapas.
+
+Uso: python benchmarks/bench_metrics.py [--requests 1000] [--rounds 5]
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROUTES = ['/history', '/analyze']
+
+def run_worker(requests_per_route):
+    sys.path.insert(0, ROOT)
+    from app import app
+    app.logger.disabled = True
+    client = app.test_client()
+    client.post('/auth/register', json={'email': 'metrics@example.com', 'password': 'bench123'})
+    with sqlite3.connect(os.environ['DATABASE_URL'][len('sqlite:///'):]) as conn:
+        conn.execute('UPDATE subscription SET remaining_analyses = 1000000000')
+
+    form = {
+        'cv_text': 'Desenvolvedor Python com Flask, Docker, PostgreSQL e AWS. ' * 20,
+        'job_description': 'Vaga para desenvolvedor Python com Flask, Docker e Kubernetes. ' * 10
+    }
+    # close() encerra a medição da requisição, como o servidor WSGI faz ao terminar de enviar
+    calls = {
+        '/history': lambda: client.get('/history').close(),
+        '/analyze': lambda: client.post('/analyze', data=form).close()
+    }
+    result = {}
+    for route in ROUTES:
+        for _ in range(50):
+            calls[route]()
+        started = time.perf_counter()
+        for _ in range(requests_per_route):
+            calls[route]()
+        result[route] = (time.perf_counter() - started) / requests_per_route * 1e6
+    if os.environ['METRICS_ENABLED'] == '1':
+        result['hooks'] = hook_cost(app)
+    print(json.dumps(result))
+
+def hook_cost(app, iterations=5000):
+    """Custo (µs) da instrumentação de uma requisição típica, sem o resto da requisição."""
+    import metrics
+    responses = [app.response_class('[]', mimetype='application/json') for _ in range(iterations)]
+    with app.test_request_context('/history'):
+        started = time.perf_counter()
+        for response in responses:
+            metrics._start_request()
+            metrics._count_query(None, None, None, None, None, False)
+            metrics._count_query(None, None, None, None, None, False)
+            for stage in ('quota', 'analysis', 'db_commit'):
+                metrics.observe_stage(stage, 0.001)
+            metrics._finish_request(response).close()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+def run_mode(enabled, requests_per_route):
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, METRICS_ENABLED='1' if enabled else '0', AUTO_MIGRATE='1',
+               DATABASE_URL=f"sqlite:///{os.path.join(directory, 'metrics.db')}",
+               JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'))
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', '--requests', str(requests_per_route)],
+        env=env, cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='requisições por rota e rodada')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.requests)
+
+    hooks = []
+    samples = {True: {route: [] for route in ROUTES}, False: {route: [] for route in ROUTES}}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            result = run_mode(enabled, args.requests)
+            hooks.extend([result.pop('hooks')] if enabled else [])
+            for route, micros in result.items():
+                samples[enabled][route].append(micros)
+
+    hook_us = statistics.median(hooks)
+    report = {'requests_per_route': args.requests, 'rounds': args.rounds,
+              'hooks_per_request_us': round(hook_us, 1), 'routes': {}}
+    for route in ROUTES:
+        off = statistics.median(samples[False][route])
+        on = statistics.median(samples[True][route])
+        report['routes'][route] = {
+            'disabled_us': round(off, 1),
+            'enabled_us': round(on, 1),
+            'end_to_end_overhead_pct': round((on - off) / off * 100, 2),
+            'hook_overhead_pct': round(hook_us / off * 100, 2)
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
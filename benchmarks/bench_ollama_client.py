@@ -0,0 +1,141 @@
+"""Cliente do Ollama contra um servidor falso: conexões, latência, retentativas e timeouts.
+
+Compara requisições soltas (`requests.post`, uma conexão TCP por chamada)
+com o AIAnalyzer de sessão persistente e com o AsyncAIAnalyzer.
+
+Uso: python benchmarks/bench_ollama_client.py [--calls 200] [--concurrency 10]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import requests
+from stubs import StubOllama
+from ai_analyzer import AIAnalyzer, AsyncAIAnalyzer
+
+CV = 'Desenvolvedor Python com experiência em Flask, Docker e PostgreSQL.'
+JOB = 'Vaga para desenvolvedor backend Python com Flask e Docker.'
+
+def summarize(latencies, elapsed, connections):
+    latencies = sorted(latencies)
+    return {
+        'calls': len(latencies),
+        'calls_per_second': round(len(latencies) / elapsed),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'tcp_connections': connections
+    }
+
+def bench_plain(server, calls):
+    # Comportamento anterior: módulo requests sem sessão, uma conexão por chamada
+    start_connections = server.connections
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        began = time.perf_counter()
+        requests.post(f'{server.url}/generate', json={'model': 'mistral', 'prompt': CV, 'stream': False}).json()
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - started, server.connections - start_connections)
+
+def bench_session(server, calls):
+    analyzer = AIAnalyzer(base_url=server.url, cache=None)
+    start_connections = server.connections
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        began = time.perf_counter()
+        assert analyzer.analyze(CV, JOB)['success']
+        latencies.append(time.perf_counter() - began)
+    report = summarize(latencies, time.perf_counter() - started, server.connections - start_connections)
+    analyzer.close()
+    return report
+
+def bench_async(server, calls, concurrency):
+    async def run():
+        analyzer = AsyncAIAnalyzer(base_url=server.url, cache=None)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                began = time.perf_counter()
+                assert (await analyzer.analyze(CV, JOB))['success']
+                latencies.append(time.perf_counter() - began)
+
+        start_connections = server.connections
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(calls)))
+        report = summarize(latencies, time.perf_counter() - started, server.connections - start_connections)
+        await analyzer.close()
+        return report
+
+    return asyncio.run(run())
+
+def check_resilience(server):
+    analyzer = AIAnalyzer(base_url=server.url, cache=None, retries=2, backoff=0.05, read_timeout=0.5)
+    report = {}
+
+    server.fail_next = 2
+    report['retry_after_two_503'] = analyzer.analyze(CV, JOB)['success']
+
+    server.fail_next = 3
+    report['gives_up_after_retries'] = not analyzer.analyze(CV, JOB)['success']
+    server.fail_next = 0
+
+    server.latency = 2
+    began = time.perf_counter()
+    result = analyzer.analyze(CV, JOB)
+    report['read_timeout_s'] = round(time.perf_counter() - began, 2)
+    report['hung_model_fails_fast'] = not result['success']
+    server.latency = 0
+
+    requests_before = server.requests
+    for _ in range(100):
+        analyzer.is_available()
+    report['health_probes_for_100_checks'] = server.requests - requests_before
+
+    report['stream_text'] = ''.join(analyzer.analyze_stream(CV, JOB, use_cache=False))
+    analyzer.close()
+
+    async def async_checks():
+        client = AsyncAIAnalyzer(base_url=server.url, cache=None, retries=2, backoff=0.05)
+        server.fail_next = 2
+        ok = (await client.analyze(CV, JOB))['success']
+        chunks = [chunk async for chunk in client.analyze_stream(CV, JOB, use_cache=False)]
+        available = await client.is_available()
+        await client.close()
+        return ok, ''.join(chunks), available
+
+    ok, text, available = asyncio.run(async_checks())
+    report['async_retry_after_two_503'] = ok
+    report['async_stream_text'] = text
+    report['async_is_available'] = available
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    server = StubOllama().start()
+    try:
+        report = {
+            'plain_requests': bench_plain(server, args.calls),
+            'pooled_session': bench_session(server, args.calls),
+            'async_client': bench_async(server, args.calls, args.concurrency),
+            'resilience': check_resilience(server)
+        }
+    finally:
+        server.stop()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
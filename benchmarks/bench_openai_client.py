@@ -0,0 +1,173 @@
+"""Chamadas à OpenAI num único worker gevent: concorrência, prazo e cancelamento.
+
+Sobe o gunicorn do projeto com um worker e só a OpenAI como provedor,
+apontada para uma API falsa com latência configurável, e mede:
+
+- escala: vazão do /analyze com 1, 8, 32 e 64 clientes simultâneos, contra o
+  ideal (clientes / latência) de um worker que não trava na chamada, e as
+  conexões TCP abertas com a API;
+- cancelamento: clientes que desistem no meio da geração; conta as gerações
+  interrompidas na API e quanto tempo cada uma continuou depois da desistência;
+- prazo: com a API mais lenta que REQUEST_BUDGET, quanto tempo o /analyze
+  leva para responder e com que status.
+
+Com --app-dir apontando para uma revisão anterior (git worktree), mostra o
+comportamento antigo na mesma máquina.
+
+Uso: python benchmarks/bench_openai_client.py [--latency 1] [--levels 1,8,32,64] [--app-dir DIR]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+from stubs import StubOpenAI
+from synthetic import PLANS
+from bench_load import ROOT, Client, SCENARIOS, git_revision, login, run_scenario, seed, start_gunicorn
+from bench_cold_start import free_port
+
+CV = 'Desenvolvedor Python com experiência em Flask, Docker e PostgreSQL.'
+JOB = 'Vaga para desenvolvedor backend Python com Flask e Docker.'
+
+def make_client(base_url, tokens, number, name):
+    # Semente por teste e por cliente: cada análise usa uma vaga nova e não cai no cache
+    email, token, ids = tokens[number % len(tokens)]
+    return Client(base_url, email, token, None, ids, {'cv_text': CV, 'job_description': JOB},
+                  seed=f'{name}-{number}')
+
+def bench_scaling(base_url, stub, tokens, levels, duration, latency):
+    _, request = SCENARIOS['analyze']
+    results = {}
+    for level in levels:
+        connections = stub.connections
+        clients = [make_client(base_url, tokens, number, f'scaling{level}') for number in range(level)]
+        summary = run_scenario(clients, request, duration, warmup=latency)
+        results[str(level)] = {
+            'requests_per_second': summary['requests_per_second'],
+            'ideal_requests_per_second': round(level / latency, 1),
+            'p50_ms': summary['p50_ms'],
+            'p95_ms': summary['p95_ms'],
+            'statuses': summary['statuses'],
+            'upstream_connections': stub.connections - connections
+        }
+    return results
+
+def bench_deadline(base_url, stub, tokens, latency, calls):
+    previous, stub.latency = stub.latency, latency
+    try:
+        def call(number):
+            client = make_client(base_url, tokens, number, 'deadline')
+            started = time.perf_counter()
+            status = client.post('/analyze', data=client.analysis_form()).status_code
+            return time.perf_counter() - started, status
+
+        results = [None] * calls
+        threads = [threading.Thread(target=lambda number=number: results.__setitem__(number, call(number)))
+                   for number in range(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        stub.latency = previous
+    return {
+        'upstream_latency_s': latency,
+        'calls': calls,
+        'statuses': sorted({str(status) for _, status in results}),
+        'max_response_s': round(max(elapsed for elapsed, _ in results), 2)
+    }
+
+def bench_cancel(base_url, stub, tokens, give_up_after, calls, wait):
+    """Clientes que fecham a conexão depois de give_up_after segundos sem resposta."""
+    completed, aborted, aborted_at = stub.completed, stub.aborted, len(stub.aborted_at)
+    gave_up = []
+    lock = threading.Lock()
+
+    def call(number):
+        client = make_client(base_url, tokens, number, 'cancel')
+        try:
+            client.post('/analyze', data=client.analysis_form(), timeout=(5, give_up_after))
+        except requests.Timeout:
+            client.session.close()
+            with lock:
+                gave_up.append(time.monotonic())
+
+    threads = [threading.Thread(target=call, args=(number,)) for number in range(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Dá tempo para as gerações que não foram canceladas terminarem na API
+    time.sleep(wait)
+
+    lingering = [stopped - started for started, stopped in zip(sorted(gave_up), sorted(stub.aborted_at[aborted_at:]))]
+    return {
+        'calls': calls,
+        'clients_gave_up': len(gave_up),
+        'upstream_aborted': stub.aborted - aborted,
+        'upstream_completed': stub.completed - completed,
+        'upstream_open_after_disconnect_ms': round(statistics.median(lingering) * 1000, 1) if lingering else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=1.0, help='latência (s) da API falsa')
+    parser.add_argument('--levels', default='1,8,32,64', help='clientes simultâneos, separados por vírgula')
+    parser.add_argument('--duration', type=float, default=5, help='duração (s) de cada nível')
+    parser.add_argument('--budget', type=float, default=3, help='REQUEST_BUDGET (s) do app')
+    parser.add_argument('--slow-latency', type=float, default=6, help='latência (s) da API no teste de prazo')
+    parser.add_argument('--give-up-after', type=float, default=0.5, help='espera (s) do cliente que desiste')
+    parser.add_argument('--calls', type=int, default=8, help='chamadas dos testes de prazo e cancelamento')
+    parser.add_argument('--users', type=int, default=24)
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+    levels = [int(level) for level in args.levels.split(',') if level.strip()]
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'openai.db')}"
+    emails = seed(app_dir, database_url, args.users, history=1)
+    # Só usuários premium: o plano free não chama o LLM
+    emails = emails[PLANS.index('premium')::len(PLANS)]
+
+    stub = StubOpenAI(latency=args.latency).start()
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               AUTO_MIGRATE='0',
+               PORT=str(free_port()),
+               REQUEST_LOG='0',
+               REQUEST_BUDGET=str(args.budget),
+               LLM_PROVIDERS='openai',
+               OPENAI_API_KEY='sk-bench',
+               OPENAI_API_BASE=stub.url)
+    server, base_url = start_gunicorn(app_dir, env, workers=1)
+    try:
+        tokens = [(email, *login(base_url, email)) for email in emails]
+        report = {
+            'revision': git_revision(app_dir),
+            'workers': 1,
+            'request_budget_s': args.budget,
+            'upstream_latency_s': args.latency,
+            'scaling': bench_scaling(base_url, stub, tokens, levels, args.duration, args.latency)
+        }
+        # Geração longa (~2,5 s em tokens) para o cliente desistir no meio dela
+        stub.latency, stub.token_delay, response = 0.2, 0.05, stub.response
+        stub.response = ' '.join(['palavra'] * 50)
+        report['cancel'] = bench_cancel(base_url, stub, tokens, args.give_up_after, args.calls, wait=3)
+        stub.token_delay, stub.response = 0.0, response
+        # Por último: as chamadas lentas abandonadas ainda terminam na API depois da resposta 504
+        report['deadline'] = bench_deadline(base_url, stub, tokens, args.slow_latency, args.calls)
+    finally:
+        server.terminate()
+        server.wait()
+        stub.stop()
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
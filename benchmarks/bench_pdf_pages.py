@@ -0,0 +1,67 @@
+"""Extração de PDFs grandes: acumulação por concatenação x lista/join x páginas em paralelo.
+
+Gera PDFs sintéticos de 50/200/500 páginas e mede o tempo (mediana de
+--repeat execuções) de cada estratégia. Imprime um JSON.
+
+Uso: python benchmarks/bench_pdf_pages.py [--pages 50 200 500] [--processes 4]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import fitz  # PyMuPDF
+from synthetic import make_pdf
+import extraction
+
+def legacy_extract(source):
+    """Implementação anterior: `text +=` página a página, sem limite."""
+    text = ""
+    with fitz.open(stream=source, filetype='pdf') as pdf:
+        for page in pdf:
+            text += page.get_text()
+    return text.strip()
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-chars', type=int, default=20000,
+                        help='limite de caracteres da variante com parada antecipada')
+    args = parser.parse_args()
+
+    extraction.EXTRACTION_MAX_PAGES = 0
+    extraction.EXTRACTION_MAX_CHARS = 0
+    extraction.EXTRACTION_PARALLEL_MIN_PAGES = 1
+    pool = extraction.ExtractionPool(processes=args.processes, timeout=300)
+    pool.extract('pdf', make_pdf(args.processes))  # aquecimento: sobe todos os processos
+
+    report = {'cpus': os.cpu_count(), 'processes': args.processes, 'results': {}}
+    for pages in args.pages:
+        pdf = make_pdf(pages)
+        report['results'][pages] = {
+            'legacy_concat_ms': timed(lambda: legacy_extract(pdf), args.repeat),
+            'list_join_ms': timed(lambda: extraction.extract_text_from_pdf(pdf, 0, 0), args.repeat),
+            'page_parallel_ms': timed(lambda: pool.extract('pdf', pdf), args.repeat),
+            'early_stop_ms': timed(lambda: extraction.extract_text_from_pdf(pdf, 0, args.max_chars), args.repeat)
+        }
+
+    pool.close()
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
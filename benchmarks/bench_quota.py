@@ -0,0 +1,109 @@
+"""Teste de concorrência da cota: muitas análises simultâneas na mesma conta.
+
+Sobe o gunicorn com o gunicorn.conf.py do projeto (4 workers gevent) sobre
+um banco SQLite temporário, com um Ollama falso e lento como único LLM, e
+dispara requisições simultâneas de /analyze para uma conta premium com
+saldo pequeno. Confere que exatamente `quota` análises foram aceitas e
+gravadas e que o saldo terminou em zero, sem gasto além da cota.
+
+Uso: python benchmarks/bench_quota.py [--quota 10] [--requests 60] [--app-dir DIR]
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+from stubs import StubOllama
+from bench_cold_start import free_port
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def wait_until_up(base_url, server, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn terminou antes de atender')
+        try:
+            requests.get(f'{base_url}/', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn não respondeu a tempo')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quota', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.2, help='latência (s) do LLM falso')
+    parser.add_argument('--app-dir', default=ROOT)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    stub = StubOllama(latency=args.latency).start()
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'quota.db')
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{db_path}',
+               AUTO_MIGRATE='1',
+               JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'bench'),
+               LLM_PROVIDERS='ollama',
+               OLLAMA_URL=stub.url,
+               PORT=str(port))
+    subprocess.run([sys.executable, 'init_db.py'], cwd=app_dir, env=env, check=True, capture_output=True)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=app_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_up(base_url, server)
+        session = requests.Session()
+        session.post(f'{base_url}/auth/register', json={'email': 'quota@example.com', 'password': 'bench123'})
+        token = session.cookies['token']
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE subscription SET plan_type = 'premium', remaining_analyses = ?", (args.quota,))
+
+        def analyze(index):
+            response = requests.post(f'{base_url}/analyze', cookies={'token': token}, data={
+                'cv_text': f'Desenvolvedor Python com Flask e Docker ({index})',
+                'job_description': 'Vaga para desenvolvedor Python com Flask e Docker.',
+                'no_cache': '1'
+            })
+            return response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.requests) as executor:
+            statuses = list(executor.map(analyze, range(args.requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+        stub.stop()
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+        remaining = conn.execute('SELECT remaining_analyses FROM subscription').fetchone()[0]
+
+    accepted = statuses.count(200)
+    print(json.dumps({
+        'quota': args.quota,
+        'requests': args.requests,
+        'accepted': accepted,
+        'rejected_403': statuses.count(403),
+        'other_statuses': sorted(set(status for status in statuses if status not in (200, 403))),
+        'analysis_rows': rows,
+        'remaining_after': remaining,
+        'overspent': max(0, rows - args.quota),
+        'consistent': accepted == rows == args.quota and remaining == 0,
+        'elapsed_s': round(elapsed, 2)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Vazão do score local por palavras-chave (pares CV/vaga por segundo, um núcleo).
+
+Uso: python benchmarks/bench_scoring.py [--pairs 5000] [--jobs 20] [--cv-words 500]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from synthetic import paragraph
+from scoring import match_cv, _job_profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=5000)
+    parser.add_argument('--jobs', type=int, default=20, help='descrições de vaga distintas')
+    parser.add_argument('--cvs', type=int, default=500, help='CVs distintos')
+    parser.add_argument('--cv-words', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cvs = [paragraph(rng, args.cv_words) for _ in range(args.cvs)]
+    jobs = [paragraph(rng, 120) for _ in range(args.jobs)]
+    pairs = [(rng.choice(cvs), rng.choice(jobs)) for _ in range(args.pairs)]
+
+    report = {'pairs': args.pairs, 'cv_words': args.cv_words}
+    for name, clear_job_cache in (('cold_job_profiles', True), ('warm_job_profiles', False)):
+        started = time.perf_counter()
+        for cv_text, job_description in pairs:
+            if clear_job_cache:
+                _job_profile.cache_clear()
+            match_cv(cv_text, job_description)
+        elapsed = time.perf_counter() - started
+        report[name] = {
+            'pairs_per_second': round(args.pairs / elapsed),
+            'mean_ms': round(elapsed / args.pairs * 1000, 3)
+        }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
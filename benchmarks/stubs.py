@@ -0,0 +1,272 @@
+"""Servidores falsos dos serviços externos, usados pelos benchmarks."""
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import threading
+from urllib.parse import parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que o cliente possa reaproveitar a conexão (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalho e corpo saem em escritas separadas; sem isso o Nagle soma ~40 ms por resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _should_fail(self):
+        with self.server.lock:
+            self.server.requests += 1
+            if self.server.fail_next > 0:
+                self.server.fail_next -= 1
+                return True
+        return False
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b'0\r\n\r\n')
+
+class _StubServer(ThreadingHTTPServer):
+    """Base dos servidores falsos: porta livre em 127.0.0.1, uma thread por conexão.
+
+    latency atrasa cada resposta, fail_next faz as próximas N requisições
+    responderem 503 e connections conta as conexões TCP aceitas.
+    """
+
+    daemon_threads = True
+    # Rajadas de conexões simultâneas nos testes de carga
+    request_queue_size = 128
+
+    def __init__(self, handler, latency=0.0):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.fail_next = 0
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class _OllamaHandler(_JSONHandler):
+    def do_GET(self):
+        if self._should_fail():
+            return self._send_json(503, {'error': 'unavailable'})
+        if self.path.endswith('/tags'):
+            return self._send_json(200, {'models': [{'name': 'mistral'}]})
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        payload = json.loads(self._read_body() or b'{}')
+        if self._should_fail():
+            return self._send_json(503, {'error': 'unavailable'})
+        if not self.path.endswith('/generate'):
+            return self._send_json(404, {'error': 'not found'})
+
+        time.sleep(self.server.latency)
+        words = self.server.response.split(' ')
+        if not payload.get('stream'):
+            return self._send_json(200, {'model': payload.get('model'), 'response': self.server.response, 'done': True})
+
+        self._start_chunked('application/x-ndjson')
+        for index, word in enumerate(words):
+            text = word if index == len(words) - 1 else word + ' '
+            self._write_chunk(json.dumps({'response': text, 'done': False}) + '\n')
+            time.sleep(self.server.token_delay)
+        self._write_chunk(json.dumps({'response': '', 'done': True}) + '\n')
+        self._end_chunked()
+
+class StubOllama(_StubServer):
+    """Ollama falso: /api/tags e /api/generate (com e sem streaming)."""
+
+    def __init__(self, latency=0.0, token_delay=0.0, response='Análise do currículo gerada pelo modelo local.'):
+        super().__init__(_OllamaHandler, latency)
+        self.token_delay = token_delay
+        self.response = response
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/api'
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        payload = json.loads(self._read_body() or b'{}')
+        if self._should_fail():
+            return self._send_json(503, {'error': {'message': 'unavailable', 'type': 'server_error'}})
+        if not self.path.endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+
+        time.sleep(self.server.latency)
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        model = payload.get('model', 'gpt-3.5-turbo')
+        words = self.server.response.split(' ')
+        if not payload.get('stream'):
+            # Sem streaming a resposta só sai depois de gerar todos os tokens
+            time.sleep(self.server.token_delay * len(words))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': self.server.response},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+            return self.server.finished(aborted=False)
+
+        def event(delta, finish_reason=None):
+            return 'data: ' + json.dumps({
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }) + '\n\n'
+
+        self._start_chunked('text/event-stream')
+        try:
+            self._write_chunk(event({'role': 'assistant'}))
+            for index, word in enumerate(words):
+                text = word if index == len(words) - 1 else word + ' '
+                self._write_chunk(event({'content': text}))
+                time.sleep(self.server.token_delay)
+            self._write_chunk(event({}, 'stop'))
+            self._write_chunk('data: [DONE]\n\n')
+            self._end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente fechou a conexão no meio da geração
+            self.close_connection = True
+            return self.server.finished(aborted=True)
+        self.server.finished(aborted=False)
+
+class StubOpenAI(_StubServer):
+    """API da OpenAI falsa: /v1/chat/completions (com e sem streaming), para OPENAI_API_BASE.
+
+    Cada resposta leva latency mais token_delay por palavra. completed conta
+    as gerações entregues até o fim e aborted as interrompidas pelo cliente,
+    com o instante de cada interrupção em aborted_at (time.monotonic).
+    """
+
+    def __init__(self, latency=0.0, token_delay=0.0,
+                 response='✅ Pontos fortes do currículo\n• Experiência com Python e Flask\n\n'
+                          '⚠️ Pontos a melhorar\n• Detalhar resultados dos projetos'):
+        super().__init__(_OpenAIHandler, latency)
+        self.token_delay = token_delay
+        self.response = response
+        self.completed = 0
+        self.aborted = 0
+        self.aborted_at = []
+
+    def finished(self, aborted):
+        with self.lock:
+            if aborted:
+                self.aborted += 1
+                self.aborted_at.append(time.monotonic())
+            else:
+                self.completed += 1
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/v1'
+
+class _StripeHandler(_JSONHandler):
+    def _form(self):
+        """Corpo form-encoded do stripe-python, com metadata[chave]=valor desaninhado."""
+        fields = dict(parse_qsl(self._read_body().decode()))
+        metadata = {key[len('metadata['):-1]: value for key, value in fields.items() if key.startswith('metadata[')}
+        return fields, metadata
+
+    def do_POST(self):
+        fields, metadata = self._form()
+        if self._should_fail():
+            return self._send_json(503, {'error': {'message': 'unavailable', 'type': 'api_error'}})
+        time.sleep(self.server.latency)
+
+        if self.path == '/v1/customers':
+            return self._send_json(200, {
+                'id': f'cus_{uuid.uuid4().hex[:14]}', 'object': 'customer',
+                'email': fields.get('email'), 'metadata': metadata
+            })
+        if self.path == '/v1/checkout/sessions':
+            session_id = f'cs_test_{uuid.uuid4().hex[:24]}'
+            session = {
+                'id': session_id, 'object': 'checkout.session', 'customer': fields.get('customer'),
+                'mode': fields.get('mode'), 'metadata': metadata,
+                'subscription': f'sub_{uuid.uuid4().hex[:14]}',
+                'url': f'https://checkout.stripe.test/pay/{session_id}'
+            }
+            with self.server.lock:
+                self.server.sessions[session_id] = session
+            return self._send_json(200, session)
+        self._send_json(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+
+    def do_GET(self):
+        if self._should_fail():
+            return self._send_json(503, {'error': {'message': 'unavailable', 'type': 'api_error'}})
+        time.sleep(self.server.latency)
+        prefix = '/v1/checkout/sessions/'
+        if self.path.startswith(prefix):
+            session = self.server.sessions.get(self.path[len(prefix):].split('?')[0])
+            if session:
+                return self._send_json(200, session)
+        self._send_json(404, {'error': {'message': 'No such checkout.session', 'type': 'invalid_request_error'}})
+
+class StubStripe(_StubServer):
+    """API do Stripe falsa para STRIPE_API_BASE: clientes e sessões de checkout.
+
+    sign_webhook monta o cabeçalho Stripe-Signature que o /subscription/webhook
+    confere com STRIPE_WEBHOOK_SECRET.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(_StripeHandler, latency)
+        self.sessions = {}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    @staticmethod
+    def sign_webhook(payload, secret, timestamp=None):
+        timestamp = int(timestamp or time.time())
+        signed = f'{timestamp}.{payload}'.encode()
+        signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+        return f't={timestamp},v1={signature}'
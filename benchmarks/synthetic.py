@@ -0,0 +1,78 @@
+"""Geradores de documentos sintéticos para os benchmarks."""
+import io
+import random
+import fitz  # PyMuPDF
+from docx import Document
+
+WORDS = (
+    'python flask django sql postgres docker kubernetes aws react typescript '
+    'liderança comunicação equipe projeto desenvolvimento análise dados api '
+    'experiência graduação inglês agile scrum testes git linux cloud backend'
+).split()
+
+def paragraph(rng, words=80):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def make_pdf(pages, words_per_page=400, seed=42):
+    """Gera um PDF com `pages` páginas de texto, com cabeçalho e rodapé repetidos."""
+    rng = random.Random(seed)
+    pdf = fitz.open()
+    for number in range(1, pages + 1):
+        page = pdf.new_page()
+        page.insert_text((50, 40), 'Ana Silva - Currículo', fontsize=9)
+        body = '\n'.join(paragraph(rng, 20) for _ in range(words_per_page // 20))
+        page.insert_textbox(fitz.Rect(50, 60, 550, 780), body, fontsize=7)
+        page.insert_text((50, 810), f'Página {number} de {pages}', fontsize=9)
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+def make_docx(paragraphs, seed=42):
+    """Gera um DOCX com `paragraphs` parágrafos de texto."""
+    rng = random.Random(seed)
+    document = Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(paragraph(rng))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+PLANS = ('free', 'premium', 'business')
+
+def seed_database(users=50, analyses_per_user=100, password='bench123', seed=42):
+    """Semeia o banco do app (precisa de um app context) com usuários, assinaturas e histórico.
+
+    Os usuários loadN@example.com (cliente cus_loadN no Stripe) alternam entre
+    os planos, com saldo que não acaba durante o teste; todos usam a mesma
+    senha (um único hash bcrypt).
+    Retorna os e-mails criados.
+    """
+    from datetime import datetime, timedelta
+    from models import db, User, Subscription, JobDescription, Analysis, AnalysisDetail
+    from passwords import hash_password
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = hash_password(password)
+    jobs = [JobDescription(content_hash=JobDescription.hash_text(text), text=text)
+            for text in (paragraph(rng, 120) for _ in range(20))]
+    db.session.add_all(jobs)
+
+    emails = []
+    for index in range(users):
+        user = User(email=f'load{index}@example.com', password_hash=password_hash,
+                    stripe_customer_id=f'cus_load{index}')
+        user.subscription = Subscription(plan_type=PLANS[index % len(PLANS)], remaining_analyses=10 ** 9,
+                                         status='active', expires_at=now + timedelta(days=30))
+        db.session.add(user)
+        for position in range(analyses_per_user):
+            user.analyses.append(Analysis(
+                cv_filename=f'cv_{position}.pdf', job=rng.choice(jobs), similarity_score=rng.uniform(0, 100),
+                created_at=now - timedelta(minutes=analyses_per_user - position), using_ai=True,
+                tokens_original=900, tokens_sent=600,
+                detail=AnalysisDetail.from_feedback(paragraph(rng, 250))
+            ))
+        emails.append(user.email)
+        db.session.flush()
+    db.session.commit()
+    return emails
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from metrics import count_cache_lookup
+
+def normalize_text(text):
+    """Normaliza unicode e espaços para que variações triviais gerem a mesma chave."""
+    text = unicodedata.normalize('NFC', text or '')
+    return ' '.join(text.split())
+
+def make_cache_key(cv_text, job_description, model, temperature):
+    """Gera a chave de conteúdo (sha256) de uma análise."""
+    payload = '\x1f'.join([
+        normalize_text(cv_text),
+        normalize_text(job_description),
+        str(model),
+        str(temperature)
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SQLiteCacheTier:
+    """Camada compartilhada em disco, visível para todos os workers da máquina."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Conexão descartável: com preload do gunicorn, conexões abertas aqui seriam herdadas no fork
+        conn = sqlite3.connect(self.path, timeout=5)
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            # Locks das análises em andamento, usados pela coalescência entre workers
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS inflight (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)'
+            )
+        conn.close()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM result_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < time.time():
+            with self._connect() as conn:
+                conn.execute('DELETE FROM result_cache WHERE key = ?', (key,))
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time() + ttl)
+            )
+
+    def acquire_lock(self, key, ttl):
+        """Tenta pegar o lock da chave; locks expirados são descartados."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM inflight WHERE key = ? AND expires_at < ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO inflight (key, expires_at) VALUES (?, ?)', (key, now + ttl)
+            )
+            return cursor.rowcount == 1
+
+    def release_lock(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM inflight WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM result_cache')
+
+class ResultCache:
+    """Cache de resultados de análise: LRU em memória com TTL + camada SQLite opcional."""
+
+    def __init__(self, max_entries=1024, ttl=86400, shared_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = SQLiteCacheTier(shared_path) if shared_path else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv('RESULT_CACHE_SIZE', 1024)),
+            ttl=int(os.getenv('RESULT_CACHE_TTL', 86400)),
+            shared_path=os.getenv('RESULT_CACHE_DB') or None
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    count_cache_lookup('hit')
+                    return dict(value)
+                del self._entries[key]
+
+        value = self.shared.get(key) if self.shared else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                count_cache_lookup('miss')
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+        count_cache_lookup('shared_hit')
+        self._store(key, value, now)
+        return dict(value)
+
+    def set(self, key, value):
+        self._store(key, value, time.time())
+        if self.shared:
+            self.shared.set(key, value, self.ttl)
+
+    def _store(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.shared_hits = 0
+        if self.shared:
+            self.shared.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries)
+            }
+
+# Instância compartilhada pelo app e pelo AIAnalyzer
+result_cache = ResultCache.from_env()
@@ -0,0 +1,148 @@
+import os
+import re
+from collections import Counter
+
+try:
+    import tiktoken
+except ImportError:  # tokenizador opcional; sem ele usamos a estimativa local
+    tiktoken = None
+
+# Janela de contexto de cada modelo (tokens)
+MODEL_CONTEXT = {
+    'gpt-3.5-turbo': 4096,
+    'mistral': 8192
+}
+DEFAULT_CONTEXT = 4096
+# Tokens reservados para o texto fixo do prompt
+PROMPT_OVERHEAD = 200
+# Fração máxima do orçamento que a descrição da vaga pode ocupar
+JOB_DESCRIPTION_SHARE = 0.3
+
+PAGE_SEPARATOR = '\f'
+
+BOILERPLATE_PATTERNS = [
+    re.compile(r'^\s*(p[áa]gina|page|p\.)\s*\d+(\s*(de|of|/)\s*\d+)?\s*$', re.IGNORECASE),
+    re.compile(r'^\s*\d+\s*(/|de|of)\s*\d+\s*$', re.IGNORECASE),
+    re.compile(r'^\s*-?\s*\d+\s*-?\s*$'),
+    re.compile(r'^\s*(curr[íi]culo gerado (por|com)|generated (by|with))\b.*$', re.IGNORECASE),
+    re.compile(r'^\s*(confidencial|confidential)\s*$', re.IGNORECASE),
+]
+
+# Aproximação local da tokenização BPE: palavras, números e pontuação isolada
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# Palavras longas viram vários tokens; ~4 caracteres por token é a média do BPE
+CHARS_PER_TOKEN = 4
+
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+def count_tokens(text, model):
+    """Conta os tokens do texto com o tokenizador do modelo (ou uma estimativa local)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(max(1, -(-len(piece) // CHARS_PER_TOKEN)) for piece in TOKEN_PATTERN.findall(text))
+
+def truncate_to_tokens(text, max_tokens, model):
+    """Corta o texto para caber em max_tokens, preservando o início."""
+    if max_tokens <= 0:
+        return ''
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += max(1, -(-len(match.group()) // CHARS_PER_TOKEN))
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+def _line_signature(line):
+    # Números de página mudam entre páginas; o resto do cabeçalho/rodapé não
+    return re.sub(r'\d+', '#', ' '.join(line.split()).lower())
+
+def remove_repeated_headers(pages, edge_lines=3, min_share=0.5):
+    """Remove linhas que se repetem no topo/rodapé da maioria das páginas de um PDF."""
+    if len(pages) < 3:
+        return pages
+
+    split_pages = [[line for line in page.splitlines() if line.strip()] for page in pages]
+    counts = Counter()
+    for lines in split_pages:
+        edges = lines[:edge_lines] + lines[-edge_lines:]
+        counts.update({_line_signature(line) for line in edges})
+
+    threshold = max(2, int(len(pages) * min_share))
+    repeated = {signature for signature, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    cleaned = []
+    for lines in split_pages:
+        last = len(lines) - 1
+        cleaned.append('\n'.join(
+            line for index, line in enumerate(lines)
+            if not ((index < edge_lines or index > last - edge_lines) and _line_signature(line) in repeated)
+        ))
+    return cleaned
+
+def strip_boilerplate(text):
+    """Remove numeração de páginas e outras linhas sem conteúdo."""
+    return '\n'.join(
+        line for line in text.splitlines()
+        if not any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS)
+    )
+
+def normalize_whitespace(text):
+    """Colapsa espaços e linhas em branco repetidas."""
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    text = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+def clean_text(text):
+    """Normaliza o texto extraído: cabeçalhos/rodapés repetidos, boilerplate e espaços."""
+    pages = (text or '').split(PAGE_SEPARATOR)
+    pages = remove_repeated_headers(pages)
+    return normalize_whitespace(strip_boilerplate('\n\n'.join(pages)))
+
+def prompt_budget(model, max_completion_tokens):
+    """Orçamento de tokens para CV + descrição da vaga no prompt do modelo."""
+    override = os.getenv('PROMPT_TOKEN_BUDGET')
+    if override:
+        return int(override)
+    context = MODEL_CONTEXT.get(model, DEFAULT_CONTEXT)
+    return max(0, context - max_completion_tokens - PROMPT_OVERHEAD)
+
+def compact_inputs(cv_text, job_description, model, max_completion_tokens=1000):
+    """Limpa e corta CV e descrição da vaga para caberem no orçamento de tokens do modelo.
+
+    Retorna (cv_text, job_description, stats) com a contagem de tokens antes
+    e depois da compactação.
+    """
+    tokens_original = count_tokens(cv_text, model) + count_tokens(job_description, model)
+
+    cv_text = clean_text(cv_text)
+    job_description = clean_text(job_description)
+    budget = prompt_budget(model, max_completion_tokens)
+
+    job_tokens = count_tokens(job_description, model)
+    job_limit = int(budget * JOB_DESCRIPTION_SHARE)
+    if job_tokens > job_limit:
+        job_description = truncate_to_tokens(job_description, job_limit, model)
+        job_tokens = count_tokens(job_description, model)
+
+    cv_text = truncate_to_tokens(cv_text, budget - job_tokens, model)
+
+    return cv_text, job_description, {
+        'tokens_original': tokens_original,
+        'tokens_sent': count_tokens(cv_text, model) + job_tokens
+    }
@@ -0,0 +1,33 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # compressor opcional; sem ele usamos zlib
+    zstandard = None
+
+# Primeiro byte do payload: qual codec comprimiu o texto
+CODEC_ZLIB = b'\x01'
+CODEC_ZSTD = b'\x02'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def compress_text(text):
+    """Comprime um texto com zstd (se instalado) ou zlib, prefixando o codec usado."""
+    data = (text or '').encode('utf-8')
+    if zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return CODEC_ZLIB + zlib.compress(data, ZLIB_LEVEL)
+
+def decompress_text(payload):
+    """Inverso de compress_text; aceita payloads de qualquer um dos codecs."""
+    if payload is None:
+        return None
+    codec, data = bytes(payload[:1]), bytes(payload[1:])
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('Payload comprimido com zstd, mas o pacote zstandard não está instalado')
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    raise ValueError('Codec de compressão desconhecido')
@@ -3,12 +3,47 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+INSTANCE_PATH = os.path.join(BASE_DIR, 'instance')
+
+# Pool de conexões (Postgres)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+# SQLite local: espera (s) pelo lock de escrita antes de falhar com "database is locked"
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 15))
+SQLITE_WAL = os.getenv('SQLITE_WAL', '1').lower() in {'1', 'true', 'yes'}
+
+def database_url():
+    """URL do banco: DATABASE_URL (Render/Heroku) ou o SQLite local em instance/app.db."""
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{os.path.join(INSTANCE_PATH, 'app.db')}"
+    # O SQLAlchemy 1.4 não aceita mais o esquema antigo postgres://
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """Opções do engine do SQLAlchemy para o banco da URL."""
+    if url.startswith('sqlite'):
+        return {'connect_args': {'timeout': DB_BUSY_TIMEOUT}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True
+    }
+
 class Config:
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
     
     # Database
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///app.db')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # JWT
@@ -1,5 +1,3 @@
-from app import app, db
+from init_db import run_migrations
 
-with app.app_context():
-    db.create_all()
-    print("Banco de dados criado com sucesso!") 
\ No newline at end of file
+run_migrations()
@@ -0,0 +1,92 @@
+import os
+import time
+import socket
+
+# Orçamento (s) de uma requisição para as chamadas externas (o timeout do gunicorn é 120 s)
+REQUEST_BUDGET = float(os.getenv('REQUEST_BUDGET', 100))
+# Intervalo mínimo (s) entre duas sondagens do socket do cliente
+DISCONNECT_PROBE_INTERVAL = float(os.getenv('DISCONNECT_PROBE_INTERVAL', 0.25))
+
+class DeadlineExceeded(Exception):
+    """O prazo da requisição acabou antes de a chamada externa terminar."""
+
+class RequestCancelled(Exception):
+    """O cliente desconectou (ou a chamada perdeu um hedge) e o trabalho foi abandonado."""
+
+def client_disconnected(sock):
+    """True quando o cliente fechou a conexão: o socket está legível e o peek devolve EOF."""
+    # No worker gevent o socket é do gevent, cujo recv espera pelo hub; o _sock de baixo não
+    raw = getattr(sock, '_sock', sock)
+    try:
+        return raw.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+class Deadline:
+    """Prazo absoluto e cancelamento de uma requisição, repassados às chamadas externas.
+
+    remaining() é o tempo que sobra do orçamento (None = sem prazo) e
+    timeout(cap) o timeout de uma chamada limitado por ele. check() levanta
+    DeadlineExceeded ou RequestCancelled. O cancelamento vem de cancel(), de
+    um Deadline pai (child()) ou da sonda do socket do cliente.
+    """
+
+    def __init__(self, seconds=None, parent=None, sock=None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+        self.sock = sock
+        self._cancelled = False
+        self._probed_at = 0.0
+
+    @classmethod
+    def for_request(cls, environ, seconds=REQUEST_BUDGET):
+        """Prazo da requisição atual; com o gunicorn, a desconexão do cliente a cancela."""
+        return cls(seconds, sock=environ.get('gunicorn.socket') or environ.get('gunicorn.sock'))
+
+    def child(self, seconds=None):
+        """Prazo de uma tentativa: cancelável sozinha, mas nunca além do prazo deste."""
+        return Deadline(seconds, parent=self)
+
+    def remaining(self):
+        remaining = None
+        deadline = self
+        now = time.monotonic()
+        while deadline is not None:
+            if deadline.expires_at is not None:
+                left = deadline.expires_at - now
+                remaining = left if remaining is None else min(remaining, left)
+            deadline = deadline.parent
+        return remaining
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, cap=None):
+        """Timeout para a próxima chamada: o menor entre cap e o que sobra do prazo."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return remaining if cap is None else min(cap, remaining)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def cancelled(self):
+        if self._cancelled:
+            return True
+        if self.sock is not None:
+            now = time.monotonic()
+            if now - self._probed_at >= DISCONNECT_PROBE_INTERVAL:
+                self._probed_at = now
+                self._cancelled = client_disconnected(self.sock)
+        return self._cancelled or (self.parent is not None and self.parent.cancelled())
+
+    def check(self):
+        if self.cancelled():
+            raise RequestCancelled('Requisição cancelada')
+        if self.expired():
+            raise DeadlineExceeded('Prazo da requisição esgotado')
@@ -0,0 +1,213 @@
+import os
+import uuid
+import fcntl
+import hashlib
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from flask import Blueprint, request, jsonify, url_for
+from werkzeug.exceptions import ClientDisconnected
+from models import db, Document, DocumentUpload
+from auth import token_required
+from config import INSTANCE_PATH
+from extraction import allowed_file, document_kind, extract_file, COPY_BUFFER_SIZE
+from metrics import timed_stage, observe_extraction
+from text_store import text_store
+
+documents = Blueprint('documents', __name__)
+
+# Partes dos envios em andamento (disco compartilhado pelos workers do gunicorn)
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(INSTANCE_PATH, 'uploads'))
+# Tamanho de parte sugerido ao cliente
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 16 * 1024 * 1024))
+# Envios não concluídos depois desse tempo (s) são descartados
+UPLOAD_TTL = float(os.getenv('UPLOAD_TTL', 24 * 3600))
+
+def document_to_dict(document):
+    return {
+        'id': document.id,
+        'filename': document.filename,
+        'size': document.size,
+        'sha256': document.content_hash,
+        'created_at': document.created_at.isoformat() if document.created_at else None
+    }
+
+def upload_to_dict(upload):
+    return {
+        'upload_id': upload.id,
+        'offset': upload.received,
+        'size': upload.size,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'upload_url': url_for('documents.upload_chunk', upload_id=upload.id)
+    }
+
+def part_path(upload_id):
+    return os.path.join(UPLOAD_DIR, f'{upload_id}.part')
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+@contextmanager
+def locked_part(upload_id):
+    """Abre o arquivo das partes com trava exclusiva (flock, vale entre os workers).
+
+    Levanta BlockingIOError se outra requisição está gravando no mesmo envio.
+    """
+    with open(part_path(upload_id), 'r+b') as file:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        yield file
+
+def write_chunk(file, offset, stream, length):
+    """Copia o corpo da requisição para o arquivo das partes a partir de offset; retorna os bytes gravados."""
+    written = 0
+    file.seek(offset)
+    while written < length:
+        try:
+            block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+        except ClientDisconnected:
+            break
+        if not block:
+            break
+        file.write(block)
+        written += len(block)
+    return written
+
+def discard_upload(upload):
+    """Apaga o arquivo das partes e o registro do envio. Não faz commit."""
+    try:
+        os.remove(part_path(upload.id))
+    except FileNotFoundError:
+        pass
+    db.session.delete(upload)
+
+def purge_expired_uploads(limit=100):
+    """Descarta envios abandonados há mais de UPLOAD_TTL segundos. Não faz commit."""
+    cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_TTL)
+    for upload in DocumentUpload.query.filter(DocumentUpload.created_at < cutoff).limit(limit).all():
+        discard_upload(upload)
+
+def find_document(user, content_hash):
+    return Document.query.filter_by(user_id=user.id, content_hash=content_hash).first()
+
+def find_upload(user, upload_id):
+    return DocumentUpload.query.filter_by(id=upload_id, user_id=user.id).first()
+
+@documents.route('/uploads', methods=['POST'])
+@token_required
+def create_upload(current_user):
+    """Inicia um envio em partes; se o usuário já enviou um arquivo com esse sha256, devolve o documento."""
+    data = request.get_json(silent=True) or {}
+    filename = (data.get('filename') or '')[:255]
+    size = data.get('size')
+    content_hash = (data.get('sha256') or '').lower() or None
+
+    if not allowed_file(filename):
+        return jsonify({'error': 'Tipo de arquivo não suportado. Use PDF ou DOCX'}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'Tamanho do arquivo inválido'}), 400
+    if size > UPLOAD_MAX_SIZE:
+        return jsonify({'error': f'Arquivo maior que o limite de {UPLOAD_MAX_SIZE // (1024 * 1024)} MB'}), 413
+    if content_hash is not None:
+        if len(content_hash) != 64 or any(c not in '0123456789abcdef' for c in content_hash):
+            return jsonify({'error': 'sha256 inválido'}), 400
+        # Mesmo arquivo já enviado: nada a transferir nem a extrair
+        document = find_document(current_user, content_hash)
+        if document is not None:
+            return jsonify({'document': document_to_dict(document), 'uploaded': False})
+
+    purge_expired_uploads()
+    upload = DocumentUpload(id=uuid.uuid4().hex, user_id=current_user.id, filename=filename,
+                            size=size, content_hash=content_hash, received=0)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload.id), 'wb').close()
+    db.session.add(upload)
+    db.session.commit()
+    return jsonify(upload_to_dict(upload)), 201
+
+@documents.route('/uploads/<upload_id>', methods=['GET'])
+@token_required
+def get_upload(current_user, upload_id):
+    """Estado do envio: o cliente retoma a partir de `offset`."""
+    upload = find_upload(current_user, upload_id)
+    if upload is None:
+        return jsonify({'error': 'Envio não encontrado'}), 404
+    return jsonify(upload_to_dict(upload))
+
+@documents.route('/uploads/<upload_id>', methods=['PUT'])
+@token_required
+def upload_chunk(current_user, upload_id):
+    """Recebe uma parte do arquivo no corpo, a partir do byte do cabeçalho Upload-Offset.
+
+    A última parte conclui o envio: o hash é conferido, o texto extraído e o
+    documento criado (201). Uma parte fora de ordem, incompleta ou enviada
+    enquanto outra do mesmo envio é gravada recebe 409 com o offset atual.
+    """
+    upload = find_upload(current_user, upload_id)
+    if upload is None:
+        return jsonify({'error': 'Envio não encontrado'}), 404
+
+    offset = request.headers.get('Upload-Offset', type=int)
+    length = request.content_length
+    if offset is None or length is None:
+        return jsonify({'error': 'Cabeçalhos Upload-Offset e Content-Length são obrigatórios'}), 400
+    if offset != upload.received:
+        return jsonify({'error': 'Offset fora de ordem', **upload_to_dict(upload)}), 409
+    if offset + length > upload.size:
+        return jsonify({'error': 'A parte ultrapassa o tamanho declarado do arquivo'}), 400
+
+    # Só uma requisição por vez grava no arquivo: duas partes com o mesmo offset não se sobrescrevem
+    try:
+        with locked_part(upload.id) as file:
+            # O offset é conferido de novo com a trava: quem a tinha antes pode ter avançado o envio
+            db.session.refresh(upload)
+            if offset != upload.received:
+                return jsonify({'error': 'Offset fora de ordem', **upload_to_dict(upload)}), 409
+            written = write_chunk(file, offset, request.stream, length)
+            # Uma parte interrompida no meio ainda conta o que chegou: o cliente retoma dali
+            if written and not upload.advance(offset, written):
+                db.session.rollback()
+                return jsonify({'error': 'Offset fora de ordem', **upload_to_dict(upload)}), 409
+            # O commit sai antes de a trava ser liberada
+            db.session.commit()
+    except FileNotFoundError:
+        discard_upload(upload)
+        db.session.commit()
+        return jsonify({'error': 'Envio expirado, comece novamente'}), 404
+    except BlockingIOError:
+        return jsonify({'error': 'Outra parte deste envio está sendo gravada', **upload_to_dict(upload)}), 409
+
+    if written < length:
+        # Mesmo status do offset fora de ordem: o cliente retoma do offset devolvido
+        return jsonify({'error': 'Parte incompleta', **upload_to_dict(upload)}), 409
+    if upload.received < upload.size:
+        return jsonify(upload_to_dict(upload))
+    return finish_upload(current_user, upload)
+
+def finish_upload(user, upload):
+    """Confere o hash do arquivo completo, extrai o texto e grava o documento; o envio é descartado."""
+    try:
+        content_hash = file_sha256(part_path(upload.id))
+        if upload.content_hash and upload.content_hash != content_hash:
+            return jsonify({'error': 'O arquivo recebido não confere com o sha256 informado'}), 400
+
+        document = find_document(user, content_hash)
+        if document is None:
+            def extract():
+                text = extract_file(part_path(upload.id), upload.filename)
+                observe_extraction(document_kind(upload.filename), upload.size, text)
+                return text
+
+            # O mesmo arquivo enviado por outro usuário (ou antes por /analyze) já tem o texto no store
+            with timed_stage('extraction'):
+                text = text_store.get_or_extract(content_hash, upload.size, extract)
+            if not text:
+                return jsonify({'error': 'Não foi possível extrair texto do arquivo'}), 400
+            document = Document.store(user.id, content_hash, upload.filename, upload.size, text)
+        return jsonify({'document': document_to_dict(document), 'uploaded': True}), 201
+    finally:
+        discard_upload(upload)
+        db.session.commit()
@@ -0,0 +1,354 @@
+import os
+import io
+import sys
+import time
+import queue
+import pickle
+import atexit
+import select
+import struct
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+from docx import Document
+
+# Uploads até este tamanho são extraídos direto da memória; acima disso vão para um arquivo temporário
+SPOOL_THRESHOLD = int(os.getenv('EXTRACTION_SPOOL_THRESHOLD', 8 * 1024 * 1024))
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Pool de processos para a extração (0 = extrai no próprio worker)
+EXTRACTION_PROCESSES = int(os.getenv('EXTRACTION_PROCESSES', 2))
+EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', 30))
+EXTRACTION_MAX_PAGES = int(os.getenv('EXTRACTION_MAX_PAGES', 500))
+# O prompt só consome uma parte limitada do CV, então a extração pode parar antes (0 = sem limite)
+EXTRACTION_MAX_CHARS = int(os.getenv('EXTRACTION_MAX_CHARS', 200000))
+# PDFs a partir deste número de páginas têm as páginas divididas entre os processos do pool
+EXTRACTION_PARALLEL_MIN_PAGES = int(os.getenv('EXTRACTION_PARALLEL_MIN_PAGES', 100))
+
+# Separador de páginas no texto extraído de PDFs
+PAGE_SEPARATOR = '\f'
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('EXTRACTION_MEMORY_LIMIT_MB', 512))
+
+@contextmanager
+def spooled_source(upload, threshold=None):
+    """Expõe o conteúdo de um upload como bytes (pequeno) ou caminho de arquivo temporário (grande).
+
+    Aceita um FileStorage do werkzeug ou qualquer objeto file-like. O arquivo
+    temporário tem nome único e é sempre removido ao sair do contexto.
+    """
+    threshold = SPOOL_THRESHOLD if threshold is None else threshold
+    stream = getattr(upload, 'stream', upload)
+    if hasattr(stream, 'seek'):
+        stream.seek(0)
+
+    head = stream.read(threshold + 1)
+    if len(head) <= threshold:
+        yield head
+        return
+
+    tmp = tempfile.NamedTemporaryFile(prefix='cv-', delete=False)
+    try:
+        with tmp:
+            tmp.write(head)
+            while True:
+                chunk = stream.read(COPY_BUFFER_SIZE)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+def open_pdf(source):
+    """Open a PDF given as bytes or a file path."""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype='pdf')
+    # O tipo não vem da extensão: temporários e partes de envio não terminam em .pdf
+    return fitz.open(source, filetype='pdf')
+
+def pdf_page_count(source):
+    """Return the number of pages of a PDF."""
+    with open_pdf(source) as pdf:
+        return pdf.page_count
+
+def extract_pdf_pages(source, start=0, stop=None, max_chars=None):
+    """Extract the text of pages [start, stop) as a list, stopping once max_chars are collected."""
+    pages = []
+    collected = 0
+    with open_pdf(source) as pdf:
+        stop = pdf.page_count if stop is None else min(stop, pdf.page_count)
+        for page_number in range(start, stop):
+            page_text = pdf[page_number].get_text()
+            pages.append(page_text)
+            collected += len(page_text)
+            if max_chars and collected >= max_chars:
+                break
+    return pages
+
+def join_pages(pages, max_chars=None):
+    """Join page texts with the page separator, truncating to max_chars."""
+    text = PAGE_SEPARATOR.join(page.strip() for page in pages).strip()
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars]
+    return text
+
+def extract_text_from_pdf(source, max_pages=None, max_chars=None):
+    """Extract text from a PDF given as bytes or a file path."""
+    max_pages = EXTRACTION_MAX_PAGES if max_pages is None else max_pages
+    max_chars = EXTRACTION_MAX_CHARS if max_chars is None else max_chars
+    try:
+        pages = extract_pdf_pages(source, 0, max_pages or None, max_chars)
+        return join_pages(pages, max_chars)
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+        return None
+
+def extract_text_from_docx(source):
+    """Extract text from a DOCX given as bytes or a file path."""
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        doc = Document(source)
+        text = []
+        for paragraph in doc.paragraphs:
+            text.append(paragraph.text)
+        return '\n'.join(text).strip()
+    except Exception as e:
+        print(f"Error extracting text from DOCX: {e}")
+        return None
+
+def extract_document(kind, source, options=None):
+    """Extrai o texto de um documento já carregado; ponto de entrada dos processos do pool."""
+    options = options or {}
+    if kind == 'pdf_pages':
+        try:
+            return extract_pdf_pages(source, **options)
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+            return None
+    if kind == 'pdf':
+        return extract_text_from_pdf(source, **options)
+    return extract_text_from_docx(source)
+
+def _write_frame(fd, payload, deadline):
+    data = struct.pack('>I', len(payload)) + payload
+    view = memoryview(data)
+    while view:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('extraction worker write timed out')
+        _, writable, _ = select.select([], [fd], [], remaining)
+        if not writable:
+            continue
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            continue
+        view = view[written:]
+
+def _read_exact(fd, size, deadline):
+    buffer = bytearray()
+    while len(buffer) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('extraction worker read timed out')
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            continue
+        try:
+            chunk = os.read(fd, size - len(buffer))
+        except BlockingIOError:
+            continue
+        if not chunk:
+            raise EOFError('extraction worker exited')
+        buffer += chunk
+    return bytes(buffer)
+
+class ExtractionWorker:
+    """Processo extrator persistente (`python extraction.py --worker`) falando por pipes.
+
+    O texto volta por um pipe dedicado, e não pelo stdout, que fica livre para
+    prints e avisos das bibliotecas de parsing.
+    """
+
+    def __init__(self):
+        result_read, result_write = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--worker', str(result_write)],
+                stdin=subprocess.PIPE,
+                pass_fds=(result_write,)
+            )
+        except Exception:
+            os.close(result_read)
+            raise
+        finally:
+            os.close(result_write)
+        self.stdin = self.process.stdin.fileno()
+        self.results = result_read
+        os.set_blocking(self.stdin, False)
+        os.set_blocking(self.results, False)
+        self.tasks = 0
+
+    def call(self, kind, source, options, timeout):
+        # select + pipes não bloqueantes: com gevent a espera é cooperativa, sem ele é uma espera comum
+        deadline = time.monotonic() + timeout
+        _write_frame(self.stdin, pickle.dumps((kind, source, options)), deadline)
+        size, = struct.unpack('>I', _read_exact(self.results, 4, deadline))
+        self.tasks += 1
+        return pickle.loads(_read_exact(self.results, size, deadline))
+
+    def kill(self):
+        self.process.kill()
+        self.process.stdin.close()
+        os.close(self.results)
+        self.process.wait()
+
+class ExtractionPool:
+    """Pool limitado de processos para a extração CPU-bound de PDF/DOCX.
+
+    O parsing roda fora do processo do worker do gunicorn, então o hub do
+    gevent continua atendendo os outros greenlets enquanto espera o resultado.
+    Os pools do multiprocessing/concurrent.futures travam com o monkey patching
+    do gevent, por isso os processos são controlados diretamente via pipes.
+    Um processo que estoura o timeout é morto e recriado na próxima extração.
+    """
+
+    # Faixas de páginas por processo na extração paralela de um PDF grande
+    ranges_per_process = 4
+
+    def __init__(self, processes=EXTRACTION_PROCESSES, timeout=EXTRACTION_TIMEOUT,
+                 max_tasks_per_worker=100):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(processes, 1))
+
+    def extract(self, kind, source):
+        if not self.processes:
+            return extract_document(kind, source)
+
+        if kind == 'pdf' and self.processes > 1:
+            try:
+                page_count = min(pdf_page_count(source), EXTRACTION_MAX_PAGES or sys.maxsize)
+            except Exception as e:
+                print(f"Error extracting text from PDF: {e}")
+                return None
+            if page_count >= EXTRACTION_PARALLEL_MIN_PAGES:
+                return self._extract_pdf_parallel(source, page_count)
+
+        return self._call(kind, source)
+
+    def _extract_pdf_parallel(self, source, page_count):
+        """Divide as páginas do PDF em faixas contíguas entre os processos e junta o texto na ordem.
+
+        São ranges_per_process faixas por processo, despachadas em ordem: quando
+        as primeiras já somam EXTRACTION_MAX_CHARS, as que ainda não começaram
+        são canceladas, e no máximo uma faixa por processo é extraída à toa.
+        """
+        step = -(-page_count // (self.processes * self.ranges_per_process))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        pages = []
+        collected = 0
+        with ThreadPoolExecutor(max_workers=min(self.processes, len(ranges))) as executor:
+            futures = [executor.submit(self._call, 'pdf_pages', source, {
+                'start': start,
+                'stop': stop,
+                'max_chars': EXTRACTION_MAX_CHARS
+            }) for start, stop in ranges]
+            for index, future in enumerate(futures):
+                part = future.result()
+                if part is None:
+                    for pending in futures[index + 1:]:
+                        pending.cancel()
+                    return None
+                pages.extend(part)
+                collected += sum(len(page) for page in part)
+                if EXTRACTION_MAX_CHARS and collected >= EXTRACTION_MAX_CHARS:
+                    for pending in futures[index + 1:]:
+                        pending.cancel()
+                    break
+        return join_pages(pages, EXTRACTION_MAX_CHARS)
+
+    def _call(self, kind, source, options=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            print(f"Extraction pool busy for {self.timeout}s")
+            return None
+        try:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                # Criado sob demanda, depois do fork do gunicorn
+                worker = ExtractionWorker()
+
+            try:
+                text = worker.call(kind, source, options, self.timeout)
+            except (TimeoutError, EOFError, OSError) as e:
+                print(f"Error in extraction worker: {e}")
+                worker.kill()
+                return None
+
+            if worker.tasks >= self.max_tasks_per_worker:
+                worker.kill()
+            else:
+                self._idle.put(worker)
+            return text
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+extraction_pool = ExtractionPool()
+atexit.register(extraction_pool.close)
+
+def allowed_file(filename):
+    """Check if the file extension is allowed."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'pdf', 'docx'}
+
+def document_kind(filename):
+    """'pdf' or 'docx', from the file name."""
+    return 'pdf' if (filename or '').lower().endswith('.pdf') else 'docx'
+
+def extract_text(upload, filename=None):
+    """Extract the text of an uploaded PDF/DOCX without saving it to the upload folder."""
+    filename = filename or getattr(upload, 'filename', '') or ''
+    with spooled_source(upload) as source:
+        return extraction_pool.extract(document_kind(filename), source)
+
+def extract_file(path, filename):
+    """Extract the text of a PDF/DOCX already on disk (e.g. an upload assembled from chunks)."""
+    return extraction_pool.extract(document_kind(filename), path)
+
+def _run_worker(result_fd):
+    """Laço do processo extrator: lê (tipo, documento) do stdin e devolve o texto em result_fd."""
+    if EXTRACTION_MEMORY_LIMIT_MB:
+        try:
+            import resource
+            limit = EXTRACTION_MEMORY_LIMIT_MB * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    stdin = sys.stdin.buffer
+    results = os.fdopen(result_fd, 'wb')
+    while True:
+        header = stdin.read(4)
+        if len(header) < 4:
+            return
+        size, = struct.unpack('>I', header)
+        kind, source, options = pickle.loads(stdin.read(size))
+        payload = pickle.dumps(extract_document(kind, source, options))
+        results.write(struct.pack('>I', len(payload)) + payload)
+        results.flush()
+
+if __name__ == '__main__' and sys.argv[1:2] == ['--worker']:
+    _run_worker(int(sys.argv[2]))
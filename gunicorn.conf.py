@@ -1,4 +1,44 @@
+import os
+
 workers = 4
-bind = "0.0.0.0:$PORT"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 timeout = 120
-worker_class = "gevent" 
\ No newline at end of file
+worker_class = "gevent"
+
+# O app (e o engine do banco) é montado uma vez no master e herdado pelos workers no fork
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').lower() in {'1', 'true', 'yes'}
+
+if preload_app and worker_class == "gevent":
+    # Com preload o app é importado no master; o patch precisa vir antes de qualquer import dele
+    from gevent import monkey
+    monkey.patch_all()
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # psycopg2 espera o Postgres pelo hub do gevent em vez de bloquear o worker inteiro
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            pass
+
+    # Conexões abertas no master não podem ser compartilhadas entre processos
+    if preload_app:
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose()
+
+# Métricas do Prometheus agregadas entre os workers: cada processo grava os seus valores em
+# PROMETHEUS_MULTIPROC_DIR, que precisa começar vazio a cada subida do servidor
+def on_starting(server):
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.db'):
+                os.remove(os.path.join(directory, name))
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
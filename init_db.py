@@ -1,19 +1,24 @@
 import os
 from flask import Flask
+from config import Config, INSTANCE_PATH
 from models import db
+from migrations import migrate
 
 # Ensure instance directory exists
-os.makedirs('instance', exist_ok=True)
+os.makedirs(INSTANCE_PATH, exist_ok=True)
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instance/app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config.from_object(Config)
 
 # Initialize database
 db.init_app(app)
 
-# Create tables
-with app.app_context():
-    db.create_all()
-    print("Banco de dados criado com sucesso!") 
\ No newline at end of file
+def run_migrations():
+    """Aplica as migrações pendentes; seguro para rodar a cada deploy."""
+    with app.app_context():
+        version = migrate(db.engine)
+        print(f"Banco de dados na versão {version} do schema.")
+
+if __name__ == '__main__':
+    run_migrations()
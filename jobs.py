@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from models import db, AnalysisJob
+
+# Um job 'running' há mais tempo que isso (s) ficou órfão (worker reiniciado no meio) e é dado como falho
+ANALYSIS_JOB_LEASE = float(os.getenv('ANALYSIS_JOB_LEASE', 300))
+# Um job 'queued' há mais tempo que isso (s) é reenviado ao pool deste worker
+ANALYSIS_JOB_REQUEUE_AFTER = float(os.getenv('ANALYSIS_JOB_REQUEUE_AFTER', 60))
+# Intervalo (s) entre duas varreduras de jobs órfãos em cada worker
+ANALYSIS_JOB_SWEEP_INTERVAL = float(os.getenv('ANALYSIS_JOB_SWEEP_INTERVAL', 60))
+
+class JobQueue:
+    """Fila de análises persistida no banco, processada por um pool de workers.
+
+    A tabela `analysis_job` faz o papel de um broker (Redis/SQS) local: o
+    request apenas grava o job e retorna, e o pool executa o `handler` fora do
+    ciclo do request.
+    """
+
+    def __init__(self, app=None, handler=None, max_workers=None, on_failed=None):
+        self.app = None
+        self.handler = None
+        self.on_failed = None
+        self.max_workers = max_workers or int(os.getenv('ANALYSIS_WORKERS', 8))
+        self._executor = None
+        self._lock = threading.Lock()
+        # Jobs já entregues ao pool deste processo, para a varredura não reenviá-los
+        self._pending = set()
+        self._sweeper_pid = None
+        if app is not None:
+            self.init_app(app, handler, on_failed)
+
+    def init_app(self, app, handler, on_failed=None):
+        """on_failed(job) roda uma única vez quando o job termina como falho, por erro no
+        handler ou dado como perdido pela varredura (ex.: devolver a cota)."""
+        self.app = app
+        self.handler = handler
+        self.on_failed = on_failed
+        app.before_request(self.start_sweeper)
+
+    def _get_executor(self):
+        # Criado sob demanda para que cada worker do gunicorn tenha o seu pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='analysis-job'
+                    )
+        return self._executor
+
+    def enqueue(self, user_id, cv_filename, cv_text, job_description, use_cache=True):
+        """Grava um novo job e o envia para o pool. Retorna o AnalysisJob."""
+        job = AnalysisJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            cv_filename=cv_filename,
+            cv_text=cv_text,
+            job_description=job_description,
+            use_cache=use_cache
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._submit(job.id)
+        return job
+
+    def _submit(self, job_id):
+        with self._lock:
+            if job_id in self._pending:
+                return
+            self._pending.add(job_id)
+        self._get_executor().submit(self._run, job_id)
+
+    def _claim(self, job_id):
+        """Passa o job de 'queued' para 'running' com um UPDATE condicional; só um worker consegue."""
+        result = db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.status == 'queued')
+            .values(status='running', started_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                # O mesmo job pode estar no pool de dois workers (reenviado pela varredura)
+                if not self._claim(job_id):
+                    return
+                job = AnalysisJob.query.get(job_id)
+
+                try:
+                    result = self.handler(job)
+                except Exception as e:
+                    self.app.logger.error(f'Analysis job {job_id} failed: {e}')
+                    self.app.logger.error(traceback.format_exc())
+                    db.session.rollback()
+                    if self._finish(job_id, status='failed', error=str(e)) and self.on_failed is not None:
+                        self.on_failed(AnalysisJob.query.get(job_id))
+                    return
+
+                # A varredura pode ter dado o job como perdido (e devolvido a cota) enquanto ele
+                # rodava: nesse caso o resultado, e o que o handler gravou, é descartado
+                if not self._finish(job_id, status='done', result=json.dumps(result)):
+                    self.app.logger.warning(f'Analysis job {job_id} finished after being abandoned, result dropped')
+                    db.session.rollback()
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._pending.discard(job_id)
+
+    def _finish(self, job_id, **values):
+        """Encerra um job 'running' com um UPDATE condicional e faz commit; False se ele já não estava rodando."""
+        result = db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.status == 'running')
+            .values(finished_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        db.session.commit()
+        return True
+
+    def sweep(self):
+        """Recupera os jobs perdidos em um restart ou deploy.
+
+        Jobs 'queued' antigos voltam para o pool (a cota continua reservada);
+        jobs 'running' além de ANALYSIS_JOB_LEASE são marcados como falhos e
+        passam por on_failed. O UPDATE condicional garante que, com vários
+        workers varrendo, cada job órfão seja tratado uma única vez.
+        """
+        now = datetime.utcnow()
+        with self.app.app_context():
+            try:
+                stale = AnalysisJob.query.filter(
+                    AnalysisJob.status == 'running',
+                    AnalysisJob.started_at < now - timedelta(seconds=ANALYSIS_JOB_LEASE)
+                ).all()
+                for job in stale:
+                    result = db.session.execute(
+                        update(AnalysisJob)
+                        .where(AnalysisJob.id == job.id, AnalysisJob.status == 'running',
+                               AnalysisJob.started_at == job.started_at)
+                        .values(status='failed', error='Análise interrompida; tente novamente',
+                                finished_at=now)
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+                    if result.rowcount == 1:
+                        self.app.logger.warning(f'Analysis job {job.id} abandoned, marked as failed')
+                        if self.on_failed is not None:
+                            self.on_failed(job)
+
+                queued = db.session.query(AnalysisJob.id).filter(
+                    AnalysisJob.status == 'queued',
+                    AnalysisJob.created_at < now - timedelta(seconds=ANALYSIS_JOB_REQUEUE_AFTER)
+                ).all()
+                for job_id, in queued:
+                    self._submit(job_id)
+            except Exception as e:
+                self.app.logger.error(f'Analysis job sweep failed: {e}')
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    def start_sweeper(self):
+        """Inicia a varredura periódica neste processo (uma vez por worker, depois do fork)."""
+        if self._sweeper_pid == os.getpid() or ANALYSIS_JOB_SWEEP_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            # O pool herdado do master não tem threads neste processo
+            self._pending = set()
+
+        def loop():
+            while True:
+                self.sweep()
+                time.sleep(ANALYSIS_JOB_SWEEP_INTERVAL)
+
+        threading.Thread(target=loop, name='analysis-job-sweeper', daemon=True).start()
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+def job_to_dict(job):
+    """Serializa o estado de um job para a API de polling."""
+    data = {
+        'job_id': job.id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+    if job.status == 'done':
+        data['analysis_id'] = job.analysis_id
+        data['result'] = json.loads(job.result) if job.result else None
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return data
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (
+    Counter, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+)
+
+# 0 desliga toda a instrumentação (hooks, histogramas e /metrics)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in {'1', 'true', 'yes'}
+# Com vários workers do gunicorn, os valores de cada processo vão para este diretório e o
+# /metrics agrega todos (modo multiprocess do prometheus_client)
+METRICS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+# Bearer token exigido no /metrics; sem ele a rota não é registrada (ela fica na mesma porta do app)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Uma linha JSON por requisição com a duração e o tempo de cada etapa
+REQUEST_LOG = os.getenv('REQUEST_LOG', '1').lower() in {'1', 'true', 'yes'}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições por rota',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter('http_requests', 'Requisições por rota e status', ['method', 'route', 'status'])
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Consultas SQL por requisição', ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+STAGE_LATENCY = Histogram(
+    'analysis_stage_duration_seconds', 'Tempo de cada etapa da análise', ['stage'], buckets=LATENCY_BUCKETS
+)
+EXTRACTION_BYTES = Histogram(
+    'extraction_input_bytes', 'Tamanho dos arquivos extraídos', ['kind'],
+    buckets=(16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20)
+)
+EXTRACTION_PAGES = Histogram(
+    'extraction_pages', 'Páginas extraídas por PDF', buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+PROMPT_TOKENS = Histogram(
+    'prompt_tokens', 'Tokens de CV + vaga antes (original) e depois (sent) da compactação', ['kind'],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+LLM_LATENCY = Histogram(
+    'llm_request_duration_seconds', 'Latência das chamadas aos provedores de LLM',
+    ['provider', 'model', 'outcome'], buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter('analysis_cache_lookups', 'Consultas ao cache de resultados', ['result'])
+COALESCED = Counter('analysis_coalesced', 'Análises servidas por uma chamada idêntica já em andamento')
+TEXT_STORE_LOOKUPS = Counter('text_store_lookups', 'Consultas ao store de texto extraído', ['result'])
+TEXT_STORE_SAVED_BYTES = Counter('text_store_saved_bytes', 'Bytes de arquivos que não precisaram ser extraídos de novo')
+TEXT_STORE_EVICTIONS = Counter('text_store_evictions', 'Textos removidos do store pelo limite de tamanho')
+TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds', 'Tempo até o primeiro trecho das análises em stream', ['provider'],
+    buckets=LATENCY_BUCKETS
+)
+
+request_log = logging.getLogger('analyzer.requests')
+if REQUEST_LOG and not request_log.handlers:
+    request_log.addHandler(logging.StreamHandler())
+    request_log.setLevel(logging.INFO)
+    request_log.propagate = False
+
+# Séries filhas já resolvidas por rótulos: labels() valida e trava a cada chamada
+_children = {}
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+def _request_state():
+    """Estado da instrumentação da requisição atual (None fora de requisição ou antes do before_request)."""
+    return g.get('metrics') if has_request_context() else None
+
+def observe_stage(stage, seconds):
+    """Registra a duração de uma etapa no histograma e na linha de log da requisição."""
+    if not METRICS_ENABLED:
+        return
+    _child(STAGE_LATENCY, stage).observe(seconds)
+    state = _request_state()
+    if state is not None:
+        stages = state['stages']
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+def observe_llm_call(provider, model, seconds, ok):
+    if METRICS_ENABLED:
+        _child(LLM_LATENCY, provider, model or '', 'ok' if ok else 'error').observe(seconds)
+
+def observe_time_to_first_token(provider, seconds):
+    if METRICS_ENABLED and seconds is not None:
+        _child(TIME_TO_FIRST_TOKEN, provider or '').observe(seconds)
+
+def observe_extraction(kind, size, text):
+    if not METRICS_ENABLED:
+        return
+    _child(EXTRACTION_BYTES, kind).observe(size)
+    if kind == 'pdf' and text:
+        EXTRACTION_PAGES.observe(text.count('\f') + 1)
+
+def observe_prompt_tokens(result):
+    if not METRICS_ENABLED:
+        return
+    for kind in ('original', 'sent'):
+        tokens = result.get(f'tokens_{kind}')
+        if tokens is not None:
+            _child(PROMPT_TOKENS, kind).observe(tokens)
+
+def count_cache_lookup(result):
+    if METRICS_ENABLED:
+        _child(CACHE_LOOKUPS, result).inc()
+
+def count_coalesced():
+    if METRICS_ENABLED:
+        COALESCED.inc()
+
+def count_text_store_lookup(hit, size):
+    if not METRICS_ENABLED:
+        return
+    _child(TEXT_STORE_LOOKUPS, 'hit' if hit else 'miss').inc()
+    if hit and size:
+        TEXT_STORE_SAVED_BYTES.inc(size)
+
+def count_text_store_evictions(count):
+    if METRICS_ENABLED and count:
+        TEXT_STORE_EVICTIONS.inc(count)
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    state = _request_state()
+    if state is not None:
+        state['queries'] += 1
+
+def _start_request():
+    g.metrics = {'started': time.perf_counter(), 'queries': 0, 'stages': {}}
+
+def _finish_request(response):
+    state = g.get('metrics')
+    if state is None:
+        return response
+    current = request._get_current_object()
+    method = current.method
+    route = current.url_rule.rule if current.url_rule else 'unmatched'
+    status = response.status_code
+    # O corpo em stream (/analyze/stream) só é gerado depois do after_request: a medição
+    # fecha quando o servidor termina de enviar a resposta
+    response.call_on_close(lambda: _record_request(state, method, route, status))
+    return response
+
+def _record_request(state, method, route, status):
+    # close() pode ser chamado mais de uma vez
+    if state.get('finished'):
+        return
+    state['finished'] = True
+    duration = time.perf_counter() - state['started']
+    _child(REQUEST_LATENCY, method, route).observe(duration)
+    _child(REQUESTS, method, route, str(status)).inc()
+    _child(DB_QUERIES, route).observe(state['queries'])
+
+    if REQUEST_LOG:
+        request_log.info(json.dumps({
+            'method': method,
+            'route': route,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': state['queries'],
+            'stages_ms': {stage: round(seconds * 1000, 2) for stage, seconds in state['stages'].items()}
+        }))
+
+def metrics_endpoint():
+    if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        # Resposta direta: o errorhandler(Exception) do app transformaria um abort(401) em 500
+        return Response('Unauthorized', status=401, mimetype='text/plain')
+    registry = REGISTRY
+    if METRICS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Liga a instrumentação por requisição e, se METRICS_TOKEN estiver definido, o endpoint /metrics."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(Engine, 'before_cursor_execute', _count_query)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # Tráfego por rota, erros e provedores não ficam expostos a qualquer um
+    if METRICS_TOKEN:
+        app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    else:
+        app.logger.warning('METRICS_TOKEN is not set, /metrics is disabled')
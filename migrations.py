@@ -0,0 +1,140 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from models import db, analysis_history_index, User, JobDescription, AnalysisDetail, Document, DocumentUpload, ExtractedText
+from compression import compress_text
+
+def _create_tables(conn):
+    """Cria as tabelas que ainda não existem."""
+    db.metadata.create_all(bind=conn)
+
+def _add_column(conn, table, column, ddl):
+    if column not in {c['name'] for c in inspect(conn).get_columns(table)}:
+        # "user" é palavra reservada no Postgres
+        table = conn.dialect.identifier_preparer.quote(table)
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+def _analysis_token_counts(conn):
+    """Contagem de tokens da compactação em bancos criados antes dela."""
+    _add_column(conn, 'analysis', 'tokens_original', 'INTEGER')
+    _add_column(conn, 'analysis', 'tokens_sent', 'INTEGER')
+
+def _analysis_history_index(conn):
+    """Índice (user_id, created_at DESC, id DESC) do histórico."""
+    analysis_history_index.create(bind=conn, checkfirst=True)
+
+def _split_analysis_payloads(conn, batch_size=1000):
+    """Move a descrição da vaga para job_description (deduplicada) e o feedback,
+    comprimido, para analysis_detail; depois remove as duas colunas de analysis."""
+    db.metadata.create_all(bind=conn, tables=[JobDescription.__table__, AnalysisDetail.__table__])
+    _add_column(conn, 'analysis', 'job_description_id', 'INTEGER REFERENCES job_description (id)')
+    if 'feedback' not in {c['name'] for c in inspect(conn).get_columns('analysis')}:
+        return
+
+    job_ids = {}
+
+    def job_id_for(job_description):
+        content_hash = JobDescription.hash_text(job_description)
+        if content_hash not in job_ids:
+            job_ids[content_hash] = conn.execute(
+                JobDescription.__table__.insert(),
+                {'content_hash': content_hash, 'text': job_description, 'created_at': datetime.utcnow()}
+            ).inserted_primary_key[0]
+        return job_ids[content_hash]
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text('SELECT id, job_description, feedback FROM analysis WHERE id > :last_id ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': batch_size}
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text('UPDATE analysis SET job_description_id = :job_id WHERE id = :id'),
+            [{'id': row.id, 'job_id': job_id_for(row.job_description or '')} for row in rows]
+        )
+        details = [{'analysis_id': row.id, 'feedback_compressed': compress_text(row.feedback)}
+                   for row in rows if row.feedback is not None]
+        if details:
+            conn.execute(AnalysisDetail.__table__.insert(), details)
+        last_id = rows[-1].id
+
+    conn.execute(text('ALTER TABLE analysis DROP COLUMN feedback'))
+    conn.execute(text('ALTER TABLE analysis DROP COLUMN job_description'))
+
+def _user_stripe_customer(conn):
+    """Cliente do Stripe do usuário, usado pelo checkout e procurado pelos webhooks."""
+    _add_column(conn, 'user', 'stripe_customer_id', 'VARCHAR(255)')
+    for index in User.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+def _documents(conn):
+    """Documentos enviados (texto extraído por hash) e envios em partes em andamento."""
+    db.metadata.create_all(bind=conn, tables=[Document.__table__, DocumentUpload.__table__])
+
+def _extracted_text(conn):
+    """Store do texto extraído dos arquivos, pelo hash do conteúdo."""
+    db.metadata.create_all(bind=conn, tables=[ExtractedText.__table__])
+
+def _extracted_text_store_key(conn):
+    """A chave do store inclui os limites da extração: não é mais o hash do arquivo."""
+    columns = {c['name'] for c in inspect(conn).get_columns('extracted_text')}
+    if 'content_hash' in columns and 'store_key' not in columns:
+        conn.execute(text('ALTER TABLE extracted_text RENAME COLUMN content_hash TO store_key'))
+
+# Passos em ordem; cada um precisa ser idempotente, pois pode rodar sobre um banco
+# criado por db.create_all() antes do controle de versão
+MIGRATIONS = [
+    (1, 'tabelas iniciais', _create_tables),
+    (2, 'contagem de tokens em analysis', _analysis_token_counts),
+    (3, 'índice do histórico em analysis', _analysis_history_index),
+    (4, 'descrições de vaga deduplicadas e feedback comprimido fora de analysis', _split_analysis_payloads),
+    (5, 'cliente do Stripe em user', _user_stripe_customer),
+    (6, 'documentos e envios em partes', _documents),
+    (7, 'store do texto extraído', _extracted_text),
+    (8, 'chave do store do texto extraído', _extracted_text_store_key),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL, applied_at TIMESTAMP)'
+    ))
+
+def current_version(engine):
+    """Versão do schema registrada no banco (0 se nunca foi migrado)."""
+    if not inspect(engine).has_table('schema_version'):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+def migrate(engine, log=print):
+    """Aplica as migrações pendentes, cada uma em sua própria transação. Retorna a versão final."""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+    version = current_version(engine)
+    for step, description, apply in MIGRATIONS:
+        if step <= version:
+            continue
+        with engine.begin() as conn:
+            apply(conn)
+            conn.execute(
+                text('INSERT INTO schema_version (version, applied_at) VALUES (:version, :applied_at)'),
+                {'version': step, 'applied_at': datetime.utcnow()}
+            )
+        log(f'Migração {step} aplicada: {description}')
+        version = step
+    return version
+
+class SchemaOutOfDate(RuntimeError):
+    """O banco está em uma versão de schema anterior à esperada pelo código."""
+
+def verify_schema(engine):
+    """Caminho rápido da inicialização: só confere a versão do schema, sem DDL."""
+    version = current_version(engine)
+    if version < SCHEMA_VERSION:
+        raise SchemaOutOfDate(
+            f'Schema do banco na versão {version}, esperada {SCHEMA_VERSION}. '
+            f'Rode "python init_db.py" para aplicar as migrações.'
+        )
+    return version
@@ -1,40 +1,54 @@
+import sqlite3
+import hashlib
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-import bcrypt
+from sqlalchemy import event, update, select, case, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from config import DB_BUSY_TIMEOUT, SQLITE_WAL
+from compression import compress_text, decompress_text
+from passwords import hash_password, verify_password, needs_rehash
 
 db = SQLAlchemy()
 
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """SQLite local em modo WAL: leituras não bloqueiam a escrita e escritas concorrentes esperam o lock."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}')
+    cursor.close()
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
     name = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stripe_customer_id = db.Column(db.String(255), index=True)
     subscription = db.relationship('Subscription', backref='user', uselist=False)
     analyses = db.relationship('Analysis', backref='user', lazy=True)
 
     def set_password(self, password):
-        if isinstance(password, str):
-            password = password.encode('utf-8')
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password, salt)
-        self.password_hash = password_hash.decode('utf-8')
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         if not self.password_hash:
             return False
-        if isinstance(password, str):
-            password = password.encode('utf-8')
-        if isinstance(self.password_hash, str):
-            stored_hash = self.password_hash.encode('utf-8')
-        else:
-            stored_hash = self.password_hash
         try:
-            return bcrypt.checkpw(password, stored_hash)
+            return verify_password(password, self.password_hash)
         except Exception as e:
             print(f"Erro ao verificar senha: {e}")
             return False
 
+    def password_needs_rehash(self):
+        """O hash foi gerado com um custo diferente do BCRYPT_ROUNDS atual."""
+        return bool(self.password_hash) and needs_rehash(self.password_hash)
+
 class Subscription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -56,21 +70,208 @@ class Subscription(db.Model):
         
         return self.remaining_analyses > 0
 
-    def use_analysis(self):
-        """Registra o uso de uma análise"""
-        if self.plan_type != 'business' and self.remaining_analyses > 0:
-            self.remaining_analyses -= 1
-            db.session.commit()
+    def reserve_analyses(self, count=1):
+        """Reserva análises da cota com um único UPDATE condicional, sem ler e regravar o saldo.
+
+        Requisições concorrentes da mesma conta não conseguem gastar além do
+        saldo. O plano (business não desconta) é conferido no próprio UPDATE,
+        não no objeto, que pode vir do cache de outro worker já desatualizado.
+        Não faz commit; retorna False se a assinatura expirou ou o saldo não basta.
+        """
+        now = datetime.utcnow()
+        unlimited = Subscription.plan_type == 'business'
+        result = db.session.execute(
+            update(Subscription)
+            .where(Subscription.id == self.id,
+                   Subscription.expires_at >= now,
+                   or_(unlimited, Subscription.remaining_analyses >= count))
+            .values(remaining_analyses=case(
+                (unlimited, Subscription.remaining_analyses),
+                else_=Subscription.remaining_analyses - count
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['remaining_analyses'])
+        return result.rowcount == 1
+
+    def refund_analyses(self, count=1):
+        """Devolve análises reservadas cujo processamento falhou. Não faz commit."""
+        db.session.execute(
+            update(Subscription)
+            .where(Subscription.id == self.id, Subscription.plan_type != 'business')
+            .values(remaining_analyses=Subscription.remaining_analyses + count)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['remaining_analyses'])
+
+class JobDescription(db.Model):
+    """Descrição de vaga deduplicada pelo hash do conteúdo, compartilhada pelas análises"""
+    __tablename__ = 'job_description'
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def id_for(cls, text):
+        """Id da descrição com esse conteúdo, inserindo-a se ainda não existir.
+
+        Usa INSERT ... ON CONFLICT DO NOTHING, então requisições concorrentes
+        com a mesma vaga não colidem na chave única. Não faz commit.
+        """
+        text = text or ''
+        content_hash = cls.hash_text(text)
+        existing = db.session.execute(
+            select(cls.id).where(cls.content_hash == content_hash)
+        ).scalar()
+        if existing is not None:
+            return existing
+
+        dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        db.session.execute(
+            dialect.insert(cls)
+            .values(content_hash=content_hash, text=text, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['content_hash'])
+        )
+        return db.session.execute(select(cls.id).where(cls.content_hash == content_hash)).scalar()
 
 class Analysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     cv_filename = db.Column(db.String(255))
-    job_description = db.Column(db.Text)
+    job_description_id = db.Column(db.Integer, db.ForeignKey('job_description.id'))
     similarity_score = db.Column(db.Float)
-    feedback = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     using_ai = db.Column(db.Boolean, default=False)
+    tokens_original = db.Column(db.Integer)  # tokens de CV + vaga antes da compactação
+    tokens_sent = db.Column(db.Integer)  # tokens efetivamente enviados no prompt
+    job = db.relationship('JobDescription')
+    detail = db.relationship('AnalysisDetail', uselist=False, cascade='all, delete-orphan')
+
+    @property
+    def job_description(self):
+        return self.job.text if self.job else None
+
+    @property
+    def feedback(self):
+        return self.detail.feedback if self.detail else None
+
+class AnalysisDetail(db.Model):
+    """Feedback completo de uma análise, comprimido e fora da linha de Analysis.
+
+    Só é lido quando uma análise é aberta; listagens e varreduras de
+    Analysis não carregam esse texto.
+    """
+    __tablename__ = 'analysis_detail'
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.id'), primary_key=True)
+    feedback_compressed = db.Column(db.LargeBinary)
+
+    @classmethod
+    def from_feedback(cls, feedback):
+        return cls(feedback_compressed=compress_text(feedback))
+
+    @property
+    def feedback(self):
+        return decompress_text(self.feedback_compressed)
+
+# Histórico do usuário, mais recentes primeiro: atende o filtro por user_id e a
+# ordenação (created_at, id) do /history sem varrer nem ordenar a tabela
+analysis_history_index = db.Index('ix_analysis_user_created', Analysis.user_id, Analysis.created_at.desc(), Analysis.id.desc())
+
+class AnalysisJob(db.Model):
+    """Análise enfileirada para processamento assíncrono"""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, failed
+    cv_filename = db.Column(db.String(255))
+    cv_text = db.Column(db.Text)
+    job_description = db.Column(db.Text)
+    use_cache = db.Column(db.Boolean, default=True)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.id'))
+    result = db.Column(db.Text)  # JSON do resultado final
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class Document(db.Model):
+    """CV enviado pelo usuário, guardado uma vez como texto extraído (comprimido) sob o hash do arquivo.
+
+    As análises referenciam o documento pelo id, sem reenviar nem reextrair o arquivo.
+    """
+    __tablename__ = 'document'
+    __table_args__ = (db.UniqueConstraint('user_id', 'content_hash', name='uq_document_user_hash'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 do arquivo enviado
+    filename = db.Column(db.String(255))
+    size = db.Column(db.Integer)
+    text_compressed = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def text(self):
+        return decompress_text(self.text_compressed)
+
+    @classmethod
+    def store(cls, user_id, content_hash, filename, size, text):
+        """Grava o documento do usuário, ou devolve o que já existe com o mesmo hash. Não faz commit.
+
+        Usa INSERT ... ON CONFLICT DO NOTHING, como JobDescription.id_for.
+        """
+        dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        db.session.execute(
+            dialect.insert(cls)
+            .values(user_id=user_id, content_hash=content_hash, filename=filename, size=size,
+                    text_compressed=compress_text(text), created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['user_id', 'content_hash'])
+        )
+        return cls.query.filter_by(user_id=user_id, content_hash=content_hash).one()
+
+class ExtractedText(db.Model):
+    """Texto extraído de um arquivo (comprimido); compartilhado por envios idênticos.
+
+    store_key é o sha256 do sha256 dos bytes junto com os limites da extração
+    (ver TextStore._key): com outros EXTRACTION_MAX_CHARS/PAGES, as linhas
+    antigas ficam inalcançáveis até saírem pela remoção por tamanho.
+    last_used_at ordena essa remoção quando o store passa do limite.
+    """
+    __tablename__ = 'extracted_text'
+    store_key = db.Column(db.String(64), primary_key=True)
+    text_compressed = db.Column(db.LargeBinary, nullable=False)
+    stored_bytes = db.Column(db.Integer, nullable=False)  # tamanho do texto comprimido
+    source_bytes = db.Column(db.Integer)  # tamanho do arquivo original
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class DocumentUpload(db.Model):
+    """Envio em partes de um documento; as partes ficam em disco e o envio retoma de `received`."""
+    __tablename__ = 'document_upload'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    size = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64))  # sha256 informado pelo cliente, conferido no fim
+    received = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def advance(self, offset, length):
+        """Registra `length` bytes gravados a partir de `offset` com um UPDATE condicional.
+
+        Falha (False) se outra requisição já avançou o envio. Não faz commit.
+        """
+        result = db.session.execute(
+            update(DocumentUpload)
+            .where(DocumentUpload.id == self.id, DocumentUpload.received == offset)
+            .values(received=offset + length)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['received'])
+        return result.rowcount == 1
 
 SUBSCRIPTION_PLANS = {
     'free': {
@@ -0,0 +1,128 @@
+import os
+import json
+import threading
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from deadlines import DeadlineExceeded
+
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 60))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5))
+# Conexões keep-alive com a API da OpenAI por worker (acompanha LLM_ROUTER_WORKERS)
+OPENAI_POOL_SIZE = int(os.getenv('OPENAI_POOL_SIZE', 32))
+
+class OpenAIError(Exception):
+    """Resposta de erro da API da OpenAI."""
+
+    def __init__(self, status, message):
+        super().__init__(f'Erro na API da OpenAI ({status}): {message}')
+        self.status = status
+
+class OpenAIClient:
+    """Cliente da API de chat da OpenAI sobre uma sessão keep-alive por processo.
+
+    Usa o requests, que no worker gevent do gunicorn (monkey.patch_all no
+    gunicorn.conf.py) espera a rede pelo hub em vez de travar o worker, e
+    reaproveita até pool_size conexões. As respostas vêm sempre por streaming
+    (SSE): entre um pedaço e outro o prazo e o cancelamento da requisição são
+    conferidos, e fechar a resposta no meio interrompe a geração na OpenAI.
+    Chave e endpoint vêm de openai.api_key e openai.api_base (OPENAI_API_BASE).
+    """
+
+    def __init__(self, api_key=None, api_base=None, timeout=OPENAI_TIMEOUT,
+                 connect_timeout=OPENAI_CONNECT_TIMEOUT, pool_size=OPENAI_POOL_SIZE):
+        self._api_key = api_key
+        self._api_base = api_base
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def api_key(self):
+        return self._api_key or openai.api_key
+
+    @property
+    def api_base(self):
+        return (self._api_base or openai.api_base).rstrip('/')
+
+    def session(self):
+        """Sessão do processo atual (criada depois do fork do gunicorn)."""
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session, self._session_pid = session, os.getpid()
+            return self._session
+
+    def _headers(self):
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        if openai.organization:
+            headers['OpenAI-Organization'] = openai.organization
+        return headers
+
+    def stream(self, deadline=None, **payload):
+        """Gera o texto da resposta de /chat/completions aos pedaços.
+
+        O timeout de leitura é o menor entre self.timeout e o que sobra do
+        prazo; deadline.check() roda a cada pedaço e, se levantar, a conexão
+        é fechada sem esperar o fim da geração.
+        """
+        read_timeout = self.timeout if deadline is None else deadline.timeout(self.timeout)
+        try:
+            response = self.session().post(
+                f'{self.api_base}/chat/completions',
+                json={**payload, 'stream': True},
+                headers=self._headers(),
+                timeout=(self.connect_timeout, read_timeout),
+                stream=True
+            )
+        except requests.Timeout as e:
+            _raise_if_expired(deadline, e)
+            raise
+        try:
+            if response.status_code != 200:
+                raise OpenAIError(response.status_code, _error_message(response))
+            done = False
+            for line in response.iter_lines():
+                if deadline is not None:
+                    deadline.check()
+                # Depois do [DONE] só falta o fim do corpo; lê até o fim para a conexão voltar ao pool
+                if done or not line.startswith(b'data: '):
+                    continue
+                data = line[len(b'data: '):]
+                if data == b'[DONE]':
+                    done = True
+                    continue
+                content = json.loads(data)['choices'][0]['delta'].get('content')
+                if content:
+                    yield content
+        except requests.RequestException as e:
+            # Timeout de leitura no meio do streaming (vem como ConnectionError)
+            _raise_if_expired(deadline, e)
+            raise
+        finally:
+            response.close()
+
+    def complete(self, deadline=None, **payload):
+        """Texto completo da resposta (lido por streaming, ver stream())."""
+        return ''.join(self.stream(deadline=deadline, **payload))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+def _raise_if_expired(deadline, error):
+    """Um timeout causado pelo fim do prazo da requisição vira DeadlineExceeded."""
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded('Prazo da requisição esgotado') from error
+
+def _error_message(response):
+    try:
+        return response.json()['error']['message']
+    except (ValueError, KeyError, TypeError):
+        return response.text[:200]
@@ -0,0 +1,57 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# Custo do bcrypt (log2 das iterações); hashes com outro custo são refeitos no login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+# Threads do sistema para o bcrypt, por worker
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _make_pool():
+    """Pool de threads reais. Com o gevent, o ThreadPoolExecutor da stdlib viraria greenlets;
+    o do gevent roda em threads do sistema e só o greenlet que espera fica parado."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='bcrypt')
+
+def _run(fn, *args):
+    """Executa fn no pool do bcrypt (criado no primeiro uso de cada processo, depois do fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = _make_pool()
+            _pool_pid = os.getpid()
+        pool = _pool
+    return pool.submit(fn, *args).result()
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+def hash_password(password, rounds=None):
+    """Hash bcrypt da senha, calculado fora do hub."""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return _run(bcrypt.hashpw, _encode(password), salt).decode('utf-8')
+
+def verify_password(password, password_hash):
+    """Confere a senha com o hash bcrypt, fora do hub."""
+    return _run(bcrypt.checkpw, _encode(password), _encode(password_hash))
+
+def hash_rounds(password_hash):
+    """Custo gravado em um hash bcrypt ($2b$12$...), ou None se não for reconhecido."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(password_hash):
+    return hash_rounds(password_hash) != BCRYPT_ROUNDS
@@ -0,0 +1,446 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from cache import result_cache, make_cache_key
+from ratelimit import get_rate_limiter
+from compaction import compact_inputs
+from ai_analyzer import AIAnalyzer
+from metrics import timed_stage, observe_llm_call
+from openai_client import OpenAIClient, OPENAI_TIMEOUT
+from deadlines import Deadline, DeadlineExceeded, RequestCancelled
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_TEMPERATURE = 0.7
+OPENAI_MAX_TOKENS = 1000
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'mistral')
+
+# Provedores em ordem de preferência
+LLM_PROVIDERS = os.getenv('LLM_PROVIDERS', 'openai,ollama')
+# Janela das estatísticas por provedor: últimas N chamadas dos últimos N segundos
+LLM_STATS_WINDOW = int(os.getenv('LLM_STATS_WINDOW', 100))
+LLM_STATS_TTL = float(os.getenv('LLM_STATS_TTL', 300))
+# Acima desta taxa de erro o provedor vai para o fim da fila
+LLM_MAX_ERROR_RATE = float(os.getenv('LLM_MAX_ERROR_RATE', 0.5))
+# Espera máxima (s) antes de disparar a mesma análise no próximo provedor (0 = só failover)
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', 10))
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', 1))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+LLM_ROUTER_WORKERS = int(os.getenv('LLM_ROUTER_WORKERS', 32))
+# Enquanto espera o provedor, o roteador confere o prazo e a desconexão do cliente a cada N s
+LLM_POLL_INTERVAL = float(os.getenv('LLM_POLL_INTERVAL', 0.5))
+
+def build_prompt(cv_text, job_description):
+    """Monta o prompt do OpenAI comparando o CV com a descrição da vaga."""
+    return f"""Analise este currículo para a vaga descrita e forneça um feedback detalhado em português.
+
+Currículo:
+{cv_text}
+
+Descrição da Vaga:
+{job_description}
+
+Por favor, forneça uma análise estruturada incluindo:
+1. Resumo da compatibilidade
+2. Pontos fortes identificados
+3. Áreas para melhoria
+4. Sugestões específicas
+5. Habilidades técnicas encontradas
+6. Soft skills identificadas
+
+Use emojis adequados para cada seção e mantenha o tom profissional e construtivo."""
+
+class ProviderError(Exception):
+    """Falha de um provedor de LLM."""
+
+class AllProvidersFailed(ProviderError):
+    """Nenhum provedor de LLM conseguiu gerar a análise."""
+
+class LLMProvider:
+    """Interface comum dos backends de LLM.
+
+    generate() devolve {'feedback', 'using_ai', 'provider', tokens_original,
+    tokens_sent} ou levanta exceção; stream() gera o texto aos pedaços e marca
+    token_stats['cached'] quando o texto veio do cache. O deadline (deadlines.Deadline) limita os timeouts das chamadas e, quando
+    cancelado, faz o provedor abandonar a chamada em andamento.
+    """
+
+    name = None
+
+    def is_available(self):
+        return True
+
+    def generate(self, cv_text, job_description, use_cache=True, deadline=None):
+        raise NotImplementedError
+
+    def stream(self, cv_text, job_description, use_cache=True, token_stats=None, deadline=None):
+        raise NotImplementedError
+
+class OpenAIProvider(LLMProvider):
+    name = 'openai'
+
+    def __init__(self, model=OPENAI_MODEL, temperature=OPENAI_TEMPERATURE,
+                 max_tokens=OPENAI_MAX_TOKENS, timeout=OPENAI_TIMEOUT, cache=result_cache, client=None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.client = client or OpenAIClient(timeout=timeout)
+
+    def is_available(self):
+        return bool(self.client.api_key)
+
+    def _prepare(self, cv_text, job_description):
+        # Corta as entradas para o orçamento de tokens do modelo antes de montar o prompt
+        with timed_stage('prompt'):
+            cv_text, job_description, token_stats = compact_inputs(
+                cv_text, job_description, self.model, self.max_tokens
+            )
+        cache_key = make_cache_key(cv_text, job_description, self.model, self.temperature)
+        return cv_text, job_description, token_stats, cache_key
+
+    def _create(self, cv_text, job_description, deadline=None):
+        get_rate_limiter(self.name).acquire()
+        return self.client.stream(
+            deadline=deadline,
+            model=self.model,
+            messages=[{"role": "user", "content": build_prompt(cv_text, job_description)}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+
+    def generate(self, cv_text, job_description, use_cache=True, deadline=None):
+        cv_text, job_description, token_stats, cache_key = self._prepare(cv_text, job_description)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**cached, 'cached': True, **token_stats}
+
+        result = {
+            "feedback": ''.join(self._create(cv_text, job_description, deadline)),
+            "using_ai": True,
+            "provider": self.name
+        }
+        # Erros não são cacheados; só respostas completas do modelo
+        self.cache.set(cache_key, result)
+        return {**result, **token_stats}
+
+    def stream(self, cv_text, job_description, use_cache=True, token_stats=None, deadline=None):
+        cv_text, job_description, stats, cache_key = self._prepare(cv_text, job_description)
+        if token_stats is not None:
+            token_stats.update(stats)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if token_stats is not None:
+                    token_stats['cached'] = True
+                yield cached['feedback']
+                return
+
+        chunks = []
+        for content in self._create(cv_text, job_description, deadline):
+            chunks.append(content)
+            yield content
+
+        self.cache.set(cache_key, {
+            "feedback": ''.join(chunks),
+            "using_ai": True,
+            "provider": self.name
+        })
+
+class OllamaProvider(LLMProvider):
+    name = 'ollama'
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or AIAnalyzer(model=OLLAMA_MODEL)
+
+    @property
+    def model(self):
+        return self.analyzer.model
+
+    def is_available(self):
+        return self.analyzer.is_available()
+
+    def generate(self, cv_text, job_description, use_cache=True, deadline=None):
+        result = self.analyzer.analyze(cv_text, job_description, use_cache=use_cache, deadline=deadline)
+        if not result.get('success'):
+            raise ProviderError(result.get('error'))
+        return {
+            "feedback": result['analysis'],
+            "using_ai": True,
+            "provider": self.name,
+            "cached": result.get('cached', False),
+            "tokens_original": result.get('tokens_original'),
+            "tokens_sent": result.get('tokens_sent')
+        }
+
+    def stream(self, cv_text, job_description, use_cache=True, token_stats=None, deadline=None):
+        # O AIAnalyzer compacta as entradas internamente; aqui só precisamos das contagens
+        if token_stats is not None:
+            token_stats.update(compact_inputs(cv_text, job_description, self.analyzer.model)[2])
+        return self.analyzer.analyze_stream(cv_text, job_description, use_cache=use_cache, deadline=deadline,
+                                            token_stats=token_stats)
+
+class LatencyStats:
+    """Latência e taxa de erro das chamadas recentes de um provedor (janela deslizante)."""
+
+    def __init__(self, window=LLM_STATS_WINDOW, ttl=LLM_STATS_TTL):
+        self.ttl = ttl
+        self._samples = deque(maxlen=window)  # (instante, latência, sucesso)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self):
+        # Amostras antigas expiram, então um provedor rebaixado volta a ser tentado
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def percentile(self, q):
+        latencies = sorted(latency for _, latency, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def error_rate(self):
+        samples = self._recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, _, ok in samples if not ok) / len(samples)
+
+    def successes(self):
+        return sum(1 for _, _, ok in self._recent() if ok)
+
+    def snapshot(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            'samples': len(self._recent()),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'error_rate': round(self.error_rate(), 3)
+        }
+
+class ProviderRouter:
+    """Escolhe o provedor de LLM de cada análise, com hedging e failover.
+
+    Os provedores saudáveis são tentados na ordem configurada; os com taxa de
+    erro acima de max_error_rate vão para o fim e os indisponíveis são pulados.
+    Se o primário passa do seu p95 (limitado a [hedge_min_delay, hedge_delay])
+    sem responder, a mesma análise é disparada no próximo provedor e vence a
+    primeira resposta. Se o primário falha, o próximo assume.
+
+    Cada tentativa recebe um Deadline filho do da requisição: quando uma
+    responde, as outras são canceladas, e quando o prazo acaba ou o cliente
+    desconecta, todas são abandonadas (DeadlineExceeded / RequestCancelled).
+    """
+
+    def __init__(self, providers, hedge_delay=LLM_HEDGE_DELAY, hedge_min_delay=LLM_HEDGE_MIN_DELAY,
+                 hedge_min_samples=LLM_HEDGE_MIN_SAMPLES, max_error_rate=LLM_MAX_ERROR_RATE,
+                 max_workers=LLM_ROUTER_WORKERS):
+        self.providers = list(providers)
+        self.stats = {provider.name: LatencyStats() for provider in self.providers}
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.max_error_rate = max_error_rate
+        self.max_workers = max_workers
+        self.hedges = 0
+        self.failovers = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        factories = {'openai': OpenAIProvider, 'ollama': OllamaProvider}
+        names = [name.strip() for name in LLM_PROVIDERS.split(',') if name.strip()]
+        return cls([factories[name]() for name in names if name in factories])
+
+    def _get_executor(self):
+        # Criado sob demanda, depois do fork do gunicorn
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='llm-router')
+            return self._executor
+
+    def ordered(self):
+        """Provedores disponíveis na ordem em que devem ser tentados."""
+        healthy, degraded = [], []
+        for provider in self.providers:
+            try:
+                if not provider.is_available():
+                    continue
+            except Exception:
+                continue
+            if self.stats[provider.name].error_rate() > self.max_error_rate:
+                degraded.append(provider)
+            else:
+                healthy.append(provider)
+        return healthy + degraded
+
+    def hedge_after(self, provider):
+        """Tempo de espera pelo provedor antes de disparar o próximo em paralelo."""
+        if not self.hedge_delay:
+            return None
+        stats = self.stats[provider.name]
+        if stats.successes() < self.hedge_min_samples:
+            return self.hedge_delay
+        return min(self.hedge_delay, max(self.hedge_min_delay, stats.percentile(0.95)))
+
+    def _record(self, provider, latency, ok):
+        self.stats[provider.name].record(latency, ok)
+        observe_llm_call(provider.name, getattr(provider, 'model', None), latency, ok)
+
+    def _timed_generate(self, provider, cv_text, job_description, use_cache, deadline):
+        started = time.perf_counter()
+        try:
+            result = provider.generate(cv_text, job_description, use_cache=use_cache, deadline=deadline)
+        except (DeadlineExceeded, RequestCancelled):
+            # Abandonada pelo roteador ou pelo cliente, ou sem prazo: não diz nada sobre a saúde do provedor
+            raise
+        except Exception:
+            self._record(provider, time.perf_counter() - started, False)
+            raise
+        # Acertos de cache não dizem nada sobre a latência do provedor
+        if not result.get('cached'):
+            self._record(provider, time.perf_counter() - started, True)
+        return result
+
+    def _poll_timeout(self, deadline, hedge_at):
+        """Quanto esperar pelas tentativas antes de conferir o prazo ou disparar o hedge."""
+        timeouts = []
+        if hedge_at is not None:
+            timeouts.append(max(0.0, hedge_at - time.monotonic()))
+        if deadline is not None:
+            timeouts.append(LLM_POLL_INTERVAL)
+            remaining = deadline.remaining()
+            if remaining is not None:
+                timeouts.append(max(0.0, remaining))
+        return min(timeouts) if timeouts else None
+
+    def generate(self, cv_text, job_description, use_cache=True, deadline=None):
+        """Gera a análise no melhor provedor disponível; levanta AllProvidersFailed se todos falharem."""
+        remaining = self.ordered()
+        errors = []
+        pending = {}
+        hedged = False
+
+        def launch():
+            provider = remaining.pop(0)
+            attempt = deadline.child() if deadline is not None else Deadline()
+            future = self._get_executor().submit(
+                self._timed_generate, provider, cv_text, job_description, use_cache, attempt
+            )
+            pending[future] = (provider, attempt, time.monotonic())
+
+        def abandon():
+            for _, attempt, _ in pending.values():
+                attempt.cancel()
+
+        while pending or remaining:
+            if not pending:
+                if errors:
+                    self.failovers += 1
+                launch()
+
+            hedge_at = None
+            if remaining and not hedged and len(pending) == 1:
+                provider, _, launched_at = next(iter(pending.values()))
+                delay = self.hedge_after(provider)
+                if delay is not None:
+                    hedge_at = launched_at + delay
+
+            done, _ = wait(pending, timeout=self._poll_timeout(deadline, hedge_at), return_when=FIRST_COMPLETED)
+            if not done:
+                if deadline is not None:
+                    if deadline.cancelled() or deadline.expired():
+                        abandon()
+                        deadline.check()
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    # Primário lento: a mesma análise vai para o próximo provedor; vence quem responder antes
+                    hedged = True
+                    self.hedges += 1
+                    launch()
+                continue
+
+            for future in done:
+                provider, _, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if deadline is not None and (deadline.cancelled() or deadline.expired()):
+                        abandon()
+                        deadline.check()
+                    errors.append(f"{provider.name}: {e}")
+                else:
+                    # A tentativa que perdeu o hedge é interrompida em vez de gastar tokens até o fim
+                    abandon()
+                    return result
+
+        raise AllProvidersFailed('; '.join(errors) or 'Nenhum provedor de LLM disponível')
+
+    def stream(self, cv_text, job_description, use_cache=True, token_stats=None, deadline=None):
+        """Gera o texto aos pedaços; troca de provedor só enquanto nenhum pedaço foi enviado."""
+        errors = []
+        for provider in self.ordered():
+            started = time.perf_counter()
+            stats = {}
+            chunks = provider.stream(cv_text, job_description, use_cache=use_cache, token_stats=stats,
+                                     deadline=deadline)
+            try:
+                first = next(chunks, None)
+            except (DeadlineExceeded, RequestCancelled):
+                raise
+            except Exception as e:
+                self._record(provider, time.perf_counter() - started, False)
+                errors.append(f"{provider.name}: {e}")
+                self.failovers += 1
+                continue
+            # Só o tempo gasto dentro do provedor conta; o tempo em que o gerador fica
+            # parado enquanto o cliente lê cada pedaço, não
+            elapsed = time.perf_counter() - started
+
+            cached = stats.pop('cached', False)
+            if token_stats is not None:
+                token_stats.update(stats, provider=provider.name)
+            try:
+                if first is not None:
+                    yield first
+                while True:
+                    resumed = time.perf_counter()
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        break
+                    finally:
+                        elapsed += time.perf_counter() - resumed
+                    yield chunk
+            except (DeadlineExceeded, RequestCancelled):
+                raise
+            except Exception:
+                self._record(provider, elapsed, False)
+                raise
+            # Acertos de cache não dizem nada sobre a latência do provedor, como no generate()
+            if not cached:
+                self._record(provider, elapsed, True)
+            return
+
+        raise AllProvidersFailed('; '.join(errors) or 'Nenhum provedor de LLM disponível')
+
+    def snapshot(self):
+        """Estatísticas por provedor (p50/p95 em ms e taxa de erro)."""
+        return {
+            'providers': {name: stats.snapshot() for name, stats in self.stats.items()},
+            'hedges': self.hedges,
+            'failovers': self.failovers
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,64 @@
+import numpy as np
+from scipy import sparse
+from scoring import tokenize, STOPWORDS
+
+def _terms(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS and len(token) > 1]
+
+def build_tfidf_matrix(documents, vocabulary=None):
+    """Monta a matriz TF-IDF esparsa (CSR, linhas normalizadas L2) dos documentos.
+
+    Usa tf sublinear (1 + log tf) e idf suavizado. Retorna (matriz, vocabulário, idf).
+    """
+    vocabulary = {} if vocabulary is None else vocabulary
+    rows, cols, values = [], [], []
+    for row, document in enumerate(documents):
+        counts = {}
+        for term in _terms(document):
+            column = vocabulary.setdefault(term, len(vocabulary))
+            counts[column] = counts.get(column, 0) + 1
+        rows.extend([row] * len(counts))
+        cols.extend(counts.keys())
+        values.extend(counts.values())
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)),
+        shape=(len(documents), len(vocabulary))
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+    matrix = matrix @ sparse.diags(idf)
+    return _normalize_rows(matrix), vocabulary, idf
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+def rank_cvs(cv_texts, job_description):
+    """Ordena os CVs pela similaridade de cosseno TF-IDF com a vaga, em uma única operação matricial.
+
+    Retorna uma lista de (índice do CV, score 0-100) do mais para o menos compatível.
+    """
+    if not cv_texts:
+        return []
+    matrix, vocabulary, idf = build_tfidf_matrix(cv_texts)
+
+    # Termos da vaga fora do vocabulário dos CVs não contribuem para o produto escalar
+    job_counts = {}
+    for term in _terms(job_description):
+        column = vocabulary.get(term)
+        if column is not None:
+            job_counts[column] = job_counts.get(column, 0) + 1
+    query = np.zeros(len(vocabulary), dtype=np.float32)
+    for column, count in job_counts.items():
+        query[column] = (1 + np.log(count)) * idf[column]
+    norm = np.linalg.norm(query)
+    if norm:
+        query /= norm
+
+    scores = matrix @ query
+    order = np.argsort(-scores, kind='stable')
+    return [(int(index), round(float(scores[index]) * 100, 1)) for index in order]
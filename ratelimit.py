@@ -0,0 +1,44 @@
+import os
+import time
+import threading
+
+class TokenBucket:
+    """Limitador de taxa (token bucket) compartilhado entre as threads do worker."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível. Taxa <= 0 desativa o limite."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider):
+    """Retorna o limitador do provedor, configurado por <PROVIDER>_RATE_LIMIT (req/s)."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            prefix = provider.upper()
+            limiter = TokenBucket(
+                rate=float(os.getenv(f'{prefix}_RATE_LIMIT', 0)),
+                burst=int(os.getenv(f'{prefix}_RATE_BURST', 0)) or None
+            )
+            _limiters[provider] = limiter
+        return limiter
@@ -0,0 +1,290 @@
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+# Léxico de habilidades: nome canônico -> apelidos (minúsculos, sem acento)
+TECHNICAL_SKILLS = {
+    'Python': ['python', 'python3'],
+    'Java': ['java'],
+    'JavaScript': ['javascript', 'ecmascript', 'es6'],
+    'TypeScript': ['typescript'],
+    'C': ['linguagem c'],
+    'C++': ['c++', 'cpp'],
+    'C#': ['c#', 'csharp', 'c sharp'],
+    'Go': ['golang', 'go lang'],
+    'Rust': ['rust'],
+    'Ruby': ['ruby'],
+    'PHP': ['php'],
+    'Kotlin': ['kotlin'],
+    'Scala': ['scala'],
+    'R': ['linguagem r', 'r language', 'rstudio'],
+    'SQL': ['sql', 't-sql', 'pl/sql', 'plsql'],
+    'HTML': ['html', 'html5'],
+    'CSS': ['css', 'css3', 'sass', 'scss'],
+    'Bash': ['bash', 'shell script', 'shell scripting'],
+    'Django': ['django'],
+    'Flask': ['flask'],
+    'FastAPI': ['fastapi'],
+    'Spring': ['spring boot', 'springboot', 'spring framework', 'spring mvc', 'spring data', 'spring cloud',
+               'spring security'],
+    'Node.js': ['node.js', 'nodejs'],
+    'Express': ['express.js', 'expressjs'],
+    'React': ['react', 'react.js', 'reactjs'],
+    'React Native': ['react native'],
+    'Angular': ['angular', 'angularjs'],
+    'Vue.js': ['vue', 'vue.js', 'vuejs'],
+    'Next.js': ['next.js', 'nextjs'],
+    '.NET': ['.net', 'dotnet', 'asp.net', 'net core'],
+    'Laravel': ['laravel'],
+    'Rails': ['rails', 'ruby on rails'],
+    'PostgreSQL': ['postgresql', 'postgres'],
+    'MySQL': ['mysql', 'mariadb'],
+    'SQL Server': ['sql server', 'mssql'],
+    'Oracle': ['oracle database', 'oracle db'],
+    'MongoDB': ['mongodb', 'mongo'],
+    'Redis': ['redis'],
+    'Elasticsearch': ['elasticsearch', 'elastic search', 'elk'],
+    'Kafka': ['kafka'],
+    'RabbitMQ': ['rabbitmq'],
+    'Docker': ['docker', 'containers', 'conteineres'],
+    'Kubernetes': ['kubernetes', 'k8s'],
+    'Terraform': ['terraform'],
+    'Ansible': ['ansible'],
+    'AWS': ['aws', 'amazon web services'],
+    'Azure': ['azure'],
+    'GCP': ['gcp', 'google cloud'],
+    'Linux': ['linux', 'unix'],
+    'Git': ['git', 'github', 'gitlab', 'bitbucket'],
+    'CI/CD': ['ci/cd', 'integracao continua', 'entrega continua', 'jenkins', 'github actions'],
+    'REST': ['rest', 'restful', 'api rest', 'apis rest'],
+    'GraphQL': ['graphql'],
+    'Microsserviços': ['microsservicos', 'microservicos', 'microservices'],
+    'Testes automatizados': ['testes automatizados', 'testes unitarios', 'unit tests', 'unit testing', 'tdd',
+                             'pytest', 'jest', 'junit', 'selenium', 'cypress'],
+    'Machine Learning': ['machine learning', 'aprendizado de maquina'],
+    'Deep Learning': ['deep learning', 'redes neurais', 'neural networks'],
+    'Ciência de dados': ['ciencia de dados', 'data science'],
+    'Engenharia de dados': ['engenharia de dados', 'data engineering', 'etl', 'pipelines de dados'],
+    'Pandas': ['pandas'],
+    'NumPy': ['numpy'],
+    'TensorFlow': ['tensorflow'],
+    'PyTorch': ['pytorch'],
+    'Spark': ['spark', 'pyspark', 'apache spark'],
+    'Power BI': ['power bi', 'powerbi'],
+    'Tableau': ['tableau'],
+    'Excel': ['excel'],
+    'Figma': ['figma'],
+    'UX/UI': ['ux/ui', 'ui/ux', 'user experience'],
+    'Android': ['android'],
+    'iOS': ['ios'],
+    'Segurança da informação': ['seguranca da informacao', 'information security', 'cybersecurity',
+                                'ciberseguranca'],
+    'Scrum': ['scrum'],
+    'Kanban': ['kanban'],
+    'Metodologias ágeis': ['agile', 'agil', 'metodologias ageis', 'metodologia agil'],
+    'Jira': ['jira'],
+    'SAP': ['sap'],
+    'Salesforce': ['salesforce'],
+}
+
+# Apelidos ambíguos em minúsculas ("cd /home", "spring" a estação, "go"): só valem
+# escritos exatamente assim, como sigla ou nome próprio
+CASED_SKILL_ALIASES = {
+    'JavaScript': ['JS'],
+    'TypeScript': ['TS'],
+    'Go': ['Go'],
+    'Swift': ['Swift'],
+    'Spring': ['Spring'],
+    'Node.js': ['Node'],
+    'Express': ['Express'],
+    'Oracle': ['Oracle'],
+    'CI/CD': ['CI', 'CD'],
+    'Machine Learning': ['ML'],
+    'UX/UI': ['UX', 'UI'],
+}
+
+SOFT_SKILLS = {
+    'Comunicação': ['comunicacao', 'communication', 'comunicativo', 'comunicativa'],
+    'Liderança': ['lideranca', 'leadership', 'lider'],
+    'Trabalho em equipe': ['trabalho em equipe', 'teamwork', 'team player', 'colaboracao', 'colaborativo'],
+    'Resolução de problemas': ['resolucao de problemas', 'problem solving', 'solucao de problemas'],
+    'Proatividade': ['proatividade', 'proativo', 'proativa', 'proactive'],
+    'Organização': ['organizacao', 'organizado', 'organizada'],
+    'Pensamento analítico': ['pensamento analitico', 'analytical thinking', 'analitico', 'analitica'],
+    'Adaptabilidade': ['adaptabilidade', 'flexibilidade', 'adaptability'],
+    'Gestão de tempo': ['gestao de tempo', 'time management'],
+    'Negociação': ['negociacao', 'negotiation'],
+    'Criatividade': ['criatividade', 'creativity', 'criativo', 'criativa'],
+    'Mentoria': ['mentoria', 'mentoring', 'mentor'],
+    'Inglês': ['ingles', 'english'],
+    'Espanhol': ['espanhol', 'spanish'],
+}
+
+STOPWORDS = set('''
+a o as os um uma uns umas de da do das dos em na no nas nos por para pelo pela pelos pelas com sem
+sob sobre entre e ou que se ao aos como mais menos muito muita ser estar ter ja nao sim seu sua seus
+suas nosso nossa voce voces ele ela eles elas isso isto esse essa este esta aquele aquela the and or
+of to in on for with at by from an is are be as it this that we you our your will can must have has
+vaga vagas empresa empresas trabalho area anos ano experiencia requisitos requisito conhecimento
+conhecimentos desejavel desejaveis diferencial diferenciais atividades responsabilidades buscamos
+profissional candidato candidata etc bem boa bom forte fortes
+'''.split())
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9.][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]', re.IGNORECASE)
+
+# Parâmetros do BM25 (documento = CV, consulta = termos da vaga)
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVERAGE_CV_TOKENS = 400
+SKILL_WEIGHT = 0.6
+TERM_WEIGHT = 0.4
+
+def strip_accents(text):
+    # NFKD separa os acentos; o encode descarta tudo que não é ASCII (os tokens são ASCII)
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+def tokenize_cased(text):
+    """Tokens sem acentos na caixa original; os mesmos de tokenize(), só que sem o lower()."""
+    return TOKEN_PATTERN.findall(strip_accents(text or ''))
+
+def tokenize(text):
+    """Tokeniza em minúsculas e sem acentos, preservando termos como c++, c# e node.js."""
+    return [token.lower() for token in tokenize_cased(text)]
+
+class SkillMatcher:
+    """Casamento de habilidades via trie de tokens (frases de várias palavras incluídas).
+
+    A trie é compilada uma vez; o casamento percorre o texto uma única vez,
+    pegando sempre a frase mais longa que começa em cada posição. Os apelidos
+    de cased_lexicons só casam com os tokens na mesma caixa do apelido.
+    """
+
+    def __init__(self, lexicons, cased_lexicons=None):
+        self.trie = {}
+        for cased, groups in ((False, lexicons), (True, cased_lexicons or {})):
+            for kind, lexicon in groups.items():
+                for canonical, aliases in lexicon.items():
+                    for alias in aliases:
+                        tokens = tokenize_cased(alias)
+                        node = self.trie
+                        for token in tokens:
+                            node = node.setdefault(token.lower(), {})
+                        node[None] = (kind, canonical, tuple(tokens) if cased else None)
+
+    def find(self, tokens, cased_tokens=None):
+        """Retorna {tipo: set(habilidades)} encontradas na sequência de tokens.
+
+        tokens vem de tokenize(); sem cased_tokens (de tokenize_cased()), os
+        apelidos que dependem da caixa não casam.
+        """
+        found = {kind: set() for kind in ('technical', 'soft')}
+        trie = self.trie
+        index, total = 0, len(tokens)
+        while index < total:
+            node = trie.get(tokens[index])
+            if node is None:
+                index += 1
+                continue
+            match, length, offset = None, 1, index
+            while node is not None:
+                if None in node:
+                    kind, canonical, cased = node[None]
+                    if cased is None or (cased_tokens is not None
+                                         and tuple(cased_tokens[index:offset + 1]) == cased):
+                        match, length = (kind, canonical), offset - index + 1
+                offset += 1
+                node = node.get(tokens[offset]) if offset < total else None
+            if match:
+                found[match[0]].add(match[1])
+            index += length
+        return found
+
+skill_matcher = SkillMatcher({'technical': TECHNICAL_SKILLS, 'soft': SOFT_SKILLS},
+                             {'technical': CASED_SKILL_ALIASES})
+
+def content_terms(tokens):
+    return [token for token in tokens if token not in STOPWORDS and len(token) > 1 and not token.isdigit()]
+
+@lru_cache(maxsize=1024)
+def _job_profile(job_description):
+    # Descrições de vaga se repetem muito (lotes, rankings); o perfil é reaproveitado
+    cased_tokens = tokenize_cased(job_description)
+    tokens = [token.lower() for token in cased_tokens]
+    skills = skill_matcher.find(tokens, cased_tokens)
+    return (
+        frozenset(skills['technical']),
+        frozenset(skills['soft']),
+        frozenset(content_terms(tokens))
+    )
+
+def bm25_term_score(cv_tokens, job_terms):
+    """Cobertura dos termos da vaga no CV, com saturação de frequência do BM25, em [0, 1]."""
+    if not job_terms:
+        return 0.0
+    counts = Counter(cv_tokens)
+    cv_length = sum(count for token, count in counts.items() if token not in STOPWORDS)
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * cv_length / AVERAGE_CV_TOKENS)
+    total = 0.0
+    for term in job_terms:
+        frequency = counts.get(term)
+        if frequency:
+            total += frequency / (frequency + length_norm)
+    return total / len(job_terms)
+
+def match_cv(cv_text, job_description):
+    """Compara CV e vaga localmente, sem LLM. Retorna score (0-100) e as habilidades casadas."""
+    job_technical, job_soft, job_terms = _job_profile(job_description)
+    cv_cased_tokens = tokenize_cased(cv_text)
+    cv_tokens = [token.lower() for token in cv_cased_tokens]
+    cv_skills = skill_matcher.find(cv_tokens, cv_cased_tokens)
+    cv_technical, cv_soft = cv_skills['technical'], cv_skills['soft']
+
+    job_skills = job_technical | job_soft
+    matched = (cv_technical | cv_soft) & job_skills
+    term_score = bm25_term_score(cv_tokens, job_terms)
+
+    if job_skills:
+        skill_score = len(matched) / len(job_skills)
+        score = SKILL_WEIGHT * skill_score + TERM_WEIGHT * term_score
+    else:
+        score = term_score
+
+    return {
+        'score': round(min(score, 1.0) * 100, 1),
+        'matched_skills': sorted(matched),
+        'missing_skills': sorted(job_skills - matched),
+        'technical_skills': sorted(cv_technical),
+        'soft_skills': sorted(cv_soft)
+    }
+
+def keyword_score(cv_text, job_description):
+    """Score de compatibilidade (0-100) por palavras-chave."""
+    return match_cv(cv_text, job_description)['score']
+
+def keyword_feedback(cv_text, job_description):
+    """Análise completa por palavras-chave (plano gratuito), no mesmo formato de generate_feedback."""
+    match = match_cv(cv_text, job_description)
+
+    def bullet_list(items, empty):
+        return '\n'.join(f'• {item}' for item in items) if items else empty
+
+    sections = [
+        f"📊 Resumo da compatibilidade\nSeu CV atende a {match['score']:.0f}% dos requisitos identificados na vaga.",
+        f"✅ Requisitos atendidos\n{bullet_list(match['matched_skills'], 'Nenhum requisito da vaga foi encontrado no CV.')}",
+        f"⚠️ Requisitos não encontrados\n{bullet_list(match['missing_skills'], 'Todos os requisitos identificados foram encontrados.')}",
+        f"🛠️ Habilidades técnicas encontradas\n{bullet_list(match['technical_skills'], 'Nenhuma habilidade técnica identificada.')}",
+        f"🤝 Soft skills identificadas\n{bullet_list(match['soft_skills'], 'Nenhuma soft skill identificada.')}",
+    ]
+    if match['missing_skills']:
+        sections.append(
+            "💡 Sugestões\nSe você tem experiência com "
+            + ', '.join(match['missing_skills'])
+            + ", deixe isso explícito no CV usando os mesmos termos da vaga."
+        )
+
+    return {
+        "similarity_score": match['score'],
+        "feedback": '\n\n'.join(sections),
+        "using_ai": False
+    }
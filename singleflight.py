@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+
+# Coalescência entre workers via tabela de locks na camada SQLite do cache (desligada por padrão)
+SINGLEFLIGHT_SHARED = os.getenv('SINGLEFLIGHT_SHARED', '').lower() in {'1', 'true', 'yes'}
+# Tempo máximo (s) que um lock entre workers fica válido; protege contra um worker que morreu
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv('SINGLEFLIGHT_LOCK_TTL', 120))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv('SINGLEFLIGHT_POLL_INTERVAL', 0.2))
+# Por quanto tempo (s) o resultado fica disponível para os workers que esperavam por ele
+SINGLEFLIGHT_RESULT_TTL = float(os.getenv('SINGLEFLIGHT_RESULT_TTL', 10))
+
+RESULT_PREFIX = 'flight:'
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Deduplica chamadas idênticas em andamento: uma executa, as outras esperam o resultado.
+
+    Dentro do worker a espera é por um Event. Com uma camada compartilhada
+    (SQLiteCacheTier), o líder também segura um lock na tabela `inflight` e
+    publica o resultado, que os outros workers buscam por polling.
+    """
+
+    def __init__(self, shared=None, lock_ttl=SINGLEFLIGHT_LOCK_TTL,
+                 poll_interval=SINGLEFLIGHT_POLL_INTERVAL, result_ttl=SINGLEFLIGHT_RESULT_TTL):
+        self.shared = shared
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.shared_coalesced = 0
+
+    @classmethod
+    def from_env(cls, shared=None):
+        return cls(shared=shared if SINGLEFLIGHT_SHARED else None)
+
+    def do(self, key, fn):
+        """Executa fn() uma única vez por chave em andamento. Retorna (resultado, coalescido)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result, coalesced = self._run_shared(key, fn)
+            return flight.result, coalesced
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _run_shared(self, key, fn):
+        if self.shared is None:
+            return fn(), False
+
+        result_key = RESULT_PREFIX + key
+        deadline = time.monotonic() + self.lock_ttl
+        while not self.shared.acquire_lock(key, self.lock_ttl):
+            result = self.shared.get(result_key)
+            if result is not None:
+                with self._lock:
+                    self.shared_coalesced += 1
+                return result, True
+            if time.monotonic() > deadline:
+                # O líder não terminou a tempo; segue sem ele
+                return fn(), False
+            time.sleep(self.poll_interval)
+
+        try:
+            # O líder pode ter terminado entre a última consulta e o lock
+            result = self.shared.get(result_key)
+            if result is not None:
+                with self._lock:
+                    self.shared_coalesced += 1
+                return result, True
+            result = fn()
+            self.shared.set(result_key, result, self.result_ttl)
+            return result, False
+        finally:
+            self.shared.release_lock(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'shared_coalesced': self.shared_coalesced,
+                'in_flight': len(self._flights)
+            }
@@ -2,13 +2,15 @@ import os
 from flask import Blueprint, jsonify, request, current_app
 import stripe
 from models import db, User, Subscription
-from auth import token_required
+from auth import token_required, invalidate_user
 from datetime import datetime, timedelta
 
 subscription = Blueprint('subscription', __name__)
 
 # Configurar Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+# Endpoint da API do Stripe (padrão: https://api.stripe.com), para apontar para um servidor de testes
+stripe.api_base = os.getenv('STRIPE_API_BASE', stripe.api_base)
 
 @subscription.route('/plans', methods=['GET'])
 def get_plans():
@@ -78,6 +80,7 @@ def create_subscription(current_user):
                 metadata={'user_id': str(current_user.id)}
             )
             current_user.stripe_customer_id = customer.id
+            invalidate_user(current_user.id)
             db.session.commit()
         
         # Criar sessão de checkout
@@ -162,6 +165,7 @@ def handle_checkout_session(session):
     subscription.stripe_subscription_id = session['subscription']
     
     db.session.add(subscription)
+    invalidate_user(user.id)
     db.session.commit()
 
 def handle_subscription_updated(subscription_object):
@@ -177,6 +181,7 @@ def handle_subscription_updated(subscription_object):
         subscription.status = subscription_object['status']
         if subscription_object['status'] == 'active':
             subscription.expires_at = datetime.utcnow() + timedelta(days=30)
+        invalidate_user(user.id)
         db.session.commit()
 
 def handle_subscription_deleted(subscription_object):
@@ -193,6 +198,7 @@ def handle_subscription_deleted(subscription_object):
         subscription.remaining_analyses = 3
         subscription.expires_at = datetime.utcnow() + timedelta(days=30)
         subscription.stripe_subscription_id = None
+        invalidate_user(user.id)
         db.session.commit()
 
 @subscription.route('/success')
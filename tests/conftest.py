@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configuração lida pelos módulos na importação: precisa estar no ambiente antes de importar o app
+TMP_DIR = tempfile.mkdtemp(prefix='analyzer-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(TMP_DIR, 'app.db')}",
+    'AUTO_MIGRATE': '1',
+    'JWT_SECRET_KEY': 'test-secret-key-with-at-least-32-bytes',
+    'UPLOAD_DIR': os.path.join(TMP_DIR, 'uploads'),
+    'RESULT_CACHE_DB': '',
+    'AUTH_CACHE_TTL': '0',
+    'BCRYPT_ROUNDS': '4',
+    'ANALYSIS_JOB_SWEEP_INTERVAL': '0',
+    'EXTRACTION_PROCESSES': '0',
+    'TEXT_STORE_ENABLED': '0',
+    'METRICS_ENABLED': '0',
+    'REQUEST_LOG': '0',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from models import db, User  # noqa: E402
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        yield flask_app
+        db.session.remove()
+        # Cada teste começa com o banco vazio (o schema continua migrado)
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def register(client):
+    """Cadastra um usuário pelo /auth/register (plano free) e deixa o cookie no client."""
+    def register(email='user@example.com', password='secret1'):
+        response = client.post('/auth/register', json={'email': email, 'password': password, 'name': 'Teste'})
+        assert response.status_code == 200
+        return User.query.filter_by(email=email).one()
+    return register
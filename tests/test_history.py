@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from models import db, Analysis
+
+def add_analyses(user, count, same_time_every=3):
+    """Cria análises; a cada `same_time_every` elas repetem o created_at, para o desempate pelo id."""
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        db.session.add(Analysis(user_id=user.id, cv_filename=f'cv{i}.pdf', similarity_score=0.5,
+                                created_at=start + timedelta(minutes=i // same_time_every)))
+    db.session.commit()
+    return [a.id for a in Analysis.query.filter_by(user_id=user.id)
+            .order_by(Analysis.created_at.desc(), Analysis.id.desc())]
+
+def read_all_pages(client, limit):
+    pages, cursor = [], None
+    while True:
+        response = client.get('/history', query_string={'limit': limit, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([item['id'] for item in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+
+def test_history_pages_newest_first_without_gaps(client, register):
+    expected = add_analyses(register(), 11)
+
+    pages = read_all_pages(client, limit=4)
+
+    assert [len(page) for page in pages] == [4, 4, 3]
+    assert [analysis_id for page in pages for analysis_id in page] == expected
+
+def test_last_full_page_has_no_cursor(client, register):
+    expected = add_analyses(register(), 8)
+
+    assert read_all_pages(client, limit=4) == [expected[:4], expected[4:]]
+
+def test_history_only_lists_the_users_analyses(client, register):
+    other = register('other@example.com')
+    add_analyses(other, 3)
+    expected = add_analyses(register(), 2)
+
+    assert read_all_pages(client, limit=10) == [expected]
+
+def test_invalid_cursor_is_rejected(client, register):
+    register()
+
+    assert client.get('/history?cursor=not-a-cursor').status_code == 400
+    assert client.get('/history?limit=abc').status_code == 400
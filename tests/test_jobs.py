@@ -0,0 +1,129 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from jobs import ANALYSIS_JOB_LEASE, ANALYSIS_JOB_REQUEUE_AFTER
+from models import db, AnalysisJob, Subscription
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    """A fila do app sem o pool: os jobs enviados são anotados e rodam quando o teste chama _run."""
+    queue = app_module.job_queue
+    submitted = []
+    monkeypatch.setattr(queue, '_submit', submitted.append)
+    queue.submitted = submitted
+    yield queue
+    del queue.submitted
+
+def enqueue_reserved(queue, user):
+    """Enfileira um job como o /analyze faz: com uma análise já reservada da cota."""
+    assert user.subscription.reserve_analyses()
+    db.session.commit()
+    return queue.enqueue(user.id, 'cv.pdf', 'python flask', 'vaga python').id
+
+def remaining_analyses(user_id):
+    return Subscription.query.filter_by(user_id=user_id).one().remaining_analyses
+
+def test_enqueue_submits_the_job(queue, register):
+    user = register()
+    job_id = enqueue_reserved(queue, user)
+
+    assert queue.submitted == [job_id]
+    assert AnalysisJob.query.get(job_id).status == 'queued'
+
+def test_job_is_claimed_only_once(queue, register, monkeypatch):
+    calls = []
+    monkeypatch.setattr(queue, 'handler', lambda job: calls.append(job.id) or {'score': 1})
+    job_id = enqueue_reserved(queue, register())
+
+    queue._run(job_id)
+    queue._run(job_id)
+
+    job = AnalysisJob.query.get(job_id)
+    assert calls == [job_id]
+    assert job.status == 'done'
+    assert json.loads(job.result) == {'score': 1}
+    assert job.started_at is not None and job.finished_at is not None
+
+def test_failed_job_refunds_quota_once(queue, register, monkeypatch):
+    def fail(job):
+        raise RuntimeError('provedor fora do ar')
+
+    monkeypatch.setattr(queue, 'handler', fail)
+    user = register()
+    job_id = enqueue_reserved(queue, user)
+    assert remaining_analyses(user.id) == 2
+    user_id = user.id
+
+    queue._run(job_id)
+    queue.sweep()
+
+    job = AnalysisJob.query.get(job_id)
+    assert job.status == 'failed'
+    assert job.error == 'provedor fora do ar'
+    assert remaining_analyses(user_id) == 3
+
+def test_sweep_fails_stale_running_jobs_once(queue, register):
+    user = register()
+    user_id = user.id
+    job_id = enqueue_reserved(queue, user)
+    job = AnalysisJob.query.get(job_id)
+    job.status = 'running'
+    job.started_at = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_LEASE + 1)
+    db.session.commit()
+
+    queue.sweep()
+    queue.sweep()
+
+    assert AnalysisJob.query.get(job_id).status == 'failed'
+    assert remaining_analyses(user_id) == 3
+
+def test_sweep_keeps_running_jobs_within_the_lease(queue, register):
+    user = register()
+    user_id = user.id
+    job_id = enqueue_reserved(queue, user)
+    job = AnalysisJob.query.get(job_id)
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    queue.sweep()
+
+    assert AnalysisJob.query.get(job_id).status == 'running'
+    assert remaining_analyses(user_id) == 2
+
+def test_sweep_resubmits_stale_queued_jobs(queue, register):
+    user = register()
+    stale_id = enqueue_reserved(queue, user)
+    fresh_id = enqueue_reserved(queue, user)
+    AnalysisJob.query.get(stale_id).created_at = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_REQUEUE_AFTER + 1)
+    db.session.commit()
+    queue.submitted.clear()
+
+    queue.sweep()
+
+    assert queue.submitted == [stale_id]
+    assert AnalysisJob.query.get(fresh_id).status == 'queued'
+
+def test_result_of_an_abandoned_job_is_dropped(queue, register, monkeypatch):
+    user = register()
+    user_id = user.id
+    job_id = enqueue_reserved(queue, user)
+
+    def abandoned_while_running(job):
+        # A varredura de outro worker dá o job como perdido antes de o handler terminar
+        AnalysisJob.query.filter_by(id=job.id).update(
+            {'started_at': datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_LEASE + 1)})
+        db.session.commit()
+        queue.sweep()
+        return {'score': 1}
+
+    monkeypatch.setattr(queue, 'handler', abandoned_while_running)
+    queue._run(job_id)
+
+    job = AnalysisJob.query.get(job_id)
+    assert job.status == 'failed'
+    assert job.result is None
+    assert remaining_analyses(user_id) == 3
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from compression import decompress_text
+from migrations import SCHEMA_VERSION, SchemaOutOfDate, current_version, migrate, verify_schema
+
+# Schema criado pelo db.create_all() da versão anterior ao controle de versão
+BASELINE_SCHEMA = [
+    '''CREATE TABLE user (
+        id INTEGER NOT NULL PRIMARY KEY,
+        email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(128),
+        name VARCHAR(100),
+        created_at DATETIME
+    )''',
+    '''CREATE TABLE subscription (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        plan_type VARCHAR(50),
+        remaining_analyses INTEGER,
+        expires_at DATETIME,
+        created_at DATETIME,
+        updated_at DATETIME,
+        stripe_subscription_id VARCHAR(255),
+        status VARCHAR(50)
+    )''',
+    '''CREATE TABLE analysis (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        cv_filename VARCHAR(255),
+        job_description TEXT,
+        similarity_score FLOAT,
+        feedback TEXT,
+        created_at DATETIME,
+        using_ai BOOLEAN
+    )''',
+]
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO user (id, email, name, created_at) VALUES (1, 'a@example.com', 'A', :now)"),
+                     {'now': now})
+        conn.execute(text(
+            "INSERT INTO subscription (id, user_id, plan_type, remaining_analyses, expires_at, status) "
+            "VALUES (1, 1, 'premium', 30, :now, 'active')"
+        ), {'now': now})
+        conn.execute(text(
+            'INSERT INTO analysis (id, user_id, cv_filename, job_description, similarity_score, feedback, created_at, using_ai) '
+            'VALUES (:id, 1, :cv, :job, 0.5, :feedback, :now, 1)'
+        ), [
+            {'id': 1, 'cv': 'a.pdf', 'job': 'Vaga Python', 'feedback': 'Bom', 'now': now},
+            {'id': 2, 'cv': 'b.pdf', 'job': 'Vaga Python', 'feedback': None, 'now': now},
+            {'id': 3, 'cv': 'c.pdf', 'job': 'Vaga Go', 'feedback': 'Regular', 'now': now},
+        ])
+    yield engine
+    engine.dispose()
+
+def test_baseline_schema_is_out_of_date(baseline_engine):
+    assert current_version(baseline_engine) == 0
+    with pytest.raises(SchemaOutOfDate):
+        verify_schema(baseline_engine)
+
+def test_migrate_from_baseline_keeps_the_data(baseline_engine):
+    assert migrate(baseline_engine, log=lambda message: None) == SCHEMA_VERSION
+    assert verify_schema(baseline_engine) == SCHEMA_VERSION
+
+    columns = {c['name'] for c in inspect(baseline_engine).get_columns('analysis')}
+    assert 'feedback' not in columns and 'job_description' not in columns
+    assert {'job_description_id', 'tokens_original', 'tokens_sent'} <= columns
+    assert 'stripe_customer_id' in {c['name'] for c in inspect(baseline_engine).get_columns('user')}
+    assert 'ix_analysis_user_created' in {i['name'] for i in inspect(baseline_engine).get_indexes('analysis')}
+
+    with baseline_engine.connect() as conn:
+        jobs = conn.execute(text(
+            'SELECT a.id, j.text FROM analysis a JOIN job_description j ON j.id = a.job_description_id ORDER BY a.id'
+        )).fetchall()
+        details = conn.execute(text(
+            'SELECT analysis_id, feedback_compressed FROM analysis_detail ORDER BY analysis_id'
+        )).fetchall()
+        assert conn.execute(text('SELECT COUNT(*) FROM job_description')).scalar() == 2
+        assert conn.execute(text('SELECT remaining_analyses FROM subscription')).scalar() == 30
+
+    assert [tuple(row) for row in jobs] == [(1, 'Vaga Python'), (2, 'Vaga Python'), (3, 'Vaga Go')]
+    assert [(row.analysis_id, decompress_text(row.feedback_compressed)) for row in details] == [
+        (1, 'Bom'), (3, 'Regular')
+    ]
+
+def test_migrate_is_a_no_op_when_up_to_date(baseline_engine):
+    applied = []
+    migrate(baseline_engine, log=applied.append)
+    assert len(applied) == SCHEMA_VERSION
+
+    applied.clear()
+    assert migrate(baseline_engine, log=applied.append) == SCHEMA_VERSION
+    assert applied == []
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, Subscription
+
+def test_reserve_decrements_until_exhausted(register):
+    subscription = register().subscription
+    assert subscription.remaining_analyses == 3
+
+    assert subscription.reserve_analyses(2)
+    assert subscription.remaining_analyses == 1
+    assert not subscription.reserve_analyses(2)
+    assert subscription.reserve_analyses()
+    assert not subscription.reserve_analyses()
+    db.session.commit()
+
+    assert Subscription.query.get(subscription.id).remaining_analyses == 0
+
+def test_reserve_fails_when_expired(register):
+    subscription = register().subscription
+    subscription.expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+
+    assert not subscription.reserve_analyses()
+    assert subscription.remaining_analyses == 3
+
+def test_business_plan_is_not_decremented(register):
+    subscription = register().subscription
+    subscription.plan_type = 'business'
+    subscription.remaining_analyses = 0
+    db.session.commit()
+
+    assert subscription.reserve_analyses(5)
+    assert subscription.remaining_analyses == 0
+
+def test_reserve_checks_the_plan_in_the_database(register):
+    subscription = register().subscription
+    subscription.plan_type = 'premium'
+    db.session.commit()
+    # Objeto desatualizado (ex.: do cache de autenticação) ainda dizendo business
+    set_committed_value(subscription, 'plan_type', 'business')
+
+    assert subscription.reserve_analyses()
+    assert subscription.remaining_analyses == 2
+
+def test_refund_returns_reserved_analyses(register):
+    subscription = register().subscription
+    assert subscription.reserve_analyses(3)
+    subscription.refund_analyses(2)
+    db.session.commit()
+
+    assert subscription.remaining_analyses == 2
+
+def test_refund_ignores_business_plan(register):
+    subscription = register().subscription
+    subscription.plan_type = 'business'
+    subscription.remaining_analyses = 0
+    db.session.commit()
+
+    subscription.refund_analyses()
+    db.session.commit()
+    assert subscription.remaining_analyses == 0
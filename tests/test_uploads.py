@@ -0,0 +1,84 @@
+import io
+
+import fitz
+import pytest
+
+import documents
+from models import Document
+
+@pytest.fixture
+def pdf():
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), 'Desenvolvedora Python com Flask e SQLAlchemy')
+    data = document.tobytes()
+    document.close()
+    return data
+
+def start_upload(client, data):
+    response = client.post('/documents/uploads', json={'filename': 'cv.pdf', 'size': len(data)})
+    assert response.status_code == 201
+    return response.get_json()
+
+def put_chunk(client, upload, offset, chunk, **kwargs):
+    return client.put(upload['upload_url'], data=chunk, headers={'Upload-Offset': str(offset)}, **kwargs)
+
+def test_upload_in_chunks_creates_the_document(client, register, pdf):
+    register()
+    upload = start_upload(client, pdf)
+    half = len(pdf) // 2
+
+    response = put_chunk(client, upload, 0, pdf[:half])
+    assert response.status_code == 200
+    assert response.get_json()['offset'] == half
+
+    response = put_chunk(client, upload, half, pdf[half:])
+    assert response.status_code == 201
+    document = Document.query.get(response.get_json()['document']['id'])
+    assert 'Python' in document.text
+
+def test_out_of_order_chunk_returns_the_offset_to_resume_from(client, register, pdf):
+    register()
+    upload = start_upload(client, pdf)
+    assert put_chunk(client, upload, 0, pdf[:100]).status_code == 200
+
+    # Parte repetida (resposta anterior perdida) e parte adiantada
+    for offset in (0, 200):
+        response = put_chunk(client, upload, offset, pdf[offset:offset + 100])
+        assert response.status_code == 409
+        assert response.get_json()['offset'] == 100
+
+    assert put_chunk(client, upload, 100, pdf[100:]).status_code == 201
+
+def test_interrupted_chunk_keeps_the_blocks_already_copied(client, register, pdf, monkeypatch):
+    monkeypatch.setattr(documents, 'COPY_BUFFER_SIZE', 20)
+    register()
+    upload = start_upload(client, pdf)
+
+    # O corpo termina antes do Content-Length declarado, como numa conexão caída
+    response = put_chunk(client, upload, 0, None, input_stream=io.BytesIO(pdf[:60]),
+                         environ_overrides={'CONTENT_LENGTH': '100'})
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 60
+
+    status = client.get(upload['upload_url']).get_json()
+    assert status['offset'] == 60
+    assert put_chunk(client, upload, 60, pdf[60:]).status_code == 201
+
+def test_chunk_sent_while_another_is_written_is_rejected(client, register, pdf):
+    register()
+    upload = start_upload(client, pdf)
+
+    with documents.locked_part(upload['upload_id']):
+        response = put_chunk(client, upload, 0, pdf[:100])
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 0
+
+    assert put_chunk(client, upload, 0, pdf[:100]).status_code == 200
+
+def test_upload_of_another_user_is_not_found(client, register, pdf):
+    register()
+    upload = start_upload(client, pdf)
+    register('other@example.com')
+
+    assert client.get(upload['upload_url']).status_code == 404
+    assert put_chunk(client, upload, 0, pdf[:100]).status_code == 404
@@ -0,0 +1,191 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, ExtractedText
+from compression import compress_text, decompress_text
+from extraction import COPY_BUFFER_SIZE, EXTRACTION_MAX_CHARS, EXTRACTION_MAX_PAGES
+from metrics import count_text_store_lookup, count_text_store_evictions
+
+TEXT_STORE_ENABLED = os.getenv('TEXT_STORE_ENABLED', '1').lower() in {'1', 'true', 'yes'}
+# Limite (bytes, já comprimidos) do store; acima dele saem os textos usados há mais tempo
+TEXT_STORE_MAX_BYTES = int(os.getenv('TEXT_STORE_MAX_BYTES', 256 * 1024 * 1024))
+# Intervalo mínimo (s) entre duas atualizações de last_used_at do mesmo texto
+TEXT_STORE_TOUCH_INTERVAL = float(os.getenv('TEXT_STORE_TOUCH_INTERVAL', 3600))
+# Intervalo (s) para refazer a soma do tamanho do store; entre uma e outra, cada worker soma o que grava
+TEXT_STORE_RESYNC_INTERVAL = float(os.getenv('TEXT_STORE_RESYNC_INTERVAL', 300))
+
+# Espaços no fim de cada linha ou página
+TRAILING_SPACE = re.compile(r'[ \t\r]+(?=[\n\f]|\Z)')
+
+def hash_upload(upload):
+    """(tamanho, sha256) do conteúdo de um upload; o stream volta para o início."""
+    stream = getattr(upload, 'stream', upload)
+    stream.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+        digest.update(block)
+        size += len(block)
+    stream.seek(0)
+    return size, digest.hexdigest()
+
+def normalize_extracted(text):
+    """Unicode NFC e sem espaços no fim das linhas; as quebras de página (\\f) ficam."""
+    return TRAILING_SPACE.sub('', unicodedata.normalize('NFC', text))
+
+class TextStore:
+    """Texto extraído dos arquivos, na tabela extracted_text, pelo sha256 dos bytes e os limites da extração.
+
+    Um arquivo idêntico a um já extraído (de qualquer usuário) não é lido de
+    novo, mesmo quando a vaga muda, caso que o cache de resultados não
+    cobre. Com outros EXTRACTION_MAX_CHARS/PAGES, o texto cortado nos
+    limites antigos não é reaproveitado (store_key muda). O texto fica comprimido e o total é limitado a max_bytes:
+    passando disso, saem os textos usados há mais tempo (LRU por
+    last_used_at) até sobrar evict_target do limite. O total é estimado em
+    memória e só somado no banco a cada resync_interval ou quando a
+    estimativa passa do limite. As escritas usam transações próprias, fora
+    da sessão da requisição, para o texto ficar gravado mesmo se a análise
+    falhar depois.
+    """
+
+    # Fração de max_bytes que fica depois de uma remoção: a próxima não vem logo no insert seguinte
+    evict_target = 0.9
+
+    def __init__(self, max_bytes=TEXT_STORE_MAX_BYTES, touch_interval=TEXT_STORE_TOUCH_INTERVAL,
+                 enabled=TEXT_STORE_ENABLED, resync_interval=TEXT_STORE_RESYNC_INTERVAL,
+                 limits=(EXTRACTION_MAX_CHARS, EXTRACTION_MAX_PAGES)):
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.enabled = enabled
+        self.resync_interval = resync_interval
+        self.limits = limits
+        self._lock = threading.Lock()
+        # Total (bytes) estimado por este processo; None até a primeira soma no banco
+        self._stored_bytes = None
+        self._synced_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def get(self, content_hash, source_bytes=None):
+        """Texto guardado para o arquivo com esse hash, ou None."""
+        if not self.enabled:
+            return None
+        store_key = self._key(content_hash)
+        table = ExtractedText.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.text_compressed, table.c.last_used_at).where(table.c.store_key == store_key)
+            ).first()
+        self._count(row is not None, source_bytes)
+        if row is None:
+            return None
+
+        # last_used_at só é regravado de tempos em tempos: um acerto não vira uma escrita a cada leitura
+        now = datetime.utcnow()
+        if row.last_used_at is None or now - row.last_used_at >= timedelta(seconds=self.touch_interval):
+            with db.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.store_key == store_key).values(last_used_at=now))
+        return decompress_text(row.text_compressed)
+
+    def put(self, content_hash, text, source_bytes=None):
+        """Grava o texto normalizado e o devolve; uma extração que falhou (texto vazio) não é guardada."""
+        if not text:
+            return text
+        text = normalize_extracted(text)
+        if not self.enabled:
+            return text
+        payload = compress_text(text)
+        if len(payload) > self.max_bytes:
+            return text
+
+        now = datetime.utcnow()
+        dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        with db.engine.begin() as conn:
+            inserted = conn.execute(
+                dialect.insert(ExtractedText.__table__)
+                .values(store_key=self._key(content_hash), text_compressed=payload, stored_bytes=len(payload),
+                        source_bytes=source_bytes, created_at=now, last_used_at=now)
+                .on_conflict_do_nothing(index_elements=['store_key'])
+            ).rowcount == 1
+        if inserted and self._grow(len(payload)):
+            self.evict()
+        return text
+
+    def get_or_extract(self, content_hash, source_bytes, extract):
+        """Texto do store ou, se não houver, o de extract(), que é guardado em seguida."""
+        text = self.get(content_hash, source_bytes)
+        if text is None:
+            text = self.put(content_hash, extract(), source_bytes)
+        return text
+
+    def _key(self, content_hash):
+        # O mesmo arquivo extraído com outros limites é outro texto
+        max_chars, max_pages = self.limits
+        return hashlib.sha256(f'{content_hash}:{max_chars}:{max_pages}'.encode('ascii')).hexdigest()
+
+    def _grow(self, size):
+        """Soma um insert à estimativa do total; True quando é hora de conferir o total no banco."""
+        with self._lock:
+            if self._stored_bytes is None or time.monotonic() - self._synced_at >= self.resync_interval:
+                return True
+            self._stored_bytes += size
+            return self._stored_bytes > self.max_bytes
+
+    def evict(self, batch_size=1000):
+        """Remove os textos usados há mais tempo se o total passar de max_bytes. Retorna quantos saíram.
+
+        O total vem de uma soma no banco, que também corrige a estimativa local;
+        a remoção vai até sobrar evict_target do limite.
+        """
+        table = ExtractedText.__table__
+        victims = []
+        with db.engine.begin() as conn:
+            total = conn.execute(select(func.coalesce(func.sum(table.c.stored_bytes), 0))).scalar()
+            if total > self.max_bytes:
+                excess = total - int(self.max_bytes * self.evict_target)
+                oldest = conn.execute(
+                    select(table.c.store_key, table.c.stored_bytes).order_by(table.c.last_used_at).limit(batch_size)
+                ).fetchall()
+                for store_key, stored_bytes in oldest:
+                    victims.append(store_key)
+                    excess -= stored_bytes
+                    total -= stored_bytes
+                    if excess <= 0:
+                        break
+                conn.execute(delete(table).where(table.c.store_key.in_(victims)))
+        with self._lock:
+            self._stored_bytes = total
+            self._synced_at = time.monotonic()
+            self.evictions += len(victims)
+        count_text_store_evictions(len(victims))
+        return len(victims)
+
+    def _count(self, hit, source_bytes):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.bytes_saved += source_bytes or 0
+            else:
+                self.misses += 1
+        count_text_store_lookup(hit, source_bytes)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'evictions': self.evictions
+            }
+
+text_store = TextStore()